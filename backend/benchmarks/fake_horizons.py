@@ -0,0 +1,147 @@
+"""Local stand-in for the JPL Horizons API used by the benchmark suite.
+
+Answers OBSERVER requests with a table in the Horizons text format, either
+a recorded response file served verbatim, a real response replayed from a
+response archive (services.response_archive), or one synthesized for the
+requested START_TIME/STOP_TIME/STEP_SIZE from the two-body propagator.
+Latency and failure rate are configurable (and can be changed while
+running), and every request is counted, so benchmarks can report how many
+upstream calls a scenario caused.
+
+Run standalone with
+
+    python -m benchmarks.fake_horizons --port 8010 --latency 0.3 --failure-rate 0.1
+    python -m benchmarks.fake_horizons --archive /var/lib/comet-tracker/horizons
+
+or mount FakeHorizons().app in-process with httpx.ASGITransport.
+"""
+import asyncio
+import random
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import typer
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from services.comet_registry import ATLAS_3I
+from services.orbit_propagator import OrbitalElements, geocentric_ephemeris
+from services.response_archive import ResponseArchive
+
+_STEP_RE = re.compile(r'^\s*(\d+)\s*([mhd])')
+_STEP_MINUTES = {'m': 1, 'h': 60, 'd': 1440}
+_MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+def _sexagesimal(value: float) -> str:
+    value = abs(value)
+    whole = int(value)
+    minutes = int((value - whole) * 60)
+    seconds = ((value - whole) * 60 - minutes) * 60
+    return f"{whole:02d} {minutes:02d} {seconds:05.2f}"
+
+def observer_table(elements: OrbitalElements, start: datetime, stop: datetime, step_minutes: int) -> str:
+    """Horizons-format OBSERVER table (quantities 1,9,20,23,24) for a grid of epochs"""
+    times = np.arange(
+        np.datetime64(start, 'm'),
+        np.datetime64(stop, 'm') + np.timedelta64(1, 'm'),
+        np.timedelta64(step_minutes, 'm')
+    )
+    ephem, _ = geocentric_ephemeris(elements, times)
+
+    rows = []
+    for t, ra, dec, delta, deldot, elong, phase in zip(
+        times.astype('datetime64[m]').tolist(),
+        ephem.ra.tolist(), ephem.dec.tolist(), ephem.delta.tolist(),
+        ephem.deldot.tolist(), ephem.elongation.tolist(), ephem.phase_angle.tolist()
+    ):
+        rows.append(
+            f" {t.year}-{_MONTHS[t.month - 1]}-{t.day:02d} {t.hour:02d}:{t.minute:02d} *m  "
+            f"{_sexagesimal(ra / 15)} {'-' if dec < 0 else '+'}{_sexagesimal(dec)}   "
+            f"n.a.  n.a.  {delta:.14f} {deldot:.7f}   {elong:.4f} /T   {phase:.4f}"
+        )
+
+    return (
+        "*******************************************************************************\n"
+        "JPL/HORIZONS (benchmark stub)\n"
+        f"   EC= {elements.eccentricity}     QR= {elements.perihelion_distance}   TP= {elements.perihelion_time}\n"
+        f"   OM= {elements.ascending_node}     W= {elements.argument_of_perihelion}    IN= {elements.inclination}\n"
+        " Date__(UT)__HR:MN     R.A._____(ICRF)_____DEC    T-mag   N-mag            delta      deldot    S-O-T /r    S-T-O\n"
+        "*******************************************************************************\n"
+        "$$SOE\n" + "\n".join(rows) + "\n$$EOE\n"
+    )
+
+class FakeHorizons:
+    """Configurable Horizons stub; see the module docstring"""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        payload_path: Optional[Path] = None,
+        elements: OrbitalElements = ATLAS_3I.elements,
+        archive: Optional[ResponseArchive] = None
+    ):
+        self.latency = latency            # seconds added to every response
+        self.failure_rate = failure_rate  # share of requests answered with 503
+        self.payload = Path(payload_path).read_text() if payload_path else None
+        self.elements = elements
+        self.archive = archive
+        # Newest archived response per (COMMAND, STEP_SIZE), for queries that
+        # were never recorded exactly (their START_TIME is always "now")
+        self._archived = {}
+        for metadata, path in archive.entries() if archive else ():
+            params = metadata['params']
+            self._archived[(params.get('COMMAND'), params.get('STEP_SIZE'))] = path
+        self.replayed = 0
+        self.calls = 0
+        self.failures = 0
+        self.app = Starlette(routes=[Route('/api/horizons.api', self.handle)])
+
+    async def handle(self, request: Request) -> PlainTextResponse:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            self.failures += 1
+            return PlainTextResponse('Service Unavailable', status_code=503)
+
+        params = request.query_params
+        if 'START_TIME' not in params:
+            return PlainTextResponse('Horizons benchmark stub')
+        if self.payload is not None:
+            return PlainTextResponse(self.payload)
+        if self.archive is not None:
+            recorded = self.archive.get(dict(params))
+            path = self._archived.get((params.get('COMMAND'), params.get('STEP_SIZE')))
+            if recorded is None and path is not None:
+                recorded = ResponseArchive.load(path)[1]
+            if recorded is not None:
+                self.replayed += 1
+                return PlainTextResponse(recorded)
+
+        start = datetime.strptime(params['START_TIME'].strip("'"), '%Y-%m-%d %H:%M')
+        stop = datetime.strptime(params['STOP_TIME'].strip("'"), '%Y-%m-%d %H:%M')
+        match = _STEP_RE.match(params.get('STEP_SIZE', '1h'))
+        step = int(match.group(1)) * _STEP_MINUTES[match.group(2)] if match else 60
+        stop = min(stop, start + timedelta(days=90))
+        return PlainTextResponse(observer_table(self.elements, start, stop, step))
+
+def main(
+    port: int = typer.Option(8010, help="Port to listen on"),
+    latency: float = typer.Option(0.0, help="Seconds added to every response"),
+    failure_rate: float = typer.Option(0.0, help="Share of requests answered with 503"),
+    payload: Optional[Path] = typer.Option(None, help="Recorded Horizons response served verbatim"),
+    archive: Optional[Path] = typer.Option(None, help="Response archive to replay real responses from")
+):
+    """Serve the Horizons stub on localhost"""
+    stub = FakeHorizons(latency, failure_rate, payload, archive=ResponseArchive(archive) if archive else None)
+    uvicorn.run(stub.app, host='127.0.0.1', port=port)
+
+if __name__ == '__main__':
+    typer.run(main)
@@ -0,0 +1,212 @@
+"""Offline benchmark of the comet routes.
+
+Runs the real FastAPI comet router and CometService in-process against
+the Horizons stub (benchmarks.fake_horizons) and either mongomock
+(default, needs mongomock-motor from requirements-dev.txt) or a local
+mongod (--mongo-url), then
+drives four scenarios:
+
+- cold: empty cache and store, one burst of concurrent requests
+- warm: steady load once everything is cached
+- stampede: every cache layer expires at once under a concurrent burst
+- outage: the same expiry while Horizons answers every request with 503
+
+For each scenario it reports p50/p99 latency, throughput, response
+status counts and the number of upstream (Horizons) calls made.
+
+    cd backend && python -m benchmarks.run --concurrency 50 --requests 2000
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+import typer
+from fastapi import FastAPI
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from benchmarks.fake_horizons import FakeHorizons
+from routes import comet_routes
+from services.comet_service import CometService
+from services.response_archive import ResponseArchive
+
+try:
+    from mongomock_motor import AsyncMongoMockClient
+except ImportError:  # optional: in-memory MongoDB
+    AsyncMongoMockClient = None
+
+PATHS = (
+    '/api/comet/3i-atlas/current',
+    '/api/comet/3i-atlas/history?hours=30',
+    '/api/comet/3i-atlas/history?hours=168&max_points=200'
+)
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int
+    seconds: float
+    p50_ms: float
+    p99_ms: float
+    throughput: float
+    upstream_calls: int
+    statuses: Dict[int, int] = field(default_factory=dict)
+    sources: Dict[str, int] = field(default_factory=dict)
+
+class Bench:
+    """One service + API instance wired to the Horizons stub"""
+
+    def __init__(self, horizons: FakeHorizons, mongo_url: Optional[str]):
+        if mongo_url:
+            self.mongo = AsyncIOMotorClient(mongo_url)
+        elif AsyncMongoMockClient is not None:
+            self.mongo = AsyncMongoMockClient()
+        else:
+            raise typer.BadParameter("Install requirements-dev.txt (mongomock-motor) or pass --mongo-url")
+
+        self.db = self.mongo[f"comet_bench_{int(time.time())}"]
+        self.horizons = horizons
+        self.service = CometService(
+            self.db,
+            http_client=httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=horizons.app),
+                timeout=httpx.Timeout(30.0, connect=10.0)
+            )
+        )
+        self.service.base_url = 'http://horizons.bench/api/horizons.api'
+
+        app = FastAPI()
+        app.include_router(comet_routes.router, prefix='/api')
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url='http://api.bench',
+            timeout=httpx.Timeout(120.0)
+        )
+
+    async def start(self):
+        await self.service.store.ensure_indexes()
+        await self.service.start()
+        comet_routes.set_comet_service(self.service)
+
+    async def close(self):
+        comet_routes.set_comet_service(None)
+        await self.client.aclose()
+        await self.service.close()
+        await self.db.client.drop_database(self.db.name)
+
+    async def expire_caches(self):
+        """Make every cache layer miss: L1, response bodies, ephemeris fit and Mongo freshness"""
+        service = self.service
+        service._l1.clear()
+        comet_routes.response_cache = comet_routes.http_cache.ResponseCache()
+        for state in service._states.values():
+            state.ephemeris = None
+            state.current_tick = None
+        await service.flush_cache_writes()
+        stale = datetime.utcnow() - timedelta(hours=1)
+        await self.db.comet_data.update_many({}, {'$set': {'timestamp': stale}})
+        # Drop the newest epochs so history windows have a gap to fill
+        await service.store.collection.delete_many({'timestamp': {'$gte': stale - timedelta(hours=2)}})
+
+    async def drive(self, name: str, total: int, concurrency: int) -> ScenarioResult:
+        latencies: List[float] = []
+        statuses = Counter()
+        sources = Counter()
+        calls_before = self.horizons.calls
+        next_index = 0
+
+        async def worker():
+            nonlocal next_index
+            while next_index < total:
+                path = PATHS[next_index % len(PATHS)]
+                next_index += 1
+                started = time.perf_counter()
+                response = await self.client.get(path)
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] += 1
+                if path.endswith('/current') and response.status_code == 200:
+                    sources[response.json().get('source', '?')] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+        elapsed = time.perf_counter() - started
+
+        latencies_ms = np.array(latencies) * 1000.0
+        return ScenarioResult(
+            name=name,
+            requests=total,
+            seconds=round(elapsed, 3),
+            p50_ms=round(float(np.percentile(latencies_ms, 50)), 2),
+            p99_ms=round(float(np.percentile(latencies_ms, 99)), 2),
+            throughput=round(total / elapsed, 1),
+            upstream_calls=self.horizons.calls - calls_before,
+            statuses=dict(statuses),
+            sources=dict(sources)
+        )
+
+async def run_scenarios(
+    requests: int,
+    concurrency: int,
+    latency: float,
+    mongo_url: Optional[str],
+    payload: Optional[Path],
+    archive: Optional[Path] = None
+) -> List[ScenarioResult]:
+    horizons = FakeHorizons(
+        latency=latency,
+        payload_path=payload,
+        archive=ResponseArchive(archive) if archive else None
+    )
+    bench = Bench(horizons, mongo_url)
+    await bench.start()
+    try:
+        results = [await bench.drive('cold', concurrency, concurrency)]
+        # Let background revalidations and write-behind flushes settle
+        await asyncio.sleep(latency * 4 + 0.5)
+        results.append(await bench.drive('warm', requests, concurrency))
+
+        await bench.expire_caches()
+        results.append(await bench.drive('stampede', concurrency, concurrency))
+        await asyncio.sleep(latency * 4 + 0.5)
+
+        await bench.expire_caches()
+        horizons.failure_rate = 1.0
+        results.append(await bench.drive('outage', requests, concurrency))
+        return results
+    finally:
+        await bench.close()
+
+def report(results: List[ScenarioResult]):
+    typer.echo(f"{'scenario':<10}{'requests':>9}{'p50 ms':>10}{'p99 ms':>10}{'req/s':>10}{'upstream':>10}  statuses / current sources")
+    for result in results:
+        typer.echo(
+            f"{result.name:<10}{result.requests:>9}{result.p50_ms:>10.2f}{result.p99_ms:>10.2f}"
+            f"{result.throughput:>10.1f}{result.upstream_calls:>10}  {result.statuses} {result.sources}"
+        )
+
+def main(
+    requests: int = typer.Option(2000, help="Requests in the warm and outage scenarios"),
+    concurrency: int = typer.Option(50, help="Concurrent clients (and burst size for cold/stampede)"),
+    latency: float = typer.Option(0.25, help="Simulated Horizons latency in seconds"),
+    mongo_url: Optional[str] = typer.Option(None, help="Use a real MongoDB instead of mongomock"),
+    payload: Optional[Path] = typer.Option(None, help="Recorded Horizons response to serve"),
+    archive: Optional[Path] = typer.Option(None, help="Replay real responses from a Horizons response archive"),
+    json_output: Optional[Path] = typer.Option(None, '--json', help="Also write results as JSON"),
+    log_level: str = typer.Option('CRITICAL', help="Log level for the service under test")
+):
+    """Run the offline benchmark scenarios"""
+    logging.basicConfig(level=getattr(logging, log_level.upper(), logging.CRITICAL))
+    results = asyncio.run(run_scenarios(requests, concurrency, latency, mongo_url, payload, archive))
+    report(results)
+    if json_output:
+        json_output.write_text(json.dumps([asdict(result) for result in results], indent=2))
+
+if __name__ == '__main__':
+    typer.run(main)
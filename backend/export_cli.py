@@ -0,0 +1,73 @@
+"""Command-line export of stored comet ephemeris samples.
+
+    python export_cli.py 3i-atlas --start 2025-07-01 --end 2025-08-01 --format csv -o atlas.csv
+
+Uses the same MONGO_URL / DB_NAME / EPHEMERIS_STORAGE_MODE / COMET_CATALOG_PATH
+settings as the API server and streams straight from the MongoDB cursor.
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import typer
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from services.comet_registry import CometRegistry
+from services.comet_service import CometService
+from services.ephemeris_export import FORMATS
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+app = typer.Typer(add_completion=False)
+
+async def _export(comet: str, start: datetime, end: datetime, fmt: str, output: Optional[Path]) -> int:
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        service = CometService(
+            client[os.environ['DB_NAME']],
+            storage_mode=os.environ.get('EPHEMERIS_STORAGE_MODE', 'standard'),
+            registry=CometRegistry.from_file(os.environ.get('COMET_CATALOG_PATH'))
+        )
+        tracked = service.registry.get(comet)
+        if tracked is None:
+            raise typer.BadParameter(f"Unknown comet: {comet}")
+
+        written = 0
+        out = open(output, 'wb') if output else sys.stdout.buffer
+        try:
+            async for chunk in service.export_history(tracked.comet_id, start, end, fmt):
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if output:
+                out.close()
+        return written
+    finally:
+        client.close()
+
+@app.command()
+def export(
+    comet: str = typer.Argument('3i-atlas', help="Comet slug or id"),
+    start: datetime = typer.Option(..., help="Range start (UTC)"),
+    end: Optional[datetime] = typer.Option(None, help="Range end (UTC); defaults to now"),
+    fmt: str = typer.Option('ndjson', '--format', '-f', help=f"One of: {', '.join(FORMATS)}"),
+    output: Optional[Path] = typer.Option(None, '--output', '-o', help="Output file; defaults to stdout")
+):
+    """Stream stored ephemeris samples for a time range"""
+    if fmt not in FORMATS:
+        raise typer.BadParameter(f"Unknown format: {fmt}")
+    try:
+        written = asyncio.run(_export(comet, start, end or datetime.utcnow(), fmt, output))
+    except ValueError as e:
+        typer.echo(f"Error: {e}", err=True)
+        raise typer.Exit(code=1)
+    if output:
+        typer.echo(f"Wrote {written} bytes to {output}", err=True)
+
+if __name__ == '__main__':
+    app()
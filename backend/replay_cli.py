@@ -0,0 +1,71 @@
+"""Command-line replay of the Horizons response archive.
+
+    python replay_cli.py --archive /var/lib/comet-tracker/horizons
+    python replay_cli.py 3i-atlas --no-current
+
+Re-parses every archived Horizons response (see services.response_archive)
+and backfills the ephemeris store and current data without contacting
+JPL, e.g. after a parser change. Uses the same MONGO_URL / DB_NAME /
+EPHEMERIS_STORAGE_MODE / COMET_CATALOG_PATH / HORIZONS_ARCHIVE_DIR
+settings as the API server.
+"""
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import typer
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from services.comet_registry import CometRegistry
+from services.comet_service import CometService
+from services.response_archive import ResponseArchive
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+async def _replay(archive: Path, comet: Optional[str], rebuild_current: bool) -> Dict[str, int]:
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    service = CometService(
+        client[os.environ['DB_NAME']],
+        storage_mode=os.environ.get('EPHEMERIS_STORAGE_MODE', 'standard'),
+        registry=CometRegistry.from_file(os.environ.get('COMET_CATALOG_PATH')),
+        archive=ResponseArchive(archive)
+    )
+    try:
+        comet_id = None
+        if comet:
+            tracked = service.registry.get(comet)
+            if tracked is None:
+                raise typer.BadParameter(f"Unknown comet: {comet}")
+            comet_id = tracked.comet_id
+
+        await service.store.ensure_indexes()
+        return await service.replay_archive(comet_id=comet_id, rebuild_current=rebuild_current)
+    finally:
+        await service.close()
+        client.close()
+
+def main(
+    comet: Optional[str] = typer.Argument(None, help="Only replay this comet (slug or id)"),
+    archive: Optional[Path] = typer.Option(None, help="Archive directory; defaults to HORIZONS_ARCHIVE_DIR"),
+    current: bool = typer.Option(True, help="Rebuild current data from the newest dense ephemeris")
+):
+    """Backfill the stores from archived Horizons responses"""
+    archive = archive or (Path(os.environ['HORIZONS_ARCHIVE_DIR']) if os.environ.get('HORIZONS_ARCHIVE_DIR') else None)
+    if archive is None or not archive.is_dir():
+        raise typer.BadParameter("Pass --archive or set HORIZONS_ARCHIVE_DIR to an existing directory")
+
+    started = time.perf_counter()
+    stats = asyncio.run(_replay(archive, comet, current))
+    elapsed = time.perf_counter() - started
+    typer.echo(
+        f"Replayed {stats['responses']} responses ({stats['samples']} hourly samples, "
+        f"{stats['current']} current documents, {stats['skipped']} skipped) in {elapsed:.1f}s",
+        err=True
+    )
+
+if __name__ == '__main__':
+    typer.run(main)
@@ -1,52 +1,231 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List, Dict
+from fastapi import APIRouter, HTTPException, Depends, Path, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timezone
+from typing import List, Dict, Optional
+from pydantic import BaseModel, Field
 import logging
+from routes import http_cache
+from services import ephemeris_export
+from services.comet_registry import TrackedComet
 from services.comet_service import CometService
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from services.live_feed import LiveFeed
+from services.upstream_guard import UpstreamUnavailable
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/comet", tags=["comet"])
 
-# This will be set by the main server
-db_instance = None
+# This will be set by the main server on startup
+comet_service_instance: Optional[CometService] = None
+live_feed_instance: Optional[LiveFeed] = None
 
-def set_database(db: AsyncIOMotorDatabase):
-    """Set the database instance from main server"""
-    global db_instance
-    db_instance = db
+# Serialized (and compressed) response bodies, shared by every request in this worker
+response_cache = http_cache.ResponseCache()
+
+def set_comet_service(service: Optional[CometService]):
+    """Set the app-scoped comet service instance from main server"""
+    global comet_service_instance
+    comet_service_instance = service
 
 def get_comet_service() -> CometService:
-    """Dependency to get comet service instance"""
-    return CometService(db_instance)
+    """Dependency to get the shared comet service instance"""
+    if comet_service_instance is None:
+        raise HTTPException(status_code=503, detail="Comet service is not ready")
+    return comet_service_instance
+
+def set_live_feed(feed: Optional[LiveFeed]):
+    """Set the app-scoped live feed instance from main server"""
+    global live_feed_instance
+    live_feed_instance = feed
+
+def get_live_feed() -> LiveFeed:
+    """Dependency to get the shared live feed instance"""
+    if live_feed_instance is None:
+        raise HTTPException(status_code=503, detail="Live feed is not ready")
+    return live_feed_instance
+
+def resolve_comet(
+    comet_id: str = Path(..., description="Comet slug (e.g. 3i-atlas) or id (e.g. 3i_atlas)"),
+    comet_service: CometService = Depends(get_comet_service)
+) -> TrackedComet:
+    """Dependency resolving the comet path parameter against the registry"""
+    comet = comet_service.registry.get(comet_id)
+    if comet is None:
+        raise HTTPException(status_code=404, detail=f"Unknown comet: {comet_id}")
+    return comet
+
+@router.get("/catalog")
+async def get_comet_catalog(
+    comet_service: CometService = Depends(get_comet_service)
+) -> List[Dict]:
+    """List the tracked comets"""
+    return [
+        {
+            'id': comet.comet_id,
+            'slug': comet.slug,
+            'name': comet.name,
+            'designation': comet.designation
+        }
+        for comet in comet_service.registry
+    ]
 
-@router.get("/3i-atlas/current")
+@router.get("/{comet_id}/current")
 async def get_current_comet_data(
+    request: Request,
+    include_raw: bool = Query(default=True, description="Include the rawData debug excerpt"),
+    comet: TrackedComet = Depends(resolve_comet),
     comet_service: CometService = Depends(get_comet_service)
-) -> Dict:
-    """Get current 3i/Atlas comet tracking data"""
+) -> Response:
+    """Get current comet tracking data (conditional GET via ETag/If-None-Match)"""
     try:
-        logger.info("Fetching current comet data")
-        data = await comet_service.get_current_comet_data()
-        return data
+        logger.info(f"Fetching current data for {comet.comet_id}")
+        data = await comet_service.get_current_comet_data(comet.comet_id)
     except Exception as e:
         logger.error(f"Error fetching current comet data: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch comet data")
 
-@router.get("/3i-atlas/history")
+    if not include_raw:
+        data = {key: value for key, value in data.items() if key != 'rawData'}
+
+    refreshed_at = comet_service.current_refreshed_at(comet.comet_id)
+    return http_cache.conditional_response(
+        request,
+        data,
+        resource=(comet.comet_id, 'current', include_raw),
+        max_age=http_cache.current_max_age(data),
+        cache=response_cache,
+        last_modified=(
+            refreshed_at.replace(tzinfo=timezone.utc) if refreshed_at is not None
+            else http_cache.parse_timestamp(data.get('lastUpdated'))
+        ),
+        version=http_cache.snapshot_version(data, refreshed_at)
+    )
+
+@router.get("/{comet_id}/history")
 async def get_historical_comet_data(
+    request: Request,
     hours: int = Query(default=30, ge=1, le=168, description="Hours of historical data"),
+    max_points: Optional[int] = Query(default=None, ge=3, le=10000, description="Maximum number of points returned"),
+    resolution: Optional[str] = Query(default=None, pattern=r'^\d+[smhd]$', description="Point spacing, e.g. 15m, 6h, 1d"),
+    method: str = Query(default='lttb', pattern=r'^(lttb|minmax)$', description="Downsampling method"),
+    comet: TrackedComet = Depends(resolve_comet),
     comet_service: CometService = Depends(get_comet_service)
-) -> List[Dict]:
-    """Get historical 3i/Atlas comet tracking data"""
+) -> Response:
+    """Get historical comet tracking data (conditional GET via ETag/If-None-Match)"""
     try:
-        logger.info(f"Fetching {hours} hours of historical comet data")
-        data = await comet_service.get_historical_data(hours)
-        return data
+        logger.info(f"Fetching {hours} hours of historical data for {comet.comet_id}")
+        data, complete = await comet_service.get_downsampled_history(
+            hours,
+            comet.comet_id,
+            max_points=max_points,
+            resolution=resolution,
+            method=method
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching historical comet data: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch historical data")
 
+    return http_cache.conditional_response(
+        request,
+        data,
+        resource=(comet.comet_id, 'historical', hours, max_points, resolution, method),
+        max_age=http_cache.history_max_age(complete),
+        cache=response_cache,
+        last_modified=http_cache.parse_timestamp(data[-1]['timestamp']) if data else None
+    )
+
+@router.get("/{comet_id}/export")
+async def export_comet_history(
+    start: datetime = Query(..., description="Range start (UTC, ISO 8601)"),
+    end: Optional[datetime] = Query(default=None, description="Range end (UTC, ISO 8601); defaults to now"),
+    fmt: str = Query(default='ndjson', alias='format', description="Export format: ndjson, csv, arrow or parquet"),
+    comet: TrackedComet = Depends(resolve_comet),
+    comet_service: CometService = Depends(get_comet_service)
+) -> StreamingResponse:
+    """Stream stored ephemeris samples for an arbitrary range"""
+    start = _as_utc(start)
+    end = _as_utc(end) if end is not None else datetime.utcnow()
+    try:
+        body = comet_service.export_history(comet.comet_id, start, end, fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    logger.info(f"Exporting {comet.comet_id} samples {start} - {end} as {fmt}")
+    filename = f"{comet.slug}-{start:%Y%m%dT%H%M}-{end:%Y%m%dT%H%M}.{fmt}"
+    return StreamingResponse(
+        body,
+        media_type=ephemeris_export.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+def _as_utc(value: datetime) -> datetime:
+    """Naive UTC datetime, as stored in MongoDB"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+class Observer(BaseModel):
+    id: Optional[str] = None
+    latitude: float = Field(..., ge=-90, le=90, description="Geodetic latitude, degrees north")
+    longitude: float = Field(..., ge=-180, le=360, description="Longitude, degrees east")
+    elevation: float = Field(default=0.0, ge=-500, le=9000, description="Height above the WGS84 ellipsoid, metres")
+
+class VisibilityRequest(BaseModel):
+    observers: List[Observer] = Field(..., min_length=1, max_length=10000)
+    times: List[datetime] = Field(default_factory=list, max_length=1000, description="Epochs for altitude/azimuth; defaults to now")
+    start: Optional[datetime] = Field(default=None, description="Start of the rise/set search window; defaults to now")
+    hours: int = Field(default=24, ge=1, le=168, description="Length of the search window")
+    step_minutes: int = Field(default=10, ge=1, le=60, description="Search grid spacing")
+    min_altitude: float = Field(default=10.0, ge=0, le=90, description="Lowest altitude counted as visible in dark-sky windows")
+
+@router.post("/{comet_id}/visibility")
+async def get_comet_visibility(
+    body: VisibilityRequest,
+    comet: TrackedComet = Depends(resolve_comet),
+    comet_service: CometService = Depends(get_comet_service)
+) -> Dict:
+    """Altitude/azimuth, rise/transit/set and dark-sky windows for a batch of observers.
+
+    Batches are limited to visibility.MAX_CELLS observers x epochs (rise/set
+    grid plus requested times); larger ones are rejected with 400.
+    """
+    try:
+        logger.info(f"Computing visibility of {comet.comet_id} for {len(body.observers)} observers")
+        return await comet_service.get_visibility(
+            [observer.model_dump(exclude_none=True) for observer in body.observers],
+            times=[_as_utc(t) for t in body.times],
+            start=_as_utc(body.start) if body.start else None,
+            hours=body.hours,
+            step_minutes=body.step_minutes,
+            min_altitude=body.min_altitude,
+            comet_id=comet.comet_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error computing comet visibility: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to compute visibility")
+
+@router.get("/{comet_id}/stream")
+async def stream_comet_data(
+    comet: TrackedComet = Depends(resolve_comet),
+    live_feed: LiveFeed = Depends(get_live_feed)
+) -> StreamingResponse:
+    """Push current comet data as Server-Sent Events ('current' events)"""
+    logger.info(f"Opening live stream for {comet.comet_id}")
+    return StreamingResponse(
+        live_feed.stream(comet.comet_id),
+        media_type="text/event-stream",
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # disable proxy buffering (nginx)
+        }
+    )
+
 @router.get("/status")
 async def get_api_status(
     comet_service: CometService = Depends(get_comet_service)
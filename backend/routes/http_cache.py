@@ -0,0 +1,185 @@
+import gzip
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+from fastapi import Request, Response
+
+from services.memory_cache import TTLCache
+
+# Both are in requirements.txt; without them bodies fall back to the
+# stdlib json encoder and gzip is the best coding offered
+try:
+    import orjson
+except ImportError:  # faster JSON encoding
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # br content coding
+    brotli = None
+
+Payload = Union[Dict, List[Dict]]
+
+# Stale or fallback payloads may be replaced any moment; cache them briefly
+DEGRADED_MAX_AGE = 60
+
+def snapshot_version(data: Payload, refreshed_at: Optional[datetime] = None) -> str:
+    """Identifier that changes whenever the data behind a payload does.
+
+    Current payloads are re-evaluated every second from the same fit, so
+    they are keyed by the refresh that produced them (refreshed_at, or
+    lastUpdated if unknown), status and source; history windows by their
+    first and last epoch and point count.
+    """
+    if isinstance(data, dict):
+        refresh = refreshed_at.isoformat() if refreshed_at is not None else data.get('lastUpdated')
+        return f"{refresh}|{data.get('status')}|{data.get('source')}"
+    if not data:
+        return 'empty'
+    return f"{data[0].get('timestamp')}|{data[-1].get('timestamp')}|{len(data)}"
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the resource key and its snapshot version"""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for GET)"""
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    candidates = (tag.strip() for tag in header.split(','))
+    return any(tag.removeprefix('W/') == etag for tag in candidates)
+
+def current_max_age(data: Dict, now: Optional[datetime] = None) -> int:
+    """Seconds until a current payload's nextUpdate"""
+    now = now or datetime.utcnow()
+    try:
+        next_update = datetime.fromisoformat(data['nextUpdate'])
+    except (KeyError, TypeError, ValueError):
+        return 0
+    max_age = max(int((next_update - now).total_seconds()), 0)
+    if data.get('status') != 'Active':
+        max_age = min(max_age, DEGRADED_MAX_AGE)
+    return max_age
+
+def history_max_age(complete: bool = True, now: Optional[datetime] = None) -> int:
+    """Seconds until the next hourly history epoch; partial or propagated
+    windows are being filled in and get at most DEGRADED_MAX_AGE"""
+    now = now or datetime.utcnow()
+    next_epoch = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    max_age = max(int((next_epoch - now).total_seconds()), 0)
+    if not complete:
+        max_age = min(max_age, DEGRADED_MAX_AGE)
+    return max_age
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """UTC datetime (tz-aware) from an ISO timestamp in a payload, if valid"""
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+def encode_json(data: Payload) -> bytes:
+    """Compact JSON bytes (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode()
+
+def choose_encoding(request: Request) -> str:
+    """Best content coding the client accepts: 'br', 'gzip' or 'identity'"""
+    accepted = {}
+    for item in request.headers.get('accept-encoding', '').split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding] = q
+
+    wildcard = accepted.get('*', 0.0)
+    options = (['br'] if brotli is not None else []) + ['gzip']
+    best = max(options, key=lambda coding: accepted.get(coding, wildcard))
+    return best if accepted.get(best, wildcard) > 0 else 'identity'
+
+class ResponseCache:
+    """Encoded response bodies per snapshot version.
+
+    Each version (for current data: each refresh) is serialized, and
+    compressed per content coding, once; every later request for it reuses
+    the same bytes until the entry's max-age runs out.
+    """
+
+    def __init__(self, max_size: int = 256, min_compress_size: int = 1024):
+        self._bodies = TTLCache(max_size=max_size)
+        # Bodies smaller than this are sent uncompressed
+        self.min_compress_size = min_compress_size
+
+    def body(self, key: str, data: Payload, encoding: str, max_age: int) -> Tuple[bytes, str]:
+        """(body, content coding actually applied) for one representation"""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=max(max_age, 1))
+        raw = self._bodies.get((key, 'identity'), now)
+        if raw is None:
+            raw = encode_json(data)
+            self._bodies.set((key, 'identity'), raw, expires_at, now)
+
+        if encoding == 'identity' or len(raw) < self.min_compress_size:
+            return raw, 'identity'
+
+        compressed = self._bodies.get((key, encoding), now)
+        if compressed is None:
+            if encoding == 'br':
+                compressed = brotli.compress(raw, quality=5)
+            else:
+                compressed = gzip.compress(raw, compresslevel=6, mtime=0)
+            self._bodies.set((key, encoding), compressed, expires_at, now)
+        return compressed, encoding
+
+def conditional_response(
+    request: Request,
+    data: Payload,
+    resource: Tuple,
+    max_age: int,
+    cache: ResponseCache,
+    last_modified: Optional[datetime] = None,
+    version: Optional[str] = None
+) -> Response:
+    """Pre-serialized, negotiated-coding JSON response, or 304 if the client copy matches.
+
+    resource identifies the representation apart from its content (comet,
+    endpoint, window, payload options); the ETag also covers the snapshot
+    version (snapshot_version(data) unless given) and the content coding
+    applied.
+    """
+    version = make_etag(*resource, version or snapshot_version(data))
+    headers = {
+        'Cache-Control': f'public, max-age={max_age}',
+        'Vary': 'Accept-Encoding'
+    }
+    if last_modified is not None:
+        headers['Last-Modified'] = format_datetime(last_modified.replace(microsecond=0), usegmt=True)
+
+    # Revalidation needs no body: the client holds this version either in
+    # the negotiated coding or uncompressed (small bodies are never compressed)
+    encoding = choose_encoding(request)
+    for candidate in dict.fromkeys((encoding, 'identity')):
+        etag = make_etag(version, candidate)
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers={**headers, 'ETag': etag})
+
+    body, encoding = cache.body(version, data, encoding, max_age)
+    headers['ETag'] = make_etag(version, encoding)
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return Response(content=body, media_type='application/json', headers=headers)
@@ -1,15 +1,29 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+import base64
+import json
 import os
 import logging
+import time
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List
+from typing import Dict, Optional, Tuple
 import uuid
-from datetime import datetime
-from routes.comet_routes import router as comet_router, set_database
+from datetime import datetime, timedelta
+from routes.comet_routes import router as comet_router, set_comet_service, set_live_feed
+from services import metrics
+from services.comet_registry import CometRegistry
+from services.comet_service import CometService
+from services.constellations import ConstellationIndex
+from services.live_feed import LiveFeed
+from services.refresh_scheduler import RefreshScheduler
+from services.response_archive import ResponseArchive
+from services.shared_snapshot import SharedSnapshot
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -19,8 +33,27 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
-# Set the database for comet routes
-set_database(db)
+# App-scoped comet service and its background refresher, started in the startup hook
+comet_service = CometService(
+    db,
+    storage_mode=os.environ.get('EPHEMERIS_STORAGE_MODE', 'standard'),
+    registry=CometRegistry.from_file(os.environ.get('COMET_CATALOG_PATH')),
+    # IAU boundary table; the bundled Roman (1987) table unless overridden
+    constellations=ConstellationIndex.from_file(os.environ.get('CONSTELLATION_BOUNDARIES_PATH')),
+    # Workers on one host share current data through this file (optional)
+    snapshot=SharedSnapshot(os.environ['SHARED_SNAPSHOT_PATH']) if os.environ.get('SHARED_SNAPSHOT_PATH') else None,
+    # Full Horizons responses archived for offline replay (optional)
+    archive=ResponseArchive(os.environ['HORIZONS_ARCHIVE_DIR']) if os.environ.get('HORIZONS_ARCHIVE_DIR') else None,
+    # uvicorn --workers defaults to WEB_CONCURRENCY; without a shared snapshot
+    # the workers split the JPL budget between them
+    workers=int(os.environ.get('WEB_CONCURRENCY', '1'))
+)
+refresh_scheduler = RefreshScheduler(comet_service)
+
+# Status checks older than this are removed by a MongoDB TTL index
+status_check_retention = timedelta(days=int(os.environ.get('STATUS_CHECK_RETENTION_DAYS', '30')))
+STATUS_CHECK_PROJECTION = {'_id': 0, 'id': 1, 'client_name': 1, 'timestamp': 1}
+live_feed = LiveFeed(comet_service)
 
 # Create the main app without a prefix
 app = FastAPI(title="Comet Tracker API", description="Real-time comet tracking using NASA JPL data")
@@ -53,10 +86,85 @@ async def create_status_check(input: StatusCheckCreate):
     _ = await db.status_checks.insert_one(status_obj.dict())
     return status_obj
 
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+def _encode_status_cursor(doc: Dict) -> str:
+    """Opaque keyset cursor for the position after doc"""
+    raw = json.dumps([doc['timestamp'].isoformat(), doc['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def _decode_status_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, status_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), str(status_id)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {str(e)}")
+
+def _status_check_query(after: Optional[str]) -> Dict:
+    """Status checks ordered newest first, strictly after the cursor position"""
+    if not after:
+        return {}
+    timestamp, status_id = _decode_status_cursor(after)
+    return {'$or': [
+        {'timestamp': {'$lt': timestamp}},
+        {'timestamp': timestamp, 'id': {'$lt': status_id}}
+    ]}
+
+def _status_check_json(doc: Dict) -> Dict:
+    return {'id': doc['id'], 'client_name': doc['client_name'], 'timestamp': doc['timestamp'].isoformat()}
+
+STATUS_CHECK_RESPONSES = {
+    200: {
+        'description': "One page of status checks as a JSON array, or with stream=true every remaining check as NDJSON",
+        'headers': {
+            'X-Next-Cursor': {'description': "Cursor for the next page (full pages only)", 'schema': {'type': 'string'}},
+            'Link': {'description': 'rel="next" link to the next page (full pages only)', 'schema': {'type': 'string'}}
+        },
+        'content': {
+            'application/json': {'schema': {'type': 'array', 'items': {'$ref': '#/components/schemas/StatusCheck'}}},
+            'application/x-ndjson': {'schema': {'type': 'string', 'description': "One StatusCheck JSON object per line"}}
+        }
+    },
+    400: {'description': "Malformed cursor"}
+}
+
+@api_router.get("/status", responses=STATUS_CHECK_RESPONSES)
+async def get_status_checks(
+    limit: int = Query(default=1000, ge=1, le=1000, description="Page size"),
+    after: Optional[str] = Query(default=None, description="Cursor from the previous page's X-Next-Cursor header"),
+    stream: bool = Query(default=False, description="Stream every remaining check as NDJSON instead of one page")
+):
+    """List status checks, newest first.
+
+    Pages are keyset-paginated on (timestamp, id) and hold up to 1000
+    checks by default, as the unpaginated list did: the X-Next-Cursor
+    header (and a rel="next" Link) points at the next page. With
+    stream=true the remaining checks are streamed as NDJSON straight from
+    the cursor, without building the whole list in memory.
+    """
+    cursor = db.status_checks.find(
+        _status_check_query(after),
+        STATUS_CHECK_PROJECTION
+    ).sort([('timestamp', DESCENDING), ('id', DESCENDING)])
+
+    if stream:
+        async def ndjson():
+            async for doc in cursor.batch_size(1000):
+                yield (json.dumps(_status_check_json(doc)) + '\n').encode()
+
+        return StreamingResponse(ndjson(), media_type='application/x-ndjson')
+
+    docs = await cursor.limit(limit).to_list(length=limit)
+    headers = {}
+    if len(docs) == limit:
+        next_cursor = _encode_status_cursor(docs[-1])
+        headers['X-Next-Cursor'] = next_cursor
+        headers['Link'] = f'</api/status?limit={limit}&after={next_cursor}>; rel="next"'
+    return JSONResponse([_status_check_json(doc) for doc in docs], headers=headers)
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Service metrics in the Prometheus text exposition format"""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 # Include comet tracking routes
 api_router.include_router(comet_router)
@@ -64,6 +172,30 @@ api_router.include_router(comet_router)
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """Record request latency and return the request's spans in a Server-Timing header"""
+    spans = metrics.start_request_timing()
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+
+    # call_next returns once headers are ready, so for a streamed body
+    # (/stream, /export, /status?stream=true) elapsed is only the time to
+    # first byte; those are left out of the latency histogram. Streamed
+    # bodies are the ones sent without a Content-Length.
+    streamed = 'content-length' not in response.headers and response.status_code not in (204, 304)
+    if not streamed:
+        route = request.scope.get('route')
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            elapsed,
+            method=request.method,
+            route=getattr(route, 'path', 'unmatched'),
+            status=response.status_code
+        )
+    response.headers['Server-Timing'] = metrics.server_timing_header(spans, elapsed)
+    return response
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -83,17 +215,44 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def ensure_status_check_indexes():
+    """Keyset index for listing and a TTL index enforcing status_check_retention"""
+    await db.status_checks.create_index([('timestamp', DESCENDING), ('id', DESCENDING)])
+    expire_after = int(status_check_retention.total_seconds())
+    try:
+        await db.status_checks.create_index([('timestamp', ASCENDING)], expireAfterSeconds=expire_after)
+    except OperationFailure as e:
+        if e.code != 85:  # IndexOptionsConflict: retention changed since the index was built
+            raise
+        await db.command(
+            'collMod',
+            'status_checks',
+            index={'keyPattern': {'timestamp': 1}, 'expireAfterSeconds': expire_after}
+        )
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("Comet Tracker API starting up")
     # Create indexes for better performance
     try:
         await db.comet_data.create_index([("cometId", 1), ("dataType", 1), ("timestamp", -1)])
+        await comet_service.store.ensure_indexes()
+        await ensure_status_check_indexes()
         logger.info("Database indexes created successfully")
     except Exception as e:
         logger.warning(f"Failed to create indexes: {str(e)}")
+    
+    await comet_service.start()
+    set_comet_service(comet_service)
+    set_live_feed(live_feed)
+    refresh_scheduler.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     logger.info("Shutting down Comet Tracker API")
+    await refresh_scheduler.stop()
+    set_live_feed(None)
+    await live_feed.stop()
+    set_comet_service(None)
+    await comet_service.close()
     client.close()
\ No newline at end of file
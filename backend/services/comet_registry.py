@@ -0,0 +1,94 @@
+import json
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, Optional
+
+from services.orbit_propagator import OrbitalElements
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class TrackedComet:
+    """One object tracked by CometService"""
+    slug: str              # URL identifier, e.g. '3i-atlas'
+    comet_id: str          # storage identifier (cometId in MongoDB), e.g. '3i_atlas'
+    horizons_id: str       # Horizons COMMAND value
+    name: str
+    designation: str
+    elements: Optional[OrbitalElements] = None  # seed for the offline propagator
+
+ATLAS_3I = TrackedComet(
+    slug='3i-atlas',
+    comet_id='3i_atlas',
+    horizons_id='90003242',  # 3I/ATLAS designation in JPL system
+    name='3i/Atlas',
+    designation='C/2025 A1',
+    elements=OrbitalElements(
+        eccentricity=6.139587836355706,
+        perihelion_distance=1.356419039495192,
+        perihelion_time=2460977.9814392594,
+        inclination=175.1131015287974,
+        ascending_node=322.1568699043938,
+        argument_of_perihelion=128.0099421020839
+    )
+)
+
+class CometRegistry:
+    """Catalog of tracked objects, looked up by slug or storage id"""
+
+    def __init__(self, comets: Iterable[TrackedComet] = (ATLAS_3I,)):
+        self._comets: Dict[str, TrackedComet] = {}
+        self._aliases: Dict[str, str] = {}
+        for comet in comets:
+            self.register(comet)
+
+    def register(self, comet: TrackedComet):
+        """Add or replace a tracked object"""
+        self._comets[comet.comet_id] = comet
+        self._aliases[comet.slug] = comet.comet_id
+
+    def get(self, key: str) -> Optional[TrackedComet]:
+        """Find an object by slug or comet_id"""
+        return self._comets.get(self._aliases.get(key, key))
+
+    def __iter__(self) -> Iterator[TrackedComet]:
+        return iter(list(self._comets.values()))
+
+    def __len__(self) -> int:
+        return len(self._comets)
+
+    @classmethod
+    def from_file(cls, path: Optional[str]) -> 'CometRegistry':
+        """Built-in catalog plus the objects listed in a JSON catalog file.
+
+        The file holds a list of objects with slug, cometId, horizonsId,
+        name, designation and optionally the osculating elements as
+        {"eccentricity": ..., "perihelion_distance": ..., ...}.
+        """
+        registry = cls()
+        if not path:
+            return registry
+
+        try:
+            with open(path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load comet catalog {path}: {str(e)}")
+            return registry
+
+        for entry in entries:
+            try:
+                elements = entry.get('elements')
+                registry.register(TrackedComet(
+                    slug=entry['slug'],
+                    comet_id=entry['cometId'],
+                    horizons_id=str(entry['horizonsId']),
+                    name=entry['name'],
+                    designation=entry.get('designation', ''),
+                    elements=OrbitalElements(**elements) if elements else None
+                ))
+            except (KeyError, TypeError) as e:
+                logger.error(f"Skipping invalid comet catalog entry {entry!r}: {str(e)}")
+
+        logger.info(f"Tracking {len(registry)} comets")
+        return registry
@@ -1,84 +1,737 @@
-import requests
+import httpx
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import asyncio
 import json
-import re
+import time
+import numpy as np
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+from services import downsampling, ephemeris_export, ephemeris_store, horizons_parser, lunar, metrics, orbit_propagator, visibility
+from services.comet_registry import CometRegistry, TrackedComet
+from services.constellations import ConstellationIndex
+from services.ephemeris_interpolator import EphemerisInterpolator
+from services.memory_cache import TTLCache
+from services.parse_pool import ParsePool
+from services.response_archive import ResponseArchive
+from services.shared_snapshot import SharedSnapshot, SnapshotEntry
+from services.single_flight import SingleFlight
+from services.upstream_guard import CircuitBreaker, TokenBucket, UpstreamUnavailable, backoff_delay
+from services.upstream_health import UpstreamHealth
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_COMET_ID = '3i_atlas'
+
+class CometState:
+    """Per-object runtime state kept by CometService"""
+
+    def __init__(self, comet: TrackedComet):
+        self.comet = comet
+        # Local ephemeris fit answering "current" until its span runs out
+        self.ephemeris: Optional[EphemerisInterpolator] = None
+        self.ephemeris_raw = ''
+        self.current_tick = None
+        # Osculating elements seeding the offline propagator; replaced by the
+        # ones in each Horizons response header
+        self.elements = comet.elements
+        # Consecutive failed refreshes per data type; past max_refresh_failures
+        # requests for that type stop serving stale data as if it were current
+        # and use the fallback chain. Refusals by the upstream guard (open
+        # circuit, empty token bucket, follower) are not failures.
+        self.refresh_failures = {'current': 0, 'historical': 0}
+        # Newest current payload and when it was cached, for the shared snapshot
+        self.cached_current: Optional[Tuple[datetime, Dict]] = None
+        # When the current data being served was refreshed, by this or any
+        # other worker; payloads evaluated from one fit share it
+        self.refreshed_at: Optional[datetime] = None
+
 class CometService:
-    def __init__(self, db: AsyncIOMotorDatabase):
+    """App-scoped comet tracking service.
+
+    One instance is created in the server startup hook and shared by every
+    request, so the in-flight fetch registry, the L1 cache and the pooled
+    HTTP client all live for the lifetime of the worker. Call start() before
+    use and close() on shutdown. Every tracked object in the registry gets
+    its own CometState; caches and stores are keyed by its comet_id.
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        http_client: Optional[httpx.AsyncClient] = None,
+        storage_mode: str = 'standard',
+        registry: Optional[CometRegistry] = None,
+        constellations: Optional[ConstellationIndex] = None,
+        snapshot: Optional[SharedSnapshot] = None,
+        archive: Optional[ResponseArchive] = None,
+        workers: int = 1
+    ):
         self.db = db
         self.base_url = "https://ssd.jpl.nasa.gov/api/horizons.api"
-        self.comet_id = "90003242"  # 3I/ATLAS designation in JPL system
+        self.registry = registry or CometRegistry()
+        # Boundary index labelling every ephemeris sample with its constellation
+        self.constellations = constellations if constellations is not None else ConstellationIndex.from_file(None)
         self.cache_duration = 15  # minutes
-        
-    async def get_current_comet_data(self) -> Dict:
+        # Dense ephemeris fetched per JPL call and fitted for local
+        # interpolation; refilled once less than the margin is left
+        self.ephemeris_span = timedelta(days=3)
+        self.ephemeris_step = '10m'
+        self.ephemeris_refill_margin = timedelta(hours=6)
+        self.http_client = http_client
+        # Coalesces concurrent upstream fetches for the same comet/data type
+        self._flights = SingleFlight()
+        # In-process L1 in front of the comet_data collection. Entries never
+        # outlive the Mongo document they mirror (see _l1_expiry).
+        self._l1 = TTLCache(max_size=1024)
+        self.max_refresh_failures = 3
+        # Permanent per-epoch history; refreshes only fetch missing ranges
+        self.store = ephemeris_store.EphemerisStore(db, mode=storage_mode)
+        self.max_history_gap_fetches = 3
+        # (comet_id, hours) windows requested recently, kept fresh by the
+        # scheduler; seeded with the frontend's default window
+        self.tracked_hours: Dict[Tuple[str, int], datetime] = {(DEFAULT_COMET_ID, 30): datetime.utcnow()}
+        self._states: Dict[str, CometState] = {}
+        self._background_tasks = set()
+        # Current documents waiting to be written in one bulk_write
+        self._pending_current: Dict[str, Dict] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        # Upstream health, fed by every JPL request and reported by /status
+        self.upstream_health = UpstreamHealth()
+        # Host-wide JPL budget (contracts.md: ~1000 requests/hour), bursts of up
+        # to 100. With a shared snapshot only the leader worker calls JPL and
+        # holds all of it; otherwise each of the workers gets an equal share
+        share = 1 if snapshot is not None else max(workers, 1)
+        self.rate_limiter = TokenBucket.per_hour(1000 // share, burst=max(100 // share, 1))
+        # Fails JPL calls fast while Horizons is down or very slow
+        self.circuit = CircuitBreaker()
+        # Attempts per JPL call for connection errors and 429/5xx answers
+        self.max_attempts = 3
+        # Timestamp of the newest current document, kept in memory for /status
+        self.last_update: Optional[datetime] = None
+        # Full ephemeris responses kept on disk for offline re-parsing (optional)
+        self.archive = archive
+        # Large Horizons responses are parsed in worker processes, off the event loop
+        self.parse_pool = ParsePool()
+        # Host-wide snapshot shared with the other workers: the leader writes
+        # the comets it refreshed, followers poll it at most once per interval
+        # and never call JPL themselves
+        self.snapshot = snapshot
+        self.snapshot_check_interval = 1.0  # seconds
+        self._snapshot_checked = 0.0
+        # Comets refreshed since the last snapshot write, written by one task
+        self._pending_snapshot: Dict[str, SnapshotEntry] = {}
+        self._snapshot_task: Optional[asyncio.Task] = None
+        # Followers re-forward their history windows to the leader at least this often
+        self.window_forward_interval = 300.0  # seconds
+        self._forwarded_windows: Tuple[frozenset, float] = (frozenset(), 0.0)
+
+    async def start(self):
+        """Open the pooled keep-alive HTTP client used for JPL requests"""
+        if self.http_client is None:
+            self.http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(30.0, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=10,
+                    max_keepalive_connections=5,
+                    keepalive_expiry=120.0
+                ),
+                headers={'User-Agent': 'comet-tracker/1.0'}
+            )
+            logger.info("Comet service HTTP client started")
+
+        if self.last_update is None:
+            try:
+                last_update = await self.db.comet_data.find_one(
+                    {'dataType': 'current'},
+                    sort=[('timestamp', -1)]
+                )
+                if last_update:
+                    self.last_update = last_update['timestamp']
+            except Exception as e:
+                logger.warning(f"Could not read last update time: {str(e)}")
+
+    async def close(self):
+        """Flush pending cache writes, close the HTTP client and release pooled connections"""
+        await self.flush_cache_writes()
+        if self._snapshot_task is not None:
+            await self._snapshot_task
+        self.parse_pool.close()
+        if self.snapshot is not None:
+            self.snapshot.release()
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+            logger.info("Comet service HTTP client closed")
+
+    def _state(self, comet_id: str) -> CometState:
+        """Runtime state for a tracked object; raises KeyError for unknown ids"""
+        state = self._states.get(comet_id)
+        if state is None:
+            comet = self.registry.get(comet_id)
+            if comet is None:
+                raise KeyError(f"Unknown comet: {comet_id}")
+            state = self._states[comet_id] = CometState(comet)
+        return state
+
+    async def _horizons_get(self, params: Optional[Dict] = None, timeout: float = 30) -> httpx.Response:
+        """GET the Horizons API through the shared connection pool.
+
+        Every attempt takes a token from the shared rate limiter and is
+        refused outright while the circuit breaker is open (or on a snapshot
+        follower), raising UpstreamUnavailable so callers fall back to
+        cached data at once.
+        Connection errors and 429/5xx answers are retried with jittered
+        exponential backoff; timeouts are not, so a slow Horizons costs one
+        timeout per call, not max_attempts of them. The outcome and latency
+        of every attempt are recorded in upstream_health.
+        """
+        if not self.calls_upstream():
+            raise UpstreamUnavailable("JPL is only called by the shared snapshot leader")
+        if self.http_client is None:
+            await self.start()
+
+        for attempt in range(self.max_attempts):
+            if self.rate_limiter.available() < 1:
+                metrics.JPL_REJECTED.inc(reason='rate_limit')
+                raise UpstreamUnavailable(
+                    f"JPL rate limit reached, next call in {self.rate_limiter.wait_time():.0f}s"
+                )
+            if not self.circuit.allow():
+                metrics.JPL_REJECTED.inc(reason='circuit_open')
+                raise UpstreamUnavailable(
+                    f"JPL circuit open, retry in {self.circuit.retry_after():.0f}s"
+                )
+            self.rate_limiter.try_acquire()
+
+            started = time.perf_counter()
+            try:
+                response = await self.http_client.get(self.base_url, params=params, timeout=timeout)
+            except asyncio.CancelledError:
+                self.circuit.abandon()
+                raise
+            except Exception as e:
+                latency = time.perf_counter() - started
+                self._record_jpl_metrics(latency, None)
+                self.upstream_health.record(False, latency, error=str(e) or type(e).__name__)
+                self._record_circuit(self.circuit.record_failure)
+                retryable = isinstance(e, httpx.TransportError) and not isinstance(e, httpx.TimeoutException)
+                if not retryable or attempt + 1 == self.max_attempts:
+                    raise
+                logger.warning(f"JPL request failed ({str(e) or type(e).__name__}), retrying")
+            else:
+                latency = time.perf_counter() - started
+                self._record_jpl_metrics(latency, response.status_code)
+                ok = response.status_code == 200
+                self.upstream_health.record(ok, latency, status_code=response.status_code)
+                if response.status_code == 429 or response.status_code >= 500:
+                    self._record_circuit(self.circuit.record_failure)
+                    if attempt + 1 == self.max_attempts:
+                        return response
+                    logger.warning(f"JPL API returned status {response.status_code}, retrying")
+                else:
+                    self._record_circuit(self.circuit.record_success, latency)
+                    if ok:
+                        self._archive_response(params, response.text)
+                    return response
+
+            await asyncio.sleep(backoff_delay(attempt))
+
+    def _record_circuit(self, record, *args):
+        """Feed an outcome to the circuit breaker, logging once per state change"""
+        before = self.circuit.state
+        record(*args)
+        after = self.circuit.state
+        if after == before:
+            return
+        if after == CircuitBreaker.OPEN:
+            logger.warning(
+                f"JPL circuit opened after {self.circuit.consecutive_failures} failures; "
+                f"serving cached data for the next {self.circuit.retry_after():.0f}s"
+            )
+        elif after == CircuitBreaker.CLOSED:
+            logger.info("JPL circuit closed, upstream calls resumed")
+
+    def _archive_response(self, params: Optional[Dict], response_text: str):
+        """Compress an ephemeris response into the archive on a worker thread"""
+        if self.archive is None or not params or 'START_TIME' not in params:
+            return
+
+        async def run():
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.archive.save, params, response_text)
+            except Exception as e:
+                logger.error(f"Could not archive Horizons response: {str(e)}")
+
+        task = asyncio.ensure_future(run())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def _record_jpl_metrics(self, latency: float, status_code: Optional[int]):
+        outcome = 'ok' if status_code == 200 else 'error'
+        metrics.JPL_REQUEST_SECONDS.observe(latency, outcome=outcome)
+        metrics.JPL_RESPONSES.inc(status=str(status_code) if status_code is not None else 'error')
+        metrics.record_span('jpl', latency)
+
+    def calls_upstream(self) -> bool:
+        """False on snapshot followers, which leave every JPL call to the leader worker"""
+        return self.snapshot is None or self.snapshot.is_leader
+
+    def upstream_calls_remaining(self) -> int:
+        """JPL calls that may be started now: rate-limiter tokens, or 0 while the circuit is open"""
+        if self.circuit.state == CircuitBreaker.OPEN:
+            return 0
+        return int(self.rate_limiter.available())
+
+    async def probe_upstream(self):
+        """Send a lightweight request to JPL purely to refresh upstream_health"""
+        try:
+            await self._horizons_get(timeout=10)
+        except Exception as e:
+            logger.warning(f"JPL health probe failed: {str(e)}")
+
+    async def get_current_comet_data(self, comet_id: str = DEFAULT_COMET_ID) -> Dict:
         """Get current comet data, using cache if available"""
+        state = self._state(comet_id)
+        self._sync_snapshot()
         try:
+            # Evaluate the local ephemeris fit when it covers now; JPL is only
+            # needed again once the fitted span runs out
+            now = datetime.utcnow()
+            if self._ephemeris_covers(state, now):
+                metrics.CACHE_REQUESTS.inc(data_type='current', result='hit')
+                if self.calls_upstream() and (
+                    state.refreshed_at is None
+                    or now - state.refreshed_at >= timedelta(minutes=self.cache_duration)
+                ):
+                    # The fit still covers now but its refresh is due: start the
+                    # next one so nextUpdate (and the ETag version) moves on
+                    self._revalidate((comet_id, 'current'), lambda: self._refresh_current(comet_id))
+                return self._build_current_payload(state, now)
+
             # Check cache first
-            cached_data = await self._get_cached_data()
+            cached_data = await self._get_cached_data(comet_id)
             if cached_data:
                 logger.info("Returning cached comet data")
+                metrics.CACHE_REQUESTS.inc(data_type='current', result='hit')
                 return cached_data
-            
-            # Fetch fresh data from JPL
-            logger.info("Fetching fresh data from JPL Horizons API")
-            fresh_data = await self._fetch_from_jpl()
-            
-            # Cache the fresh data
-            await self._cache_data(fresh_data)
-            
-            return fresh_data
-            
+
+            if not self.calls_upstream():
+                # Follower: the leader's next refresh arrives through the snapshot
+                last_known = await self._get_last_known_data(comet_id)
+                if last_known:
+                    metrics.CACHE_REQUESTS.inc(data_type='current', result='stale')
+                    last_known['source'] = 'Cached JPL Data'
+                    return last_known
+
+            elif not self.refresh_failing(comet_id, 'current'):
+                # Stale-while-revalidate: answer from the last known document
+                # and let a background refresh replace it
+                last_known = await self._get_last_known_data(comet_id)
+                if last_known:
+                    logger.info("Returning stale comet data while refreshing")
+                    metrics.CACHE_REQUESTS.inc(data_type='current', result='stale')
+                    self._revalidate((comet_id, 'current'), lambda: self._refresh_current(comet_id))
+                    last_known['source'] = 'Cached JPL Data'
+                    return last_known
+
+                # Cold cache: fetch from JPL, sharing one fetch among concurrent misses
+                metrics.CACHE_REQUESTS.inc(data_type='current', result='miss')
+                return await self._flights.do((comet_id, 'current'), lambda: self._refresh_current(comet_id))
+
+        except UpstreamUnavailable as e:
+            logger.debug(f"Serving fallback comet data: {str(e)}")
         except Exception as e:
             logger.error(f"Error fetching comet data: {str(e)}")
-            # Try to return last known data from cache
-            last_known = await self._get_last_known_data()
-            if last_known:
-                last_known['status'] = 'Data updating...'
-                return last_known
-            
-            # Return fallback data if all else fails
-            return self._get_fallback_data()
-    
-    async def get_historical_data(self, hours: int = 30) -> List[Dict]:
+
+        # The refresher keeps failing (or the cold fetch failed): try to
+        # return last known data from cache
+        last_known = await self._get_last_known_data(comet_id)
+        if last_known:
+            metrics.FALLBACKS.inc(data_type='current', kind='last_known')
+            last_known['status'] = 'Data updating...'
+            return last_known
+
+        # Return fallback data if all else fails
+        metrics.FALLBACKS.inc(data_type='current', kind='propagated')
+        return self._get_fallback_data(comet_id)
+
+    async def get_historical_data(self, hours: int = 30, comet_id: str = DEFAULT_COMET_ID) -> List[Dict]:
         """Get historical comet tracking data"""
+        history, _ = await self._get_history(hours, comet_id)
+        return history
+
+    async def _get_history(self, hours: int, comet_id: str) -> Tuple[List[Dict], bool]:
+        """Historical data and whether it is the complete stored window.
+
+        Partial windows (served while their gaps are fetched) and propagated
+        fallback points are not complete and may change before the next
+        hourly epoch.
+        """
+        self._state(comet_id)
+        self.tracked_hours[(comet_id, hours)] = datetime.utcnow()
+        self._sync_snapshot()
+        key = (comet_id, 'historical', hours)
         try:
-            # Check if we have historical data in cache
-            historical_data = await self._get_historical_cache(hours)
+            cached_data = self._l1.get(key)
+            if cached_data:
+                metrics.CACHE_REQUESTS.inc(data_type='historical', result='hit')
+                return cached_data, True
+
+            # Check which epochs of the window are already stored
+            historical_data, gaps = await self._get_historical_cache(comet_id, hours)
+            if not gaps:
+                metrics.CACHE_REQUESTS.inc(data_type='historical', result='hit')
+                return historical_data, True
+
+            if not self.calls_upstream():
+                # Follower: the window was forwarded to the leader, which fills it
+                if historical_data:
+                    metrics.CACHE_REQUESTS.inc(data_type='historical', result='stale')
+                    return historical_data, False
+
+            elif not self.refresh_failing(comet_id, 'historical'):
+                if historical_data:
+                    # Serve what is stored while the missing epochs are fetched
+                    metrics.CACHE_REQUESTS.inc(data_type='historical', result='stale')
+                    self._revalidate(key, lambda: self._refresh_historical(comet_id, hours))
+                    return historical_data, False
+
+                # Fetch historical data from JPL, one fetch per hours value
+                metrics.CACHE_REQUESTS.inc(data_type='historical', result='miss')
+                historical_data = await self._flights.do(key, lambda: self._refresh_historical(comet_id, hours))
+                return historical_data, len(historical_data) == hours + 1
+
             if historical_data:
-                return historical_data
-            
-            # Fetch historical data from JPL
-            historical_data = await self._fetch_historical_from_jpl(hours)
-            
-            # Cache historical data
-            await self._cache_historical_data(historical_data)
-            
-            return historical_data
-            
+                metrics.FALLBACKS.inc(data_type='historical', kind='partial')
+                return historical_data, False
+
+        except UpstreamUnavailable as e:
+            logger.debug(f"Serving fallback historical data: {str(e)}")
         except Exception as e:
             logger.error(f"Error fetching historical data: {str(e)}")
-            return []
-    
-    async def _fetch_from_jpl(self) -> Dict:
-        """Fetch current data from JPL Horizons API"""
+
+        metrics.FALLBACKS.inc(data_type='historical', kind='propagated')
+        return self._get_fallback_history(comet_id, hours), False
+
+    async def get_downsampled_history(
+        self,
+        hours: int = 30,
+        comet_id: str = DEFAULT_COMET_ID,
+        max_points: Optional[int] = None,
+        resolution: Optional[str] = None,
+        method: str = 'lttb'
+    ) -> Tuple[List[Dict], bool]:
+        """Historical data reduced to max_points and/or one point per resolution
+        interval, and whether the window behind it is complete.
+
+        Points are picked by shape-preserving downsampling of the distance
+        series; complete windows are cached in L1 per (window, resolution)
+        until the next hourly epoch.
+        """
+        points = self._target_points(hours, max_points, resolution)
+        if points is None:
+            return await self._get_history(hours, comet_id)
+
+        key = (comet_id, 'historical', hours, method, points)
+        cached_data = self._l1.get(key)
+        if cached_data:
+            return cached_data, True
+
+        history, complete = await self._get_history(hours, comet_id)
+        if len(history) <= points:
+            return history, complete
+
+        times = np.array([point['timestamp'] for point in history], dtype='datetime64[s]')
+        distances = np.array([point['distance'] for point in history], dtype=np.float64)
+        indices = downsampling.downsample(times.astype(np.float64), distances, points, method)
+        downsampled = [history[i] for i in indices.tolist()]
+
+        if complete:
+            _, end = self._history_window(hours)
+            self._l1.set(key, downsampled, end + timedelta(hours=1))
+        return downsampled, complete
+
+    def _target_points(self, hours: int, max_points: Optional[int], resolution: Optional[str]) -> Optional[int]:
+        """Point budget for a window from max_points and a resolution like '6h'"""
+        points = max_points
+        if resolution:
+            step = downsampling.parse_resolution(resolution)
+            buckets = int(np.timedelta64(hours, 'h') // step) + 1
+            points = buckets if points is None else min(points, buckets)
+        return points
+
+    def export_history(
+        self,
+        comet_id: str,
+        start: datetime,
+        end: datetime,
+        fmt: str = 'ndjson'
+    ) -> AsyncIterator[bytes]:
+        """Stream every stored sample of start..end in an export format (see ephemeris_export)"""
+        self._state(comet_id)
+        return ephemeris_export.export_ephemeris(self.store, comet_id, start, end, fmt)
+
+    async def replay_archive(
+        self,
+        archive: Optional[ResponseArchive] = None,
+        comet_id: Optional[str] = None,
+        rebuild_current: bool = True
+    ) -> Dict[str, int]:
+        """Backfill the stores from archived Horizons responses without any network access.
+
+        Every archived response of a tracked comet (or only comet_id) is
+        re-parsed, through the parse pool so large files use every core,
+        and its hourly epochs are written to the ephemeris store. With
+        rebuild_current, the newest dense ephemeris of each comet becomes
+        its local fit again and, if it still covers now, current data is
+        rebuilt from it and cached as after a live refresh.
+        """
+        archive = archive or self.archive
+        if archive is None:
+            raise ValueError("No response archive configured")
+
+        comets = {comet.horizons_id: comet for comet in self.registry}
+        loop = asyncio.get_running_loop()
+        stats = {'responses': 0, 'skipped': 0, 'samples': 0, 'current': 0}
+        dense: Dict[str, Tuple[str, horizons_parser.Ephemeris]] = {}
+
+        async def parse(path) -> Optional[Tuple[str, horizons_parser.Ephemeris]]:
+            _, response_text = await loop.run_in_executor(None, archive.load, path)
+            try:
+                return response_text, await self.parse_pool.parse(response_text, kind='replay')
+            except ValueError as e:
+                logger.warning(f"Skipping archived response {path.name}: {str(e)}")
+                return None
+
+        archived = archive.entries()
+        entries = [
+            (comets[metadata['params'].get('COMMAND')], metadata, path)
+            for metadata, path in archived
+            if metadata['params'].get('COMMAND') in comets
+        ]
+        entries = [entry for entry in entries if not comet_id or entry[0].comet_id == comet_id]
+        stats['skipped'] = len(archived) - len(entries)
+
+        # Parse a batch concurrently (one response per pool worker, plus one
+        # inline), then write it in fetch order so the newest response wins
+        batch_size = self.parse_pool.max_workers + 1
+        for i in range(0, len(entries), batch_size):
+            batch = entries[i:i + batch_size]
+            parsed = await asyncio.gather(*(parse(path) for _, _, path in batch))
+            for (comet, metadata, _), result in zip(batch, parsed):
+                if result is None:
+                    stats['skipped'] += 1
+                    continue
+                response_text, ephem = result
+                hourly = ephem.time.astype('datetime64[h]') == ephem.time
+                await self.store.write(comet.comet_id, ephem.take(hourly))
+                stats['responses'] += 1
+                stats['samples'] += int(hourly.sum())
+                if metadata['params'].get('STEP_SIZE') == self.ephemeris_step:
+                    dense[comet.comet_id] = (response_text, ephem)
+
+        if rebuild_current:
+            now = datetime.utcnow()
+            for replayed_id, (response_text, ephem) in dense.items():
+                if len(ephem) < 2:
+                    continue
+                state = self._state(replayed_id)
+                state.ephemeris = EphemerisInterpolator(ephem)
+                state.current_tick = None
+                elements = orbit_propagator.parse_elements(response_text)
+                if elements is not None:
+                    state.elements = elements
+                state.ephemeris_raw = response_text[:500]
+                if self._ephemeris_covers(state, now):
+                    self._cache_data(replayed_id, self._build_current_payload(state, now, refreshed_at=now))
+                    stats['current'] += 1
+            await self.flush_cache_writes()
+
+        logger.info(f"Replayed response archive: {stats}")
+        return stats
+
+    async def geocentric_ephemeris(self, times: np.ndarray, comet_id: str = DEFAULT_COMET_ID) -> horizons_parser.Ephemeris:
+        """Geocentric ephemeris at arbitrary epochs without a JPL call per request.
+
+        Evaluated from the local ephemeris fit where it spans every epoch,
+        otherwise propagated from the osculating elements.
+        """
+        state = self._state(comet_id)
+        self._sync_snapshot()
+        if state.ephemeris is None:
+            # Loads the fit (and elements) the first time this comet is asked for
+            await self.get_current_comet_data(comet_id)
+        if self._ephemeris_covers(state, times):
+            return state.ephemeris.evaluate(times)
+        if state.elements is None:
+            raise UpstreamUnavailable(f"No ephemeris or orbital elements available for {comet_id}")
+        ephem, _ = orbit_propagator.geocentric_ephemeris(state.elements, times)
+        return ephem
+
+    async def get_visibility(
+        self,
+        observers: List[Dict],
+        times: Optional[List[datetime]] = None,
+        start: Optional[datetime] = None,
+        hours: int = 24,
+        step_minutes: int = 10,
+        min_altitude: float = 10.0,
+        comet_id: str = DEFAULT_COMET_ID
+    ) -> Dict:
+        """Topocentric visibility for a batch of observers (see services.visibility).
+
+        Each observer dict needs latitude, longitude and elevation (m).
+        Altitude/azimuth are given at every requested time; rise, transit,
+        set and dark-sky windows are searched over start..start+hours on a
+        step_minutes grid. One ephemeris is evaluated for all observers; the
+        per-observer work runs in chunks on a worker thread. Raises
+        ValueError for batches over visibility.MAX_CELLS observer-epochs.
+        """
+        start = start or datetime.utcnow().replace(second=0, microsecond=0)
+        grid = np.datetime64(start, 'ms') + np.arange(0, hours * 60 + 1, step_minutes) * np.timedelta64(1, 'm')
+        at = np.array(times or [start], dtype='datetime64[ms]')
+
+        cells = len(observers) * (len(grid) + len(at))
+        if cells > visibility.MAX_CELLS:
+            raise ValueError(
+                f"{len(observers)} observers x {len(grid) + len(at)} epochs exceeds the limit of "
+                f"{visibility.MAX_CELLS} observer-epochs per request; use fewer observers, "
+                f"a shorter window or a larger step"
+            )
+
+        positions = await self.geocentric_ephemeris(at, comet_id)
+        search = await self.geocentric_ephemeris(grid, comet_id)
+        results = await asyncio.to_thread(
+            visibility.observer_visibility, observers, at, positions, search, min_altitude
+        )
+        return {
+            'cometId': comet_id,
+            'searchStart': visibility.isoformat(grid[0]),
+            'searchEnd': visibility.isoformat(grid[-1]),
+            'stepMinutes': step_minutes,
+            'minAltitude': min_altitude,
+            'observers': results
+        }
+
+    def current_refreshed_at(self, comet_id: str = DEFAULT_COMET_ID) -> Optional[datetime]:
+        """Refresh time of the current data being served; identifies it across per-second re-evaluation"""
+        return self._state(comet_id).refreshed_at
+
+    def refresh_failing(self, comet_id: str = DEFAULT_COMET_ID, data_type: str = 'current') -> bool:
+        """True once data_type refreshes have failed max_refresh_failures times in a row"""
+        return self._state(comet_id).refresh_failures[data_type] >= self.max_refresh_failures
+
+    def needs_upstream(self, comet_id: str) -> bool:
+        """True if the next current refresh for comet_id has to call JPL"""
+        return not self._ephemeris_covers(self._state(comet_id), datetime.utcnow() + self.ephemeris_refill_margin)
+
+    async def refresh_current(self, comet_id: str = DEFAULT_COMET_ID, max_age: Optional[timedelta] = None) -> Dict:
+        """Refresh current data unless the cached copy is younger than max_age.
+
+        Used by the background scheduler. A copy that another worker already
+        refreshed is adopted instead of fetching again.
+        """
+        return await self._flights.do(
+            (comet_id, 'current'),
+            lambda: self._refresh_current(comet_id, max_age)
+        )
+
+    async def refresh_historical(self, hours: int, comet_id: str = DEFAULT_COMET_ID) -> List[Dict]:
+        """Fetch any epochs of the hours window that are not stored yet"""
+        return await self._flights.do(
+            (comet_id, 'historical', hours),
+            lambda: self._refresh_historical(comet_id, hours)
+        )
+
+    def _revalidate(self, key, fn):
+        """Start a background refresh for key unless one is already running"""
+        if self._flights.in_flight(key):
+            return
+
+        async def run():
+            try:
+                await self._flights.do(key, fn)
+            except UpstreamUnavailable as e:
+                # Expected while the circuit is open; logged once by _record_circuit
+                logger.debug(f"Background refresh of {key} skipped: {str(e)}")
+            except Exception as e:
+                logger.warning(f"Background refresh of {key} failed: {str(e)}")
+
+        task = asyncio.ensure_future(run())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _refresh_current(self, comet_id: str, max_age: Optional[timedelta] = None) -> Dict:
+        """Fetch current data from JPL and cache it (run once per flight)"""
+        state = self._state(comet_id)
+        # Another flight or worker may have filled the cache since our miss
+        cached_data = await self._get_cached_data(comet_id, max_age)
+        if cached_data:
+            return cached_data
+
+        logger.info(f"Fetching fresh data for {comet_id} from JPL Horizons API")
+        try:
+            fresh_data = await self._fetch_from_jpl(state)
+        except UpstreamUnavailable:
+            raise
+        except Exception:
+            state.refresh_failures['current'] += 1
+            raise
+
+        state.refresh_failures['current'] = 0
+        self._cache_data(comet_id, fresh_data)
+        return fresh_data
+
+    async def _refresh_historical(self, comet_id: str, hours: int) -> List[Dict]:
+        """Fetch the missing epochs of a history window from JPL (run once per flight)"""
+        state = self._state(comet_id)
+        # Another flight may have filled some of the window since our miss
+        historical_data, gaps = await self._get_historical_cache(comet_id, hours)
+        if not gaps:
+            return historical_data
+
+        if len(gaps) > self.max_history_gap_fetches:
+            # Heavily fragmented: one request spanning every gap is cheaper
+            gaps = [(gaps[0][0], gaps[-1][1])]
+
+        try:
+            for gap_start, gap_end in gaps:
+                ephem = await self._fetch_historical_from_jpl(state, gap_start, gap_end)
+                with metrics.timed(metrics.MONGO_SECONDS, 'mongo', operation='store_write'):
+                    await self.store.write(comet_id, ephem)
+        except UpstreamUnavailable:
+            raise
+        except Exception:
+            state.refresh_failures['historical'] += 1
+            raise
+
+        state.refresh_failures['historical'] = 0
+        historical_data, _ = await self._get_historical_cache(comet_id, hours)
+        return historical_data
+
+    async def _fetch_from_jpl(self, state: CometState) -> Dict:
+        """Get current data from the local ephemeris fit, refilling it from JPL when its span runs out"""
         now = datetime.utcnow()
-        start_time = now.strftime('%Y-%m-%d %H:%M')
-        stop_time = (now + timedelta(minutes=1)).strftime('%Y-%m-%d %H:%M')
-        
+        if not self._ephemeris_covers(state, now + self.ephemeris_refill_margin):
+            await self._fetch_ephemeris_from_jpl(state, now)
+
+        return self._build_current_payload(state, now, refreshed_at=now)
+
+    async def _fetch_ephemeris_from_jpl(self, state: CometState, now: datetime):
+        """Fetch a dense multi-day ephemeris from JPL and fit it for local interpolation"""
+        start_time = (now - timedelta(hours=1)).strftime('%Y-%m-%d %H:%M')
+        stop_time = (now + self.ephemeris_span).strftime('%Y-%m-%d %H:%M')
+
         params = {
             'format': 'text',
-            'COMMAND': self.comet_id,
+            'COMMAND': state.comet.horizons_id,
             'EPHEM_TYPE': 'OBSERVER',
             'CENTER': '500@399',  # Earth center
             'START_TIME': start_time,
             'STOP_TIME': stop_time,
-            'STEP_SIZE': '1m',
+            'STEP_SIZE': self.ephemeris_step,
             'QUANTITIES': '1,9,20,23,24',  # RA, Dec, distance, velocity, magnitude
             'REF_SYSTEM': 'ICRF',
             'CAL_FORMAT': 'CAL',
@@ -92,99 +745,155 @@ class CometService:
             'EXTRA_PREC': 'NO',
             'R_T_S_ONLY': 'NO'
         }
-        
-        # Use asyncio to run the synchronous request
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(None, lambda: requests.get(self.base_url, params=params, timeout=30))
-        
+
+        logger.info(f"Fetching {self.ephemeris_span} ephemeris span for {state.comet.comet_id} from JPL Horizons API")
+        response = await self._horizons_get(params, timeout=30)
+
         if response.status_code != 200:
             raise Exception(f"JPL API returned status {response.status_code}")
-        
+
         # Parse the response
-        return self._parse_jpl_response(response.text)
-    
-    def _parse_jpl_response(self, response_text: str) -> Dict:
-        """Parse JPL Horizons API response to our data format"""
+        state.ephemeris = await self._parse_jpl_response(response.text)
+        elements = orbit_propagator.parse_elements(response.text)
+        if elements is not None:
+            state.elements = elements
+        state.ephemeris_raw = response.text[:500]  # Store first 500 chars for debugging
+
+    async def _parse_jpl_response(self, response_text: str) -> EphemerisInterpolator:
+        """Parse a JPL Horizons observer table into an interpolating fit"""
         try:
-            lines = response_text.split('\n')
-            
-            # Find the data section
-            data_started = False
-            ephemeris_data = []
-            
-            for line in lines:
-                if '$$SOE' in line:  # Start of ephemeris
-                    data_started = True
-                    continue
-                elif '$$EOE' in line:  # End of ephemeris
-                    break
-                elif data_started and line.strip():
-                    ephemeris_data.append(line)
-            
-            if not ephemeris_data:
-                raise Exception("No ephemeris data found in response")
-            
-            # Parse the first (current) data line
-            current_line = ephemeris_data[0].strip()
-            
-            # Extract position data using regex patterns
-            # This is a simplified parser - real implementation would be more robust
-            ra_match = re.search(r'(\d+\s+\d+\s+[\d.]+)', current_line)
-            dec_match = re.search(r'([-+]?\d+\s+\d+\s+[\d.]+)', current_line)
-            
-            now = datetime.utcnow()
-            
-            return {
-                'id': '3i_atlas',
-                'name': '3i/Atlas',
-                'designation': 'C/2025 A1',
-                'lastUpdated': now.isoformat(),
-                'position': {
-                    'rightAscension': str(280.5 + (now.timestamp() / 100000) % 360),  # Simulated for now
-                    'declination': str(15.2 + (now.timestamp() / 50000) % 30),  # Simulated for now
-                    'distance': str(round(4.2 + 0.1 * (now.timestamp() % 1000) / 1000, 8)),
-                    'heliocentricDistance': str(round(5.8 + 0.2 * (now.timestamp() % 1000) / 1000, 8))
-                },
-                'velocity': {
-                    'radialVelocity': str(round(12.5 + 0.3 * (now.timestamp() % 100) / 100, 3)),
-                    'tangentialVelocity': str(round(8.9 + 0.2 * (now.timestamp() % 100) / 100, 3))
-                },
-                'orbital': {
-                    'eccentricity': '0.9985',
-                    'inclination': '89.2°',
-                    'perihelion': '1.15 AU',
-                    'aphelion': '~2000 AU',
-                    'period': 'Long-period comet'
-                },
-                'physical': {
-                    'magnitude': str(round(9.2 + 0.5 * (now.timestamp() % 50) / 50, 1)),
-                    'coma': str(int(100000 + 50000 * (now.timestamp() % 10) / 10)) + ' km',
-                    'tail': str(int(5000000 + 2000000 * (now.timestamp() % 20) / 20)) + ' km'
-                },
-                'status': 'Active',
-                'nextUpdate': (now + timedelta(minutes=15)).isoformat(),
-                'visibility': {
-                    'constellation': 'Draco',
-                    'bestViewingTime': 'Pre-dawn hours',
-                    'moonPhase': 'Waning Crescent'
-                },
-                'source': 'JPL Horizons',
-                'rawData': response_text[:500]  # Store first 500 chars for debugging
-            }
-            
+            return EphemerisInterpolator(await self.parse_pool.parse(response_text, kind='current'))
         except Exception as e:
             logger.error(f"Error parsing JPL response: {str(e)}")
             raise Exception("Failed to parse JPL response")
-    
-    async def _fetch_historical_from_jpl(self, hours: int) -> List[Dict]:
-        """Fetch historical data from JPL"""
-        now = datetime.utcnow()
-        start_time = (now - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M')
-        stop_time = now.strftime('%Y-%m-%d %H:%M')
-        
+
+    def _ephemeris_covers(self, state: CometState, when: datetime) -> bool:
+        """True if the local ephemeris fit can answer for when"""
+        return state.ephemeris is not None and state.ephemeris.covers(when)
+
+    def _build_current_payload(self, state: CometState, now: datetime, refreshed_at: Optional[datetime] = None) -> Dict:
+        """Evaluate the local ephemeris fit at now and format it as current data.
+
+        nextUpdate is due cache_duration after the refresh the payload
+        belongs to (refreshed_at, default the one being served), not after
+        now: payloads evaluated later in the same refresh share it.
+        """
+        now = now.replace(microsecond=0)
+        refreshed_at = refreshed_at or state.refreshed_at or now
+        next_update = refreshed_at.replace(microsecond=0) + timedelta(minutes=self.cache_duration)
+        if state.current_tick is not None and state.current_tick[0] == (now, next_update):
+            return state.current_tick[1]
+
+        payload = self._format_current_payload(
+            state,
+            now,
+            state.ephemeris.evaluate(now),
+            state.ephemeris.tangential_velocity(now),
+            status='Active',
+            source='JPL Horizons',
+            raw_data=state.ephemeris_raw,
+            next_update=next_update
+        )
+        # Payloads are evaluated to the second; reuse one within the same second
+        state.current_tick = ((now, next_update), payload)
+        return payload
+
+    def _format_current_payload(
+        self,
+        state: CometState,
+        now: datetime,
+        ephem: Optional[horizons_parser.Ephemeris],
+        tangential: Optional[np.ndarray],
+        status: str,
+        source: str,
+        raw_data: str,
+        next_update: Optional[datetime] = None
+    ) -> Dict:
+        """Format the first row of an ephemeris as the current data payload
+        (due again at next_update, by default cache_duration after now)"""
+        moon_phase, moon_illumination = lunar.moon_phase(np.datetime64(now, 'ms'))
+        constellation = 'n.a.'
+        if ephem is not None:
+            constellation = self.constellations.lookup(ephem.ra[:1], ephem.dec[:1])[0] or 'n.a.'
+            heliocentric = horizons_parser.heliocentric_distance(ephem)
+            magnitude = ephem.magnitude[0]
+            position = {
+                'rightAscension': f"{ephem.ra[0]:.6f}",
+                'declination': f"{ephem.dec[0]:.6f}",
+                'distance': f"{ephem.delta[0]:.8f}",
+                'heliocentricDistance': f"{heliocentric[0]:.8f}"
+            }
+            velocity = {
+                'radialVelocity': f"{ephem.deldot[0]:.3f}",
+                'tangentialVelocity': f"{tangential[0]:.3f}"
+            }
+        else:
+            magnitude = np.nan
+            position = dict.fromkeys(('rightAscension', 'declination', 'distance', 'heliocentricDistance'), 'n.a.')
+            velocity = dict.fromkeys(('radialVelocity', 'tangentialVelocity'), 'n.a.')
+
+        return {
+            'id': state.comet.comet_id,
+            'name': state.comet.name,
+            'designation': state.comet.designation,
+            'lastUpdated': now.isoformat(),
+            'position': position,
+            'velocity': velocity,
+            'orbital': self._format_orbital(state.elements),
+            'physical': {
+                'magnitude': f"{magnitude:.1f}" if np.isfinite(magnitude) else 'n.a.',
+                'coma': '125000 km',
+                'tail': '6500000 km'
+            },
+            'status': status,
+            'nextUpdate': (next_update or now + timedelta(minutes=self.cache_duration)).isoformat(),
+            'visibility': {
+                'constellation': constellation,
+                'bestViewingTime': 'Pre-dawn hours',
+                'moonPhase': moon_phase[0],
+                'moonIllumination': f"{moon_illumination[0] * 100:.0f}%"
+            },
+            'source': source,
+            'rawData': raw_data
+        }
+
+    def _format_orbital(self, elements: Optional[orbit_propagator.OrbitalElements]) -> Dict:
+        """Format osculating elements as the orbital block"""
+        if elements is None:
+            return dict.fromkeys(('eccentricity', 'inclination', 'perihelion', 'aphelion', 'period'), 'n.a.')
+
+        e = elements.eccentricity
+        q = elements.perihelion_distance
+        if e < 1:
+            a = elements.semi_major_axis
+            aphelion = f"{a * (1 + e):.0f} AU"
+            period = f"{a ** 1.5:.0f} years"
+        else:
+            aphelion = 'None (unbound)'
+            period = 'Hyperbolic (interstellar)' if e > 1 else 'Parabolic'
+
+        return {
+            'eccentricity': f"{e:.4f}",
+            'inclination': f"{elements.inclination:.1f}°",
+            'perihelion': f"{q:.2f} AU",
+            'aphelion': aphelion,
+            'period': period
+        }
+
+    async def _fetch_historical_from_jpl(
+        self,
+        state: CometState,
+        start: datetime,
+        end: datetime
+    ) -> horizons_parser.Ephemeris:
+        """Fetch hourly historical samples for start..end (inclusive) from JPL"""
+        start_time = start.strftime('%Y-%m-%d %H:%M')
+        # Horizons needs STOP_TIME after START_TIME; rows past end are harmless
+        stop_time = max(end, start + timedelta(minutes=1)).strftime('%Y-%m-%d %H:%M')
+
         params = {
             'format': 'text',
-            'COMMAND': self.comet_id,
+            'COMMAND': state.comet.horizons_id,
             'EPHEM_TYPE': 'OBSERVER',
             'CENTER': '500@399',
             'START_TIME': start_time,
@@ -192,189 +901,363 @@ class CometService:
             'STEP_SIZE': '1h',
             'QUANTITIES': '1,9,20,23,24'
         }
-        
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(None, lambda: requests.get(self.base_url, params=params, timeout=60))
-        
+
+        logger.info(f"Fetching historical data for {state.comet.comet_id} from JPL for {start_time} - {stop_time}")
+        response = await self._horizons_get(params, timeout=60)
+
         if response.status_code != 200:
             raise Exception(f"JPL API returned status {response.status_code}")
-        
-        return self._parse_historical_response(response.text)
-    
-    def _parse_historical_response(self, response_text: str) -> List[Dict]:
-        """Parse historical JPL response"""
-        # Simplified implementation - would parse multiple data points
-        historical_data = []
-        base_time = datetime.utcnow() - timedelta(hours=30)
-        
-        for i in range(30):
-            timestamp = base_time + timedelta(hours=i)
-            historical_data.append({
-                'timestamp': timestamp.isoformat(),
-                'distance': str(round(4.2 + 0.1 * (i % 10) / 10, 8)),
-                'magnitude': str(round(9.2 + 0.5 * (i % 5) / 5, 1)),
-                'velocity': str(round(12.5 + 0.3 * (i % 7) / 7, 3))
-            })
-        
-        return historical_data
-    
-    async def _get_cached_data(self) -> Optional[Dict]:
-        """Get cached current data if still valid"""
+
+        return await self._parse_historical_response(response.text)
+
+    async def _parse_historical_response(self, response_text: str) -> horizons_parser.Ephemeris:
+        """Parse historical JPL response into an ephemeris"""
+        try:
+            return await self.parse_pool.parse(response_text, kind='historical')
+        except Exception as e:
+            logger.error(f"Error parsing historical JPL response: {str(e)}")
+            raise Exception("Failed to parse historical JPL response")
+
+    def _format_history(self, ephem: horizons_parser.Ephemeris) -> List[Dict]:
+        """Format every row of an ephemeris as a historical data point"""
+        timestamps = np.datetime_as_string(ephem.time, unit='s')
+        # Labelled for every row at once: one searchsorted and a few array ops
+        constellations = self.constellations.lookup(ephem.ra, ephem.dec)
+        moon_phases, _ = lunar.moon_phase(ephem.time)
+        return [
+            {
+                'timestamp': timestamp,
+                'distance': f"{distance:.8f}",
+                'magnitude': f"{magnitude:.1f}" if np.isfinite(magnitude) else 'n.a.',
+                'velocity': f"{velocity:.3f}",
+                'rightAscension': f"{ra:.6f}",
+                'declination': f"{dec:.6f}",
+                'constellation': constellation or 'n.a.',
+                'moonPhase': moon_phase
+            }
+            for timestamp, distance, magnitude, velocity, ra, dec, constellation, moon_phase in zip(
+                timestamps.tolist(),
+                ephem.delta.tolist(),
+                ephem.magnitude.tolist(),
+                ephem.deldot.tolist(),
+                ephem.ra.tolist(),
+                ephem.dec.tolist(),
+                constellations.tolist(),
+                moon_phases.tolist()
+            )
+        ]
+
+    def _l1_expiry(self, cached_at: datetime, valid_for: timedelta, data=None) -> datetime:
+        """Compute when an L1 entry mirroring a comet_data document expires.
+
+        The entry expires when the Mongo document itself stops being served
+        (cached_at + valid_for) and never later than the payload's nextUpdate.
+        Because both come from the shared document, every worker drops its
+        copy at the same instant and re-reads Mongo, so no worker can serve
+        data past nextUpdate regardless of when it populated its L1.
+        History entries are only cached once their window is complete and
+        expire when the next hourly epoch is due.
+        """
+        expires_at = cached_at + valid_for
+        next_update = data.get('nextUpdate') if isinstance(data, dict) else None
+        if next_update:
+            try:
+                expires_at = min(expires_at, datetime.fromisoformat(next_update))
+            except (TypeError, ValueError):
+                pass
+        return expires_at
+
+    async def _get_cached_data(self, comet_id: str, max_age: Optional[timedelta] = None) -> Optional[Dict]:
+        """Get cached current data younger than max_age (default: the cache duration)"""
+        if max_age is None:
+            cached_data = self._l1.get((comet_id, 'current'))
+            if cached_data:
+                return cached_data
+
         try:
-            cutoff_time = datetime.utcnow() - timedelta(minutes=self.cache_duration)
-            cached = await self.db.comet_data.find_one({
-                'cometId': '3i_atlas',
-                'dataType': 'current',
-                'timestamp': {'$gte': cutoff_time}
-            })
-            
+            cutoff_time = datetime.utcnow() - (max_age or timedelta(minutes=self.cache_duration))
+            with metrics.timed(metrics.MONGO_SECONDS, 'mongo', operation='find_current'):
+                cached = await self.db.comet_data.find_one({
+                    'cometId': comet_id,
+                    'dataType': 'current',
+                    'timestamp': {'$gte': cutoff_time}
+                })
+
             if cached:
+                if self.last_update is None or cached['timestamp'] > self.last_update:
+                    self.last_update = cached['timestamp']
+                state = self._state(comet_id)
+                if state.refreshed_at is None or cached['timestamp'] > state.refreshed_at:
+                    state.refreshed_at = cached['timestamp']
                 cached_data = cached.get('data', {})
                 cached_data['source'] = 'Cached JPL Data'
+                self._l1.set(
+                    (comet_id, 'current'),
+                    cached_data,
+                    self._l1_expiry(cached['timestamp'], timedelta(minutes=self.cache_duration), cached_data)
+                )
                 return cached_data
-            
+
             return None
-            
+
         except Exception as e:
             logger.error(f"Error accessing cache: {str(e)}")
             return None
-    
-    async def _cache_data(self, data: Dict):
-        """Cache current comet data"""
-        try:
-            cache_doc = {
-                'cometId': '3i_atlas',
-                'dataType': 'current',
-                'timestamp': datetime.utcnow(),
-                'data': data
-            }
-            
-            # Replace existing current data cache
-            await self.db.comet_data.replace_one(
-                {'cometId': '3i_atlas', 'dataType': 'current'},
-                cache_doc,
-                upsert=True
+
+    def _cache_data(self, comet_id: str, data: Dict):
+        """Cache current comet data.
+
+        The L1 entry is updated immediately; the Mongo write is queued and
+        flushed together with every other comet refreshed in the same loop
+        iteration, so a scheduler cycle over many comets costs one
+        bulk_write instead of one replace_one per object.
+        """
+        cache_doc = {
+            'cometId': comet_id,
+            'dataType': 'current',
+            'timestamp': datetime.utcnow(),
+            'data': data
+        }
+        self.last_update = cache_doc['timestamp']
+
+        cached_data = {**data, 'source': 'Cached JPL Data'}
+        self._l1.set(
+            (comet_id, 'current'),
+            cached_data,
+            self._l1_expiry(cache_doc['timestamp'], timedelta(minutes=self.cache_duration), cached_data)
+        )
+
+        self._pending_current[comet_id] = cache_doc
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self.flush_cache_writes())
+
+        state = self._state(comet_id)
+        state.cached_current = (cache_doc['timestamp'], data)
+        state.refreshed_at = cache_doc['timestamp']
+        if self.snapshot is not None and self.snapshot.is_leader:
+            self._pending_snapshot[comet_id] = SnapshotEntry(
+                payload=data,
+                cached_at=cache_doc['timestamp'],
+                ephemeris=state.ephemeris.ephemeris if state.ephemeris is not None else None,
+                ephemeris_raw=state.ephemeris_raw,
+                elements=state.elements
             )
-            
-        except Exception as e:
-            logger.error(f"Error caching data: {str(e)}")
-    
-    async def _get_historical_cache(self, hours: int) -> Optional[List[Dict]]:
-        """Get cached historical data"""
-        try:
-            cutoff_time = datetime.utcnow() - timedelta(hours=hours + 1)
-            cached = await self.db.comet_data.find_one({
-                'cometId': '3i_atlas',
-                'dataType': 'historical',
-                'timestamp': {'$gte': cutoff_time}
-            })
-            
-            return cached.get('data', []) if cached else None
-            
-        except Exception as e:
-            logger.error(f"Error accessing historical cache: {str(e)}")
-            return None
-    
-    async def _cache_historical_data(self, data: List[Dict]):
-        """Cache historical data"""
+            self.publish_snapshot()
+
+    def publish_snapshot(self):
+        """Start writing refreshed comets and the upstream health to the shared snapshot (leader only)"""
+        if self.snapshot is None or not self.snapshot.is_leader:
+            return
+        if self._snapshot_task is None or self._snapshot_task.done():
+            self._snapshot_task = asyncio.ensure_future(self._write_snapshot())
+
+    async def _write_snapshot(self):
+        """Write the refreshed comets and upstream health to the shared snapshot on a worker thread.
+
+        Comets refreshed while a write is running go into the next one, so
+        there is never more than one write in progress.
+        """
+        # Let refreshes finishing in the same loop iteration join the write
+        await asyncio.sleep(0)
+        while True:
+            pending, self._pending_snapshot = self._pending_snapshot, {}
+            try:
+                await asyncio.to_thread(self.snapshot.publish, pending, self._upstream_report())
+            except OSError as e:
+                logger.error(f"Could not write shared snapshot: {str(e)}")
+                return
+            if not self._pending_snapshot:
+                return
+
+    def _sync_snapshot(self):
+        """Adopt a newer shared snapshot written by the leader worker (followers only).
+
+        The ephemeris fit is rebuilt over the mapped columns and the payload
+        goes into L1 with the same expiry as the document it mirrors, so a
+        follower answers "current" without Mongo or JPL. Comets whose entry
+        has not changed since the last read are left alone. The follower's
+        requested history windows are forwarded to the leader from here too.
+        """
+        if self.snapshot is None or self.snapshot.is_leader:
+            return
+        now = time.monotonic()
+        if now - self._snapshot_checked < self.snapshot_check_interval:
+            return
+        self._snapshot_checked = now
+        self._forward_windows(now)
+
         try:
-            cache_doc = {
-                'cometId': '3i_atlas',
-                'dataType': 'historical',
-                'timestamp': datetime.utcnow(),
-                'data': data
-            }
-            
-            await self.db.comet_data.replace_one(
-                {'cometId': '3i_atlas', 'dataType': 'historical'},
-                cache_doc,
-                upsert=True
+            entries = self.snapshot.read()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Could not read shared snapshot: {str(e)}")
+            return
+
+        for comet_id, entry in (entries or {}).items():
+            try:
+                state = self._state(comet_id)
+            except KeyError:
+                continue
+            if state.cached_current is not None and state.cached_current[0] == entry.cached_at:
+                continue
+            if entry.ephemeris is not None and len(entry.ephemeris) >= 2:
+                state.ephemeris = EphemerisInterpolator(entry.ephemeris)
+                state.ephemeris_raw = entry.ephemeris_raw
+                state.current_tick = None
+            if entry.elements is not None:
+                state.elements = entry.elements
+            state.cached_current = (entry.cached_at, entry.payload)
+            state.refreshed_at = entry.cached_at
+
+            cached_data = {**entry.payload, 'source': 'Cached JPL Data'}
+            self._l1.set(
+                (comet_id, 'current'),
+                cached_data,
+                self._l1_expiry(entry.cached_at, timedelta(minutes=self.cache_duration), cached_data)
             )
-            
-        except Exception as e:
-            logger.error(f"Error caching historical data: {str(e)}")
-    
-    async def _get_last_known_data(self) -> Optional[Dict]:
+            if self.last_update is None or entry.cached_at > self.last_update:
+                self.last_update = entry.cached_at
+
+    def _forward_windows(self, now: float):
+        """Hand tracked history windows to the leader when new ones appear (and periodically)"""
+        windows = frozenset(self.tracked_hours)
+        forwarded, forwarded_at = self._forwarded_windows
+        if windows <= forwarded and now - forwarded_at < self.window_forward_interval:
+            return
+        try:
+            self.snapshot.forward_windows(self.tracked_hours)
+            self._forwarded_windows = (windows, now)
+        except OSError as e:
+            logger.error(f"Could not forward history windows: {str(e)}")
+
+    def adopt_forwarded_windows(self, max_age: timedelta):
+        """Track the history windows that follower workers forwarded (leader only)"""
+        if self.snapshot is None or not self.snapshot.is_leader:
+            return
+        for key, requested in self.snapshot.forwarded_windows(max_age).items():
+            if self.registry.get(key[0]) is not None and requested > self.tracked_hours.get(key, datetime.min):
+                self.tracked_hours[key] = requested
+
+    async def flush_cache_writes(self):
+        """Write every queued current document with one unordered bulk_write"""
+        # Let refreshes finishing in the same loop iteration join the batch
+        await asyncio.sleep(0)
+        while self._pending_current:
+            pending, self._pending_current = self._pending_current, {}
+            try:
+                # Replace existing current data cache
+                with metrics.timed(metrics.MONGO_SECONDS, operation='bulk_write_current'):
+                    await self.db.comet_data.bulk_write(
+                        [
+                            ReplaceOne({'cometId': comet_id, 'dataType': 'current'}, cache_doc, upsert=True)
+                            for comet_id, cache_doc in pending.items()
+                        ],
+                        ordered=False
+                    )
+            except Exception as e:
+                logger.error(f"Error caching data: {str(e)}")
+
+    def _history_window(self, hours: int) -> Tuple[datetime, datetime]:
+        """Hour-aligned (start, end) of the last hours hours, both inclusive"""
+        end = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        return end - timedelta(hours=hours), end
+
+    async def _get_historical_cache(
+        self,
+        comet_id: str,
+        hours: int
+    ) -> Tuple[List[Dict], List[Tuple[datetime, datetime]]]:
+        """Get stored historical data for the window and the ranges still missing from it"""
+        start, end = self._history_window(hours)
+        with metrics.timed(metrics.MONGO_SECONDS, 'mongo', operation='store_read'):
+            ephem = await self.store.read(comet_id, start, end)
+        gaps = ephemeris_store.missing_ranges(ephem.time, start, end, np.timedelta64(1, 'h'))
+        historical_data = self._format_history(ephem)
+
+        if not gaps:
+            # Complete until the next hourly epoch is due
+            self._l1.set((comet_id, 'historical', hours), historical_data, end + timedelta(hours=1))
+
+        return historical_data, gaps
+
+    async def _get_last_known_data(self, comet_id: str) -> Optional[Dict]:
         """Get last known data from cache regardless of age"""
+        pending = self._pending_current.get(comet_id)
+        if pending:
+            return dict(pending['data'])
+
         try:
-            cached = await self.db.comet_data.find_one({
-                'cometId': '3i_atlas',
-                'dataType': 'current'
-            })
-            
+            with metrics.timed(metrics.MONGO_SECONDS, 'mongo', operation='find_last_known'):
+                cached = await self.db.comet_data.find_one({
+                    'cometId': comet_id,
+                    'dataType': 'current'
+                })
+
             return cached.get('data', {}) if cached else None
-            
+
         except Exception as e:
             logger.error(f"Error getting last known data: {str(e)}")
             return None
-    
-    def _get_fallback_data(self) -> Dict:
-        """Return fallback data when all other sources fail"""
-        now = datetime.utcnow()
-        
+
+    def _get_fallback_data(self, comet_id: str) -> Dict:
+        """Return fallback data when all other sources fail.
+
+        Values come from propagating the last known osculating elements,
+        so they stay physically plausible without any network access.
+        """
+        state = self._state(comet_id)
+        now = datetime.utcnow().replace(microsecond=0)
+        ephem = tangential = None
+        if state.elements is not None:
+            ephem, tangential = orbit_propagator.geocentric_ephemeris(state.elements, np.datetime64(now, 'ms'))
+
+        return self._format_current_payload(
+            state,
+            now,
+            ephem,
+            tangential,
+            status='Data unavailable',
+            source='Fallback Data',
+            raw_data='No connection to JPL; two-body propagation from osculating elements'
+        )
+
+    def _get_fallback_history(self, comet_id: str, hours: int) -> List[Dict]:
+        """Propagate hourly historical points when JPL and the cache are unavailable"""
+        state = self._state(comet_id)
+        if state.elements is None:
+            return []
+
+        now = np.datetime64(datetime.utcnow().replace(minute=0, second=0, microsecond=0), 'ms')
+        times = now - np.arange(hours, -1, -1) * np.timedelta64(1, 'h')
+        ephem, _ = orbit_propagator.geocentric_ephemeris(state.elements, times)
+        return self._format_history(ephem)
+
+    def _upstream_report(self) -> Dict:
+        """Upstream health, circuit breaker and rate limiter state of this worker"""
         return {
-            'id': '3i_atlas',
-            'name': '3i/Atlas',
-            'designation': 'C/2025 A1',
-            'lastUpdated': now.isoformat(),
-            'position': {
-                'rightAscension': '280.500000',
-                'declination': '15.200000',
-                'distance': '4.20000000',
-                'heliocentricDistance': '5.80000000'
-            },
-            'velocity': {
-                'radialVelocity': '12.500',
-                'tangentialVelocity': '8.900'
-            },
-            'orbital': {
-                'eccentricity': '0.9985',
-                'inclination': '89.2°',
-                'perihelion': '1.15 AU',
-                'aphelion': '~2000 AU',
-                'period': 'Long-period comet'
-            },
-            'physical': {
-                'magnitude': '9.2',
-                'coma': '125000 km',
-                'tail': '6500000 km'
-            },
-            'status': 'Data unavailable',
-            'nextUpdate': (now + timedelta(minutes=15)).isoformat(),
-            'visibility': {
-                'constellation': 'Draco',
-                'bestViewingTime': 'Pre-dawn hours',
-                'moonPhase': 'Waning Crescent'
-            },
-            'source': 'Fallback Data',
-            'rawData': 'No connection to JPL'
+            **self.upstream_health.snapshot(),
+            'circuit': self.circuit.snapshot(),
+            'rateLimitTokens': int(self.rate_limiter.available())
         }
-    
+
     async def get_api_status(self) -> Dict:
-        """Get API health status"""
-        try:
-            # Test connection to JPL
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None, 
-                lambda: requests.get(self.base_url, timeout=10)
-            )
-            
-            if response.status_code == 200:
-                status = "active"
-            else:
-                status = "degraded"
-                
-        except Exception:
-            status = "down"
-        
-        last_update = await self.db.comet_data.find_one(
-            {'cometId': '3i_atlas', 'dataType': 'current'},
-            sort=[('timestamp', -1)]
-        )
-        
+        """Get API health status from passively collected state (no I/O).
+
+        Snapshot followers never call JPL, so they report the upstream
+        health the leader published with its last snapshot.
+        """
+        self._sync_snapshot()
+        upstream = None
+        if not self.calls_upstream():
+            upstream = self.snapshot.upstream
+        upstream = upstream or self._upstream_report()
         return {
-            'status': status,
-            'lastUpdate': last_update['timestamp'].isoformat() if last_update else None,
-            'source': 'JPL Horizons'
-        }
\ No newline at end of file
+            'status': upstream['status'],
+            'lastUpdate': self.last_update.isoformat() if self.last_update else None,
+            'source': 'JPL Horizons',
+            'trackedComets': len(self.registry),
+            'snapshot': {
+                'role': 'leader' if self.snapshot.is_leader else 'follower',
+                'sequence': self.snapshot.sequence
+            } if self.snapshot is not None else None,
+            'upstream': upstream
+        }
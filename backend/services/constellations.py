@@ -0,0 +1,139 @@
+"""Constellation lookup over the IAU boundaries.
+
+The boundaries are the Delporte (1930) lines as tabulated by Roman (1987,
+CDS catalogue VI/42, data.dat): rows of (R.A. low, R.A. high in hours,
+Dec. low in degrees, constellation) in the B1875.0 frame, ordered by
+decreasing Dec. low. A position lies in the first row whose Dec. low is
+at or below it and whose R.A. range contains it.
+
+Instead of scanning the table per position, the index flattens it once
+into declination bands, each partitioned in R.A. into labelled
+intervals, and stores every interval start as a single sorted key
+(band * 24 + R.A.). Labelling any number of positions is then one
+precession to B1875 and one np.searchsorted.
+
+The table ships with the service as data/constellation_boundaries.dat.
+"""
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from services.orbit_propagator import JD_J2000
+
+logger = logging.getLogger(__name__)
+
+JD_B1875 = 2405889.258550475
+
+# Roman (1987) boundary table bundled with the service
+BOUNDARIES_PATH = Path(__file__).resolve().parent.parent / 'data' / 'constellation_boundaries.dat'
+
+NAMES = {
+    'AND': 'Andromeda', 'ANT': 'Antlia', 'APS': 'Apus', 'AQR': 'Aquarius', 'AQL': 'Aquila',
+    'ARA': 'Ara', 'ARI': 'Aries', 'AUR': 'Auriga', 'BOO': 'Boötes', 'CAE': 'Caelum',
+    'CAM': 'Camelopardalis', 'CNC': 'Cancer', 'CVN': 'Canes Venatici', 'CMA': 'Canis Major',
+    'CMI': 'Canis Minor', 'CAP': 'Capricornus', 'CAR': 'Carina', 'CAS': 'Cassiopeia',
+    'CEN': 'Centaurus', 'CEP': 'Cepheus', 'CET': 'Cetus', 'CHA': 'Chamaeleon', 'CIR': 'Circinus',
+    'COL': 'Columba', 'COM': 'Coma Berenices', 'CRA': 'Corona Australis', 'CRB': 'Corona Borealis',
+    'CRV': 'Corvus', 'CRT': 'Crater', 'CRU': 'Crux', 'CYG': 'Cygnus', 'DEL': 'Delphinus',
+    'DOR': 'Dorado', 'DRA': 'Draco', 'EQU': 'Equuleus', 'ERI': 'Eridanus', 'FOR': 'Fornax',
+    'GEM': 'Gemini', 'GRU': 'Grus', 'HER': 'Hercules', 'HOR': 'Horologium', 'HYA': 'Hydra',
+    'HYI': 'Hydrus', 'IND': 'Indus', 'LAC': 'Lacerta', 'LEO': 'Leo', 'LMI': 'Leo Minor',
+    'LEP': 'Lepus', 'LIB': 'Libra', 'LUP': 'Lupus', 'LYN': 'Lynx', 'LYR': 'Lyra', 'MEN': 'Mensa',
+    'MIC': 'Microscopium', 'MON': 'Monoceros', 'MUS': 'Musca', 'NOR': 'Norma', 'OCT': 'Octans',
+    'OPH': 'Ophiuchus', 'ORI': 'Orion', 'PAV': 'Pavo', 'PEG': 'Pegasus', 'PER': 'Perseus',
+    'PHE': 'Phoenix', 'PIC': 'Pictor', 'PSC': 'Pisces', 'PSA': 'Piscis Austrinus', 'PUP': 'Puppis',
+    'PYX': 'Pyxis', 'RET': 'Reticulum', 'SGE': 'Sagitta', 'SGR': 'Sagittarius', 'SCO': 'Scorpius',
+    'SCL': 'Sculptor', 'SCT': 'Scutum', 'SER': 'Serpens', 'SEX': 'Sextans', 'TAU': 'Taurus',
+    'TEL': 'Telescopium', 'TRI': 'Triangulum', 'TRA': 'Triangulum Australe', 'TUC': 'Tucana',
+    'UMA': 'Ursa Major', 'UMI': 'Ursa Minor', 'VEL': 'Vela', 'VIR': 'Virgo', 'VOL': 'Volans',
+    'VUL': 'Vulpecula'
+}
+
+def precess_from_j2000(ra: np.ndarray, dec: np.ndarray, jd: float):
+    """R.A./Dec. (degrees) precessed from J2000.0 to the mean equator of jd (IAU 1976)"""
+    t = (jd - JD_J2000) / 36525.0
+    zeta = np.radians((2306.2181 * t + 0.30188 * t ** 2 + 0.017998 * t ** 3) / 3600.0)
+    z = np.radians((2306.2181 * t + 1.09468 * t ** 2 + 0.018203 * t ** 3) / 3600.0)
+    theta = np.radians((2004.3109 * t - 0.42665 * t ** 2 - 0.041833 * t ** 3) / 3600.0)
+
+    ra = np.radians(ra) + zeta
+    dec = np.radians(dec)
+    a = np.cos(dec) * np.sin(ra)
+    b = np.cos(theta) * np.cos(dec) * np.cos(ra) - np.sin(theta) * np.sin(dec)
+    c = np.sin(theta) * np.cos(dec) * np.cos(ra) + np.cos(theta) * np.sin(dec)
+    return np.mod(np.degrees(np.arctan2(a, b) + z), 360.0), np.degrees(np.arcsin(np.clip(c, -1.0, 1.0)))
+
+class ConstellationIndex:
+    """Vectorized position -> constellation lookup; see the module docstring.
+
+    An index built without a boundary table is empty and labels every
+    position None.
+    """
+
+    def __init__(self, ra_low=(), ra_high=(), dec_low=(), names=()):
+        ra_low = np.asarray(ra_low, dtype=np.float64)
+        ra_high = np.asarray(ra_high, dtype=np.float64)
+        dec_low = np.asarray(dec_low, dtype=np.float64)
+        names = np.asarray(names, dtype=object)
+
+        self._bands = np.unique(dec_low)
+        keys, labels = [], []
+        for band, floor in enumerate(self._bands):
+            eligible = np.flatnonzero(dec_low <= floor)  # table order is preserved
+            edges = np.unique(np.concatenate([[0.0, 24.0], ra_low[eligible], ra_high[eligible]]))
+            mids = (edges[:-1] + edges[1:]) / 2
+            contains = (ra_low[eligible][None, :] <= mids[:, None]) & (mids[:, None] < ra_high[eligible][None, :])
+            first = contains.argmax(axis=1)
+            found = contains.any(axis=1)
+            keys.append(band * 24.0 + edges[:-1])
+            labels.append(np.where(found, names[eligible][first], None))
+
+        self._keys = np.concatenate(keys) if keys else np.empty(0)
+        self._labels = np.concatenate(labels) if labels else np.empty(0, dtype=object)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @classmethod
+    def from_file(cls, path: Optional[str]) -> 'ConstellationIndex':
+        """Index over a boundary table in the CDS VI/42 data.dat layout.
+
+        Each line holds R.A. low, R.A. high (hours), Dec. low (degrees)
+        and the constellation abbreviation; lines starting with # are
+        comments. Without a path the bundled table (BOUNDARIES_PATH) is
+        used; if the file cannot be read, the index is empty.
+        """
+        path = path or BOUNDARIES_PATH
+
+        ra_low, ra_high, dec_low, names = [], [], [], []
+        try:
+            with open(path) as f:
+                for line in f:
+                    fields = line.split()
+                    if len(fields) < 4 or fields[0].startswith('#'):
+                        continue
+                    ra_low.append(float(fields[0]))
+                    ra_high.append(float(fields[1]))
+                    dec_low.append(float(fields[2]))
+                    names.append(NAMES.get(fields[3].upper(), fields[3]))
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load constellation boundaries {path}: {str(e)}")
+            return cls()
+
+        index = cls(ra_low, ra_high, dec_low, names)
+        logger.info(f"Loaded {len(ra_low)} constellation boundary rows into {len(index)} intervals")
+        return index
+
+    def lookup(self, ra: np.ndarray, dec: np.ndarray) -> np.ndarray:
+        """Constellation names for J2000 R.A./Dec. arrays (degrees); None when the index is empty"""
+        ra = np.atleast_1d(np.asarray(ra, dtype=np.float64))
+        dec = np.atleast_1d(np.asarray(dec, dtype=np.float64))
+        if not len(self._keys):
+            return np.full(len(ra), None, dtype=object)
+
+        ra1875, dec1875 = precess_from_j2000(ra, dec, JD_B1875)
+        band = np.clip(np.searchsorted(self._bands, dec1875, side='right') - 1, 0, len(self._bands) - 1)
+        position = np.searchsorted(self._keys, band * 24.0 + ra1875 / 15.0, side='right') - 1
+        return self._labels[position]
@@ -0,0 +1,88 @@
+"""Shape-preserving downsampling of time series, returning row indices.
+
+Both methods pick existing samples rather than averaging them, so the
+selected rows can be taken from every column of an ephemeris at once.
+"""
+import re
+
+import numpy as np
+
+METHODS = ('lttb', 'minmax')
+
+_RESOLUTION_RE = re.compile(r'^(\d+)([smhd])$')
+
+def parse_resolution(text: str) -> np.timedelta64:
+    """'15m', '2h', '1d' -> timedelta64"""
+    match = _RESOLUTION_RE.match(text.strip())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid resolution: {text}")
+    value, unit = match.groups()
+    return np.timedelta64(int(value), unit.upper() if unit == 'd' else unit)
+
+def _ends(size: int, n: int) -> np.ndarray:
+    """The first and last sample, or as many of them as n allows"""
+    return np.array([0, size - 1], dtype=np.intp)[:max(n, 0)]
+
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of n samples keeping the visual shape.
+
+    Bucket averages are computed for all buckets at once with reduceat;
+    only the choice of each bucket's point, which depends on the previous
+    choice, is a loop over the n - 2 buckets.
+    """
+    size = len(x)
+    if n >= size:
+        return np.arange(size)
+    if n < 3:
+        return _ends(size, n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    edges = np.linspace(1, size - 1, n - 1).astype(np.intp)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:size - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:size - 1], edges[:-1]) / counts
+    # The last bucket looks ahead to the final sample
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(n, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = size - 1
+    a = 0
+    for k in range(n - 2):
+        lo, hi = edges[k], edges[k + 1]
+        area = np.abs(
+            (x[a] - next_x[k]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (next_y[k] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[k + 1] = a
+    return selected
+
+def minmax(y: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the first and last sample plus the minimum and maximum of
+    (n - 2) // 2 equal-count buckets in between, so never more than n"""
+    size = len(y)
+    if n >= size:
+        return np.arange(size)
+    ends = _ends(size, n)
+    buckets = (n - 2) // 2
+    if buckets < 1:
+        return ends
+
+    inner = np.asarray(y, dtype=np.float64)[1:-1]
+    edges = np.linspace(0, len(inner), buckets + 1).astype(np.intp)
+    bucket_ids = np.repeat(np.arange(buckets), np.diff(edges))
+    # Sorting by (bucket, value) puts each bucket's min first and max last
+    order = np.lexsort((inner, bucket_ids)) + 1
+    picks = np.concatenate([order[edges[:-1]], order[edges[1:] - 1], ends])
+    return np.unique(picks)
+
+def downsample(x: np.ndarray, y: np.ndarray, n: int, method: str = 'lttb') -> np.ndarray:
+    """Indices of at most n samples of (x, y) chosen by method"""
+    if method == 'lttb':
+        return lttb(x, y, n)
+    if method == 'minmax':
+        return minmax(y, n)
+    raise ValueError(f"Unknown downsampling method: {method}")
@@ -0,0 +1,131 @@
+"""Streaming export of stored ephemeris samples.
+
+Samples are read batch by batch from the MongoDB cursor and encoded as
+they arrive, so memory use depends on the batch size, not on the length
+of the exported range. Arrow and Parquet output use pyarrow (listed in
+requirements.txt); without it those two formats are refused.
+"""
+import io
+from datetime import datetime
+from typing import AsyncIterator, Dict
+
+import pandas as pd
+
+from services.ephemeris_store import EphemerisStore
+from services.horizons_parser import Ephemeris
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:  # arrow / parquet formats
+    pa = ipc = pq = None
+
+# format -> media type
+FORMATS: Dict[str, str] = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+COLUMNS = ('ra', 'dec', 'delta', 'deldot', 'magnitude', 'elongation', 'phase_angle')
+
+def _to_frame(comet_id: str, chunk: Ephemeris) -> pd.DataFrame:
+    frame = pd.DataFrame({name: getattr(chunk, name) for name in COLUMNS})
+    frame.insert(0, 'timestamp', chunk.time.astype('datetime64[ms]'))
+    frame.insert(0, 'cometId', comet_id)
+    return frame
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain.
+
+    tell() keeps counting across drains, which the Parquet writer relies on
+    for the offsets in its footer.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def export_ephemeris(
+    store: EphemerisStore,
+    comet_id: str,
+    start: datetime,
+    end: datetime,
+    fmt: str = 'ndjson'
+) -> AsyncIterator[bytes]:
+    """Encoded samples with start <= timestamp <= end, oldest first.
+
+    The format is checked here, before anything is streamed, so callers
+    can still turn a ValueError into an error response.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt in ('arrow', 'parquet') and pa is None:
+        raise ValueError(f"The {fmt} format requires pyarrow")
+    if end < start:
+        raise ValueError("Export range ends before it starts")
+
+    return _encode(store, comet_id, start, end, fmt)
+
+async def _encode(
+    store: EphemerisStore,
+    comet_id: str,
+    start: datetime,
+    end: datetime,
+    fmt: str
+) -> AsyncIterator[bytes]:
+    batches = store.iter_batches(comet_id, start, end)
+    if fmt == 'ndjson':
+        async for chunk in batches:
+            yield _to_frame(comet_id, chunk).to_json(
+                orient='records', lines=True, date_format='iso', date_unit='ms'
+            ).encode()
+
+    elif fmt == 'csv':
+        header = True
+        async for chunk in batches:
+            yield _to_frame(comet_id, chunk).to_csv(
+                index=False, header=header, date_format='%Y-%m-%dT%H:%M:%S.%f', float_format='%.10g'
+            ).encode()
+            header = False
+
+    else:
+        schema = pa.schema(
+            [('cometId', pa.string()), ('timestamp', pa.timestamp('ms'))]
+            + [(name, pa.float64()) for name in COLUMNS]
+        )
+        sink = _ChunkSink()
+        if fmt == 'arrow':
+            writer = ipc.new_stream(sink, schema)
+        else:
+            writer = pq.ParquetWriter(sink, schema, compression='zstd')
+        try:
+            async for chunk in batches:
+                table = pa.Table.from_pandas(_to_frame(comet_id, chunk), schema=schema, preserve_index=False)
+                writer.write_table(table)
+                data = sink.drain()
+                if data:
+                    yield data
+        finally:
+            writer.close()
+        yield sink.drain()
@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import Union
+
+import numpy as np
+
+from services.horizons_parser import AU_KM, Ephemeris
+
+TimeLike = Union[datetime, np.datetime64, np.ndarray]
+
+class EphemerisInterpolator:
+    """Piecewise cubic Hermite fit over a dense Horizons ephemeris.
+
+    Every quantity gets one Hermite segment per table interval, with node
+    slopes estimated by second-order finite differences. Evaluating any set
+    of epochs inside the fitted span is a handful of vectorized NumPy
+    operations, so "current" values can be computed locally to the second
+    and JPL only has to be asked again once the span runs out.
+    """
+
+    _FIELDS = ('ra', 'dec', 'delta', 'deldot', 'magnitude', 'elongation', 'phase_angle')
+
+    def __init__(self, ephem: Ephemeris):
+        if len(ephem) < 2:
+            raise ValueError("Interpolation needs at least two ephemeris rows")
+
+        self.ephemeris = ephem
+        self.start = ephem.time[0]
+        self.end = ephem.time[-1]
+        self._t = self._seconds(ephem.time)
+
+        values = np.column_stack([getattr(ephem, field) for field in self._FIELDS])
+        # Unwrap R.A. so segments crossing 0h/24h interpolate the short way round
+        values[:, 0] = np.degrees(np.unwrap(np.radians(values[:, 0])))
+        self._y = values
+        self._m = np.gradient(values, self._t, axis=0)
+
+    def _seconds(self, times: TimeLike) -> np.ndarray:
+        times = np.asarray(times, dtype='datetime64[ms]')
+        return (times - np.datetime64('1970-01-01T00:00:00', 'ms')).astype(np.float64) / 1000.0
+
+    def covers(self, when: TimeLike) -> bool:
+        """True if every epoch in when lies inside the fitted span"""
+        t = np.atleast_1d(self._seconds(when))
+        return bool(np.all((t >= self._t[0]) & (t <= self._t[-1])))
+
+    def _segments(self, times: TimeLike):
+        x = np.atleast_1d(self._seconds(times))
+        i = np.clip(np.searchsorted(self._t, x, side='right') - 1, 0, len(self._t) - 2)
+        h = (self._t[i + 1] - self._t[i])[:, None]
+        s = ((x - self._t[i]) / h[:, 0])[:, None]
+        return i, h, s
+
+    def _evaluate(self, times: TimeLike) -> np.ndarray:
+        i, h, s = self._segments(times)
+        s2 = s * s
+        s3 = s2 * s
+        return (
+            (2 * s3 - 3 * s2 + 1) * self._y[i]
+            + (s3 - 2 * s2 + s) * h * self._m[i]
+            + (-2 * s3 + 3 * s2) * self._y[i + 1]
+            + (s3 - s2) * h * self._m[i + 1]
+        )
+
+    def _derivative(self, times: TimeLike) -> np.ndarray:
+        i, h, s = self._segments(times)
+        s2 = s * s
+        return (
+            (6 * s2 - 6 * s) / h * self._y[i]
+            + (3 * s2 - 4 * s + 1) * self._m[i]
+            + (-6 * s2 + 6 * s) / h * self._y[i + 1]
+            + (3 * s2 - 2 * s) * self._m[i + 1]
+        )
+
+    def evaluate(self, times: TimeLike) -> Ephemeris:
+        """Interpolated ephemeris at times (scalar or array of datetimes)"""
+        times = np.atleast_1d(np.asarray(times, dtype='datetime64[ms]'))
+        values = self._evaluate(times)
+        values[:, 0] = np.mod(values[:, 0], 360.0)
+        return Ephemeris(time=times, **{field: values[:, k] for k, field in enumerate(self._FIELDS)})
+
+    def tangential_velocity(self, times: TimeLike) -> np.ndarray:
+        """Plane-of-sky velocity in km/s from the fitted R.A./Dec. rates"""
+        values = self._evaluate(times)
+        rates = np.radians(self._derivative(times)[:, :2])
+        cos_dec = np.cos(np.radians(values[:, 1]))
+        angular_rate = np.hypot(rates[:, 0] * cos_dec, rates[:, 1])
+        return angular_rate * values[:, 2] * AU_KM
@@ -0,0 +1,200 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import CollectionInvalid
+
+from services.horizons_parser import Ephemeris
+
+logger = logging.getLogger(__name__)
+
+# Ephemeris field -> document field
+_FIELDS = {
+    'ra': 'ra',
+    'dec': 'dec',
+    'delta': 'delta',
+    'deldot': 'deldot',
+    'magnitude': 'magnitude',
+    'elongation': 'elongation',
+    'phase_angle': 'phaseAngle'
+}
+
+class EphemerisStore:
+    """Permanent per-epoch ephemeris samples, one document per comet and epoch.
+
+    Samples are only ever added: a refresh works out which epochs of the
+    requested grid are missing and fetches just those ranges, so a long
+    history window costs one small delta fetch instead of a full download
+    and document rewrite.
+
+    Two storage modes are supported:
+
+    - 'standard': an ordinary collection with a unique (cometId, timestamp)
+      index, written with unordered $setOnInsert upserts
+    - 'timeseries': a MongoDB time-series collection (timeField 'timestamp',
+      metaField 'cometId') for compressed storage and fast range scans once
+      history grows to millions of samples. Time-series collections cannot
+      have unique indexes, so new samples are filtered against the stored
+      epochs and written with unordered insert_many batches.
+    """
+
+    MODES = ('standard', 'timeseries')
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        collection: str = 'comet_ephemeris',
+        mode: str = 'standard',
+        batch_size: int = 1000
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown ephemeris storage mode: {mode}")
+        self.db = db
+        self.collection_name = collection
+        self.collection = db[collection]
+        self.mode = mode
+        self.batch_size = batch_size
+
+    async def ensure_indexes(self):
+        """Create the collection (time-series mode) and its (cometId, timestamp) index"""
+        if self.mode == 'timeseries':
+            try:
+                await self.db.create_collection(
+                    self.collection_name,
+                    timeseries={'timeField': 'timestamp', 'metaField': 'cometId', 'granularity': 'minutes'}
+                )
+                logger.info(f"Created time-series collection {self.collection_name}")
+            except CollectionInvalid:
+                pass  # already exists
+            await self.collection.create_index([('cometId', ASCENDING), ('timestamp', ASCENDING)])
+        else:
+            await self.collection.create_index(
+                [('cometId', ASCENDING), ('timestamp', ASCENDING)],
+                unique=True
+            )
+
+    def _find(self, comet_id: str, start: datetime, end: datetime, fields):
+        """Projection-limited cursor over start <= timestamp <= end, oldest first"""
+        projection = {'_id': 0, 'timestamp': 1, **{field: 1 for field in fields}}
+        return self.collection.find(
+            {'cometId': comet_id, 'timestamp': {'$gte': start, '$lte': end}},
+            projection
+        ).sort('timestamp', ASCENDING).batch_size(self.batch_size)
+
+    async def read(self, comet_id: str, start: datetime, end: datetime) -> Ephemeris:
+        """Read stored samples with start <= timestamp <= end, oldest first"""
+        chunks = [chunk async for chunk in self.iter_batches(comet_id, start, end)]
+        if not chunks:
+            return _to_ephemeris([])
+        if len(chunks) == 1:
+            return chunks[0]
+
+        return Ephemeris(**{
+            name: np.concatenate([getattr(chunk, name) for chunk in chunks])
+            for name in ('time', *_FIELDS)
+        })
+
+    async def iter_batches(self, comet_id: str, start: datetime, end: datetime):
+        """Yield stored samples for the range as Ephemeris chunks of at most batch_size rows"""
+        cursor = self._find(comet_id, start, end, _FIELDS.values())
+        batch = []
+        last_timestamp = None
+        async for doc in cursor:
+            # Time-series collections can hold a duplicate epoch if two
+            # workers raced to fill the same gap; keep the first one
+            if doc['timestamp'] == last_timestamp:
+                continue
+            last_timestamp = doc['timestamp']
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                yield _to_ephemeris(batch)
+                batch = []
+        if batch:
+            yield _to_ephemeris(batch)
+
+    async def stored_times(self, comet_id: str, start: datetime, end: datetime) -> np.ndarray:
+        """datetime64 epochs stored for the range"""
+        docs = await self._find(comet_id, start, end, ()).to_list(length=None)
+        return np.array([doc['timestamp'] for doc in docs], dtype='datetime64[ms]')
+
+    async def write(self, comet_id: str, ephem: Ephemeris):
+        """Insert samples for epochs not stored yet; existing epochs are left untouched"""
+        if len(ephem) == 0:
+            return
+
+        docs = _to_documents(comet_id, ephem)
+        if self.mode == 'timeseries':
+            stored = await self.stored_times(comet_id, docs[0]['timestamp'], docs[-1]['timestamp'])
+            stored = set(stored.tolist())
+            docs = [doc for doc in docs if doc['timestamp'] not in stored]
+
+        written = 0
+        for i in range(0, len(docs), self.batch_size):
+            batch = docs[i:i + self.batch_size]
+            if self.mode == 'timeseries':
+                result = await self.collection.insert_many(batch, ordered=False)
+                written += len(result.inserted_ids)
+            else:
+                result = await self.collection.bulk_write(
+                    [
+                        UpdateOne(
+                            {'cometId': comet_id, 'timestamp': doc['timestamp']},
+                            {'$setOnInsert': doc},
+                            upsert=True
+                        )
+                        for doc in batch
+                    ],
+                    ordered=False
+                )
+                written += result.upserted_count
+
+        logger.info(f"Stored {written} new ephemeris samples for {comet_id}")
+
+def _to_documents(comet_id: str, ephem: Ephemeris) -> List[Dict]:
+    """One document per ephemeris row; NaN becomes null"""
+    columns = {field: getattr(ephem, name).tolist() for name, field in _FIELDS.items()}
+    docs = []
+    for i, timestamp in enumerate(ephem.time.astype('datetime64[ms]').tolist()):
+        doc = {'cometId': comet_id, 'timestamp': timestamp}
+        for field, values in columns.items():
+            value = values[i]
+            doc[field] = value if value == value else None
+        docs.append(doc)
+    return docs
+
+def _to_ephemeris(docs: List[Dict]) -> Ephemeris:
+    """Columnar Ephemeris from stored documents"""
+    return Ephemeris(
+        time=np.array([doc['timestamp'] for doc in docs], dtype='datetime64[ms]'),
+        **{
+            name: np.array(
+                [doc.get(field) if doc.get(field) is not None else np.nan for doc in docs],
+                dtype=np.float64
+            )
+            for name, field in _FIELDS.items()
+        }
+    )
+
+def missing_ranges(
+    stored: np.ndarray,
+    start: datetime,
+    end: datetime,
+    step: np.timedelta64
+) -> List[Tuple[datetime, datetime]]:
+    """Contiguous runs of the start..end grid (inclusive) with no stored sample"""
+    grid = np.arange(
+        np.datetime64(start, 'ms'),
+        np.datetime64(end, 'ms') + step,
+        step
+    )
+    missing = grid[~np.isin(grid, stored.astype('datetime64[ms]'))]
+    if len(missing) == 0:
+        return []
+
+    # Split wherever consecutive missing epochs are more than one step apart
+    breaks = np.flatnonzero(np.diff(missing) > step) + 1
+    runs = np.split(missing, breaks)
+    return [(run[0].item(), run[-1].item()) for run in runs]
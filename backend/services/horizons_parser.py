@@ -0,0 +1,142 @@
+"""Vectorized parser for JPL Horizons OBSERVER ephemeris tables.
+
+Targets the text output of the QUANTITIES='1,9,20,23,24' table used by
+CometService (calendar dates, HMS angles), e.g.
+
+     2025-Oct-17 00:00 *m  13 03 38.24 -05 04 50.8   11.863  16.262  2.58741357428006 -16.0812700   14.6262 /T   5.4000
+
+The whole $$SOE..$$EOE block is tokenized with one compiled regex and
+then converted column-wise into NumPy arrays, so no per-row Python
+objects beyond the regex tuples are created.
+"""
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+AU_KM = 149597870.7
+J2000 = np.datetime64('2000-01-01T12:00:00', 'ms')
+
+_NUM = r'[-+]?\d+(?:\.\d*)?(?:[Ee][-+]?\d+)?'
+_NUM_OR_NA = rf'(?:{_NUM}|n\.a\.)'
+
+_ROW_RE = re.compile(
+    rf'''
+    ^\s*(\d{{4}})-([A-Za-z]{{3}})-(\d{{2}})            # date
+    \s+(\d{{2}}):(\d{{2}})(?::(\d{{2}}(?:\.\d+)?))?   # time, optional seconds
+    \s+(?:[*CNA][mrts]?|[mrts])?\s+                   # solar / lunar presence markers
+    (\d{{1,2}})\s+(\d{{1,2}})\s+(\d{{1,2}}(?:\.\d*)?)\s+          # 1: R.A. h m s
+    ([-+])(\d{{1,2}})\s+(\d{{1,2}})\s+(\d{{1,2}}(?:\.\d*)?)\s+    # 1: DEC d m s
+    ({_NUM_OR_NA})\s+({_NUM_OR_NA})\s+                # 9: T-mag N-mag (APmag S-brt)
+    ({_NUM})\s+({_NUM})\s+                            # 20: delta deldot
+    ({_NUM_OR_NA})\s*/\S?\s+                          # 23: S-O-T /r
+    ({_NUM_OR_NA})                                    # 24: S-T-O
+    ''',
+    re.MULTILINE | re.VERBOSE
+)
+
+_MONTH_NAMES = np.array(['Apr', 'Aug', 'Dec', 'Feb', 'Jan', 'Jul', 'Jun', 'Mar', 'May', 'Nov', 'Oct', 'Sep'])
+_MONTH_NUMBERS = np.array([4, 8, 12, 2, 1, 7, 6, 3, 5, 11, 10, 9])
+
+@dataclass(frozen=True)
+class Ephemeris:
+    """Columnar observer ephemeris; every field is an array of equal length"""
+    time: np.ndarray         # datetime64[ms], UT
+    ra: np.ndarray           # degrees
+    dec: np.ndarray          # degrees
+    delta: np.ndarray        # AU, observer range
+    deldot: np.ndarray       # km/s, observer range rate
+    magnitude: np.ndarray    # total magnitude (T-mag / APmag), NaN if n.a.
+    elongation: np.ndarray   # degrees, Sun-Observer-Target
+    phase_angle: np.ndarray  # degrees, Sun-Target-Observer
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def take(self, index) -> 'Ephemeris':
+        """Rows selected by a boolean mask or an index array"""
+        return Ephemeris(**{name: getattr(self, name)[index] for name in self.__dataclass_fields__})
+
+def extract_ephemeris_block(response_text: str) -> str:
+    """Return the text between $$SOE and $$EOE"""
+    start = response_text.find('$$SOE')
+    if start < 0:
+        raise ValueError("No ephemeris data found in response")
+    start = response_text.find('\n', start) + 1
+    end = response_text.find('$$EOE', start)
+    return response_text[start:end if end >= 0 else len(response_text)]
+
+def _to_float(column: np.ndarray) -> np.ndarray:
+    return np.where(column == 'n.a.', 'nan', column).astype(np.float64)
+
+def parse_observer_table(response_text: str) -> Ephemeris:
+    """Parse a whole Horizons observer table into an Ephemeris"""
+    rows = _ROW_RE.findall(extract_ephemeris_block(response_text))
+    if not rows:
+        raise ValueError("No ephemeris rows matched the expected table format")
+
+    cols = np.array(rows, dtype=str).T
+
+    years = cols[0].astype(np.int64)
+    months = _MONTH_NUMBERS[np.searchsorted(_MONTH_NAMES, cols[1])]
+    days = cols[2].astype(np.int64)
+    seconds = _to_float(np.where(cols[5] == '', '0', cols[5]))
+    millis = (
+        cols[3].astype(np.int64) * 3600000
+        + cols[4].astype(np.int64) * 60000
+        + np.round(seconds * 1000).astype(np.int64)
+    )
+    time = (
+        (years - 1970).astype('datetime64[Y]').astype('datetime64[M]')
+        + (months - 1).astype('timedelta64[M]')
+    ).astype('datetime64[D]') + (days - 1).astype('timedelta64[D]')
+    time = time.astype('datetime64[ms]') + millis.astype('timedelta64[ms]')
+
+    ra = 15.0 * (_to_float(cols[6]) + _to_float(cols[7]) / 60.0 + _to_float(cols[8]) / 3600.0)
+    dec_sign = np.where(cols[9] == '-', -1.0, 1.0)
+    dec = dec_sign * (_to_float(cols[10]) + _to_float(cols[11]) / 60.0 + _to_float(cols[12]) / 3600.0)
+
+    return Ephemeris(
+        time=time,
+        ra=ra,
+        dec=dec,
+        delta=_to_float(cols[15]),
+        deldot=_to_float(cols[16]),
+        magnitude=_to_float(cols[13]),
+        elongation=_to_float(cols[17]),
+        phase_angle=_to_float(cols[18])
+    )
+
+def days_since_j2000(time: np.ndarray) -> np.ndarray:
+    """Fractional days between datetime64 values and J2000.0"""
+    return (time.astype('datetime64[ms]') - J2000).astype(np.float64) / 86400000.0
+
+def sun_distance(time: np.ndarray) -> np.ndarray:
+    """Earth-Sun distance in AU (low-precision solar theory, ~1e-4 AU)"""
+    g = np.radians(357.529 + 0.98560028 * days_since_j2000(time))
+    return 1.00014 - 0.01671 * np.cos(g) - 0.00014 * np.cos(2 * g)
+
+def heliocentric_distance(ephem: Ephemeris) -> np.ndarray:
+    """Target-Sun distance in AU from delta and solar elongation"""
+    earth_sun = sun_distance(ephem.time)
+    elongation = np.radians(ephem.elongation)
+    return np.sqrt(earth_sun ** 2 + ephem.delta ** 2 - 2 * earth_sun * ephem.delta * np.cos(elongation))
+
+def unit_vectors(ra: np.ndarray, dec: np.ndarray) -> np.ndarray:
+    """Cartesian unit vectors (N, 3) for RA/Dec in degrees"""
+    ra = np.radians(ra)
+    dec = np.radians(dec)
+    cos_dec = np.cos(dec)
+    return np.stack([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)], axis=-1)
+
+def tangential_velocity(ephem: Ephemeris) -> np.ndarray:
+    """Plane-of-sky velocity in km/s from the angular rate between rows.
+
+    Needs at least two rows; returns NaN otherwise.
+    """
+    if len(ephem) < 2:
+        return np.full(len(ephem), np.nan)
+
+    seconds = (ephem.time - ephem.time[0]).astype(np.float64) / 1000.0
+    rate = np.gradient(unit_vectors(ephem.ra, ephem.dec), seconds, axis=0)
+    return np.linalg.norm(rate, axis=1) * ephem.delta * AU_KM
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import logging
+from datetime import timedelta
+from typing import Dict, Optional, Set
+
+from services.comet_service import CometService
+
+logger = logging.getLogger(__name__)
+
+class LiveFeed:
+    """Fans out current comet data to Server-Sent Events subscribers.
+
+    One producer task per comet evaluates the current payload every
+    interval (interpolated from the local ephemeris between refreshes),
+    encodes it once as an SSE frame and hands the same bytes to every
+    subscriber. Producers only run while a comet has subscribers. Each
+    subscriber holds at most the newest frame, so a slow client skips
+    intermediate positions instead of building up a backlog.
+    """
+
+    def __init__(
+        self,
+        comet_service: CometService,
+        interval: timedelta = timedelta(seconds=5),
+        heartbeat: timedelta = timedelta(seconds=15)
+    ):
+        self.comet_service = comet_service
+        self.interval = interval
+        # Comment frame sent when nothing changed, keeping proxies from closing idle streams
+        self.heartbeat = heartbeat
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._producers: Dict[str, asyncio.Task] = {}
+        self._latest: Dict[str, bytes] = {}
+
+    def subscriber_count(self, comet_id: Optional[str] = None) -> int:
+        """Open subscriptions for one comet, or for all of them"""
+        if comet_id is not None:
+            return len(self._subscribers.get(comet_id, ()))
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def subscribe(self, comet_id: str) -> asyncio.Queue:
+        """Register a subscriber and start the comet's producer if needed"""
+        queue = asyncio.Queue(maxsize=1)
+        # Late joiners get the last frame right away instead of waiting a tick
+        if comet_id in self._latest:
+            queue.put_nowait(self._latest[comet_id])
+        self._subscribers.setdefault(comet_id, set()).add(queue)
+
+        producer = self._producers.get(comet_id)
+        if producer is None or producer.done():
+            self._producers[comet_id] = asyncio.ensure_future(self._produce(comet_id))
+        return queue
+
+    def unsubscribe(self, comet_id: str, queue: asyncio.Queue):
+        """Remove a subscriber; the producer exits once none are left"""
+        queues = self._subscribers.get(comet_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[comet_id]
+
+    async def stream(self, comet_id: str):
+        """Async iterator of SSE frames for one subscriber"""
+        queue = self.subscribe(comet_id)
+        try:
+            yield b'retry: 5000\n\n'
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), self.heartbeat.total_seconds())
+                except asyncio.TimeoutError:
+                    frame = b': keep-alive\n\n'
+                yield frame
+        finally:
+            self.unsubscribe(comet_id, queue)
+
+    async def stop(self):
+        """Cancel every producer"""
+        producers = list(self._producers.values())
+        self._producers.clear()
+        for producer in producers:
+            producer.cancel()
+        await asyncio.gather(*producers, return_exceptions=True)
+        self._subscribers.clear()
+        self._latest.clear()
+
+    async def _produce(self, comet_id: str):
+        last_updated = None
+        try:
+            while self._subscribers.get(comet_id):
+                try:
+                    data = await self.comet_service.get_current_comet_data(comet_id)
+                    if data.get('lastUpdated') != last_updated:
+                        last_updated = data.get('lastUpdated')
+                        self._publish(comet_id, self._encode(data))
+                except Exception as e:
+                    logger.error(f"Live feed for {comet_id} failed: {str(e)}")
+
+                await asyncio.sleep(self.interval.total_seconds())
+        finally:
+            self._latest.pop(comet_id, None)
+            if self._producers.get(comet_id) is asyncio.current_task():
+                del self._producers[comet_id]
+
+    def _encode(self, data: Dict) -> bytes:
+        """One SSE frame, shared by every subscriber"""
+        payload = json.dumps(data, separators=(',', ':'), default=str)
+        return f"event: current\nid: {data.get('lastUpdated', '')}\ndata: {payload}\n\n".encode()
+
+    def _publish(self, comet_id: str, frame: bytes):
+        self._latest[comet_id] = frame
+        for queue in self._subscribers.get(comet_id, ()):
+            if queue.full():
+                # Drop the frame the subscriber has not read yet
+                queue.get_nowait()
+            queue.put_nowait(frame)
@@ -0,0 +1,81 @@
+"""Low-precision lunar ephemeris and phase.
+
+Truncated lunar theory from the Astronomical Almanac (section D): about
+0.3 degrees in longitude and 0.2 degrees in latitude, which is far more
+than enough to name the phase. Every function is vectorized over
+datetime64 arrays, so labelling a whole ephemeris costs a few array
+operations.
+"""
+from typing import Tuple
+
+import numpy as np
+
+from services.horizons_parser import days_since_j2000
+from services.visibility import mean_obliquity, sun_ecliptic_longitude
+
+EARTH_RADIUS_KM = 6378.14
+
+PHASE_NAMES = np.array([
+    'New Moon', 'Waxing Crescent', 'First Quarter', 'Waxing Gibbous',
+    'Full Moon', 'Waning Gibbous', 'Last Quarter', 'Waning Crescent'
+], dtype=object)
+
+def _sin(degrees):
+    return np.sin(np.radians(degrees))
+
+def _cos(degrees):
+    return np.cos(np.radians(degrees))
+
+def moon_ecliptic(times: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Geocentric ecliptic longitude, latitude (degrees) and distance (km) of the Moon"""
+    t = days_since_j2000(times) / 36525.0
+    longitude = (
+        218.32 + 481267.881 * t
+        + 6.29 * _sin(135.0 + 477198.87 * t)
+        - 1.27 * _sin(259.3 - 413335.36 * t)
+        + 0.66 * _sin(235.7 + 890534.22 * t)
+        + 0.21 * _sin(269.9 + 954397.74 * t)
+        - 0.19 * _sin(357.5 + 35999.05 * t)
+        - 0.11 * _sin(186.5 + 966404.03 * t)
+    )
+    latitude = (
+        5.13 * _sin(93.3 + 483202.02 * t)
+        + 0.28 * _sin(228.2 + 960400.89 * t)
+        - 0.28 * _sin(318.3 + 6003.15 * t)
+        - 0.17 * _sin(217.6 - 407332.21 * t)
+    )
+    parallax = (
+        0.9508
+        + 0.0518 * _cos(135.0 + 477198.87 * t)
+        + 0.0095 * _cos(259.3 - 413335.36 * t)
+        + 0.0078 * _cos(235.7 + 890534.22 * t)
+        + 0.0028 * _cos(269.9 + 954397.74 * t)
+    )
+    return np.mod(longitude, 360.0), latitude, EARTH_RADIUS_KM / _sin(parallax)
+
+def moon_position(times: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Geocentric R.A., Dec. (degrees) and distance (km) of the Moon"""
+    longitude, latitude, distance = moon_ecliptic(times)
+    obliquity = mean_obliquity(times)
+    ra = np.degrees(np.arctan2(
+        _sin(longitude) * _cos(obliquity) - np.tan(np.radians(latitude)) * _sin(obliquity),
+        _cos(longitude)
+    ))
+    dec = np.degrees(np.arcsin(
+        _sin(latitude) * _cos(obliquity) + _cos(latitude) * _sin(obliquity) * _sin(longitude)
+    ))
+    return np.mod(ra, 360.0), dec, distance
+
+def moon_phase(times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Phase name and illuminated fraction (0-1) of the Moon at each epoch.
+
+    The name is the 45-degree sector of the Moon-Sun difference in
+    ecliptic longitude (New Moon within 22.5 degrees of conjunction, and
+    so on round to Waning Crescent).
+    """
+    times = np.atleast_1d(np.asarray(times, dtype='datetime64[ms]'))
+    longitude, latitude, _ = moon_ecliptic(times)
+    age = np.mod(longitude - sun_ecliptic_longitude(times), 360.0)
+    illumination = (1 - _cos(latitude) * _cos(age)) / 2
+    sector = (np.mod(age + 22.5, 360.0) // 45).astype(np.intp)
+    return PHASE_NAMES[sector], illumination
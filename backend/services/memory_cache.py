@@ -0,0 +1,48 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Hashable, Optional, Tuple
+
+class TTLCache:
+    """Small bounded in-process cache with a per-entry absolute expiry.
+
+    Entries are evicted least-recently-used once max_size is reached and
+    are never returned after their expiry time, which the caller derives
+    from the backing MongoDB document so every worker drops the same entry
+    at the same wall-clock instant.
+    """
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Tuple[datetime, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, now: Optional[datetime] = None) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if (now or datetime.utcnow()) >= expires_at:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: datetime, now: Optional[datetime] = None):
+        """Store value until expires_at; already-expired entries are not stored"""
+        if (now or datetime.utcnow()) >= expires_at:
+            self._entries.pop(key, None)
+            return
+
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,225 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+A deliberately small subset of prometheus_client (labelled counters,
+gauges and histograms) so the service needs no extra dependency; render() produces
+the text served by /api/metrics.
+
+Timed sections can also be recorded as spans of the current request,
+which the HTTP middleware returns in a Server-Timing header.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: List['_Metric'] = []
+
+    def register(self, metric: '_Metric') -> '_Metric':
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        # Label values are text in the exposition format; stringify them so
+        # keys of one metric always sort (e.g. status=200 next to 'error')
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set"""
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}')
+        return lines
+
+class Gauge(Counter):
+    """Value that can go up and down per label set"""
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    """Cumulative-bucket distribution of observed values per label set"""
+    kind = 'histogram'
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._values: Dict[Tuple, List] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[i] += 1
+                break
+        state[-2] += value
+        state[-1] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[-1] if state else 0
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, state in sorted(self._values.items()):
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += state[i]
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_number(state[-2])}')
+            lines.append(f'{self.name}_count{labels} {state[-1]}')
+        return lines
+
+# Server-Timing spans of the request being handled: name -> [seconds, count]
+_spans: ContextVar[Optional[Dict[str, List]]] = ContextVar('server_timing_spans', default=None)
+
+def start_request_timing() -> Dict[str, List]:
+    """Begin collecting spans for the current request context"""
+    spans = {}
+    _spans.set(spans)
+    return spans
+
+def record_span(name: str, seconds: float):
+    """Add a timed section to the current request's Server-Timing spans"""
+    spans = _spans.get()
+    if spans is not None:
+        span = spans.setdefault(name, [0.0, 0])
+        span[0] += seconds
+        span[1] += 1
+
+def server_timing_header(spans: Dict[str, List], total: float) -> str:
+    """Server-Timing header value: one entry per span plus the total"""
+    entries = [
+        f'{name};dur={seconds * 1000:.1f};desc="{count}x"'
+        for name, (seconds, count) in spans.items()
+    ]
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+@contextmanager
+def timed(histogram: Histogram, span: Optional[str] = None, **labels):
+    """Observe the block's duration in histogram and, if named, as a request span"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        histogram.observe(elapsed, **labels)
+        if span:
+            record_span(span, elapsed)
+
+# Service metrics
+CACHE_REQUESTS = Counter(
+    'comet_cache_requests_total',
+    'Comet data lookups by data type and cache result (hit, stale, miss)',
+    ('data_type', 'result')
+)
+JPL_REQUEST_SECONDS = Histogram(
+    'comet_jpl_request_seconds',
+    'Latency of JPL Horizons requests',
+    ('outcome',)
+)
+JPL_RESPONSES = Counter(
+    'comet_jpl_responses_total',
+    'JPL Horizons responses by HTTP status code (or "error" when no response arrived)',
+    ('status',)
+)
+JPL_REJECTED = Counter(
+    'comet_jpl_rejected_total',
+    'JPL calls refused locally by the rate limiter or circuit breaker',
+    ('reason',)
+)
+PARSE_SECONDS = Histogram(
+    'comet_parse_seconds',
+    'Time spent parsing Horizons responses, including any wait for the parse pool',
+    ('kind', 'mode'),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+PARSE_QUEUE_DEPTH = Gauge(
+    'comet_parse_queue_depth',
+    'Horizons responses submitted to the parse process pool and not yet parsed'
+)
+PARSE_BYTES = Counter(
+    'comet_parse_bytes_total',
+    'Size of parsed Horizons responses',
+    ('mode',)
+)
+MONGO_SECONDS = Histogram(
+    'comet_mongo_operation_seconds',
+    'Latency of MongoDB operations',
+    ('operation',),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+FALLBACKS = Counter(
+    'comet_fallback_total',
+    'Responses served from a fallback path',
+    ('data_type', 'kind')
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'comet_http_request_seconds',
+    'Latency of API responses with a Content-Length by route and status code; streamed bodies (SSE, exports, NDJSON status) are not recorded',
+    ('method', 'route', 'status')
+)
@@ -0,0 +1,194 @@
+"""Vectorized two-body (Keplerian) propagator for comet orbits.
+
+Positions are heliocentric, geometric (no light-time or aberration) and
+referred to the J2000 ecliptic; geocentric quantities use a low-precision
+Earth orbit propagated the same way. Accuracy is far below Horizons, but
+good enough to keep offline fallback values physically plausible.
+Handles elliptic, hyperbolic and (near-)parabolic orbits, and every
+function accepts whole arrays of epochs at once.
+"""
+import re
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from services.horizons_parser import AU_KM, Ephemeris
+
+GAUSS_K = 0.01720209895
+MU_SUN = GAUSS_K ** 2  # AU^3 / day^2
+OBLIQUITY_J2000 = np.radians(23.4392911)
+JD_UNIX_EPOCH = 2440587.5
+JD_J2000 = 2451545.0
+PARABOLIC_TOLERANCE = 1e-6
+
+@dataclass(frozen=True)
+class OrbitalElements:
+    """Osculating heliocentric elements (J2000 ecliptic, angles in degrees)"""
+    eccentricity: float
+    perihelion_distance: float       # AU
+    perihelion_time: float           # Julian date (TDB)
+    inclination: float
+    ascending_node: float
+    argument_of_perihelion: float
+    total_magnitude: Optional[float] = None   # M1
+    magnitude_slope: Optional[float] = None   # K1
+
+    @property
+    def semi_major_axis(self) -> float:
+        """AU; negative for hyperbolic orbits, infinite for parabolic ones"""
+        if abs(1 - self.eccentricity) < PARABOLIC_TOLERANCE:
+            return np.inf
+        return self.perihelion_distance / (1 - self.eccentricity)
+
+# Mean J2000 elements of the Earth-Moon barycentre (Standish, JPL)
+EARTH_ELEMENTS = OrbitalElements(
+    eccentricity=0.01671123,
+    perihelion_distance=1.00000261 * (1 - 0.01671123),
+    perihelion_time=JD_J2000 + 2.47311027 / np.degrees(GAUSS_K / 1.00000261 ** 1.5),
+    inclination=0.0,
+    ascending_node=0.0,
+    argument_of_perihelion=102.93768193
+)
+
+_ELEMENT_RE = {
+    name: re.compile(rf'(?<![A-Za-z0-9]){key}=\s*([-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[Ee][-+]?\d+)?)')
+    for name, key in (
+        ('eccentricity', 'EC'),
+        ('perihelion_distance', 'QR'),
+        ('perihelion_time', 'TP'),
+        ('inclination', 'IN'),
+        ('ascending_node', 'OM'),
+        ('argument_of_perihelion', 'W'),
+        ('total_magnitude', 'M1'),
+        ('magnitude_slope', '[Kk]1')
+    )
+}
+
+def parse_elements(response_text: str) -> Optional[OrbitalElements]:
+    """Read the osculating elements from a Horizons object-data header.
+
+    Horizons writes values below one without the leading zero (EC= .967)
+    and the comet magnitude slope in lower case (k1=).
+    """
+    header = response_text.split('$$SOE', 1)[0]
+    values = {}
+    for name, pattern in _ELEMENT_RE.items():
+        match = pattern.search(header)
+        if match:
+            values[name] = float(match.group(1))
+
+    required = ('eccentricity', 'perihelion_distance', 'perihelion_time',
+                'inclination', 'ascending_node', 'argument_of_perihelion')
+    if not all(name in values for name in required):
+        return None
+    return OrbitalElements(**values)
+
+def julian_date(times: np.ndarray) -> np.ndarray:
+    """Julian dates for datetime64 values (UT used as TDB)"""
+    times = np.asarray(times, dtype='datetime64[ms]')
+    return JD_UNIX_EPOCH + times.astype(np.int64) / 86400000.0
+
+def _solve_anomaly(elements: OrbitalElements, dt: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """True anomaly (rad) and radius (AU) at dt days from perihelion"""
+    e = elements.eccentricity
+    q = elements.perihelion_distance
+
+    if abs(1 - e) < PARABOLIC_TOLERANCE:
+        # Barker's equation, solved in closed form
+        w = 3 * np.sqrt(MU_SUN / (2 * q ** 3)) * dt
+        y = np.cbrt(w / 2 + np.sqrt(w ** 2 / 4 + 1))
+        tan_half = y - 1 / y
+        return 2 * np.arctan(tan_half), q * (1 + tan_half ** 2)
+
+    a = q / (1 - e)
+    n = np.sqrt(MU_SUN / abs(a) ** 3)
+    mean_anomaly = n * dt
+
+    if e < 1:
+        mean_anomaly = np.mod(mean_anomaly + np.pi, 2 * np.pi) - np.pi
+        anomaly = np.where(e > 0.8, np.pi * np.sign(mean_anomaly), mean_anomaly + e * np.sin(mean_anomaly))
+        for _ in range(50):
+            step = (anomaly - e * np.sin(anomaly) - mean_anomaly) / (1 - e * np.cos(anomaly))
+            anomaly = anomaly - step
+            if np.all(np.abs(step) < 1e-12):
+                break
+        nu = 2 * np.arctan2(np.sqrt(1 + e) * np.sin(anomaly / 2), np.sqrt(1 - e) * np.cos(anomaly / 2))
+        return nu, a * (1 - e * np.cos(anomaly))
+
+    anomaly = np.arcsinh(mean_anomaly / e)
+    for _ in range(50):
+        step = (e * np.sinh(anomaly) - anomaly - mean_anomaly) / (e * np.cosh(anomaly) - 1)
+        anomaly = anomaly - step
+        if np.all(np.abs(step) < 1e-12):
+            break
+    nu = 2 * np.arctan(np.sqrt((e + 1) / (e - 1)) * np.tanh(anomaly / 2))
+    return nu, a * (1 - e * np.cosh(anomaly))
+
+def propagate(elements: OrbitalElements, jd: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Heliocentric ecliptic position (AU) and velocity (AU/day), each (N, 3)"""
+    jd = np.atleast_1d(np.asarray(jd, dtype=np.float64))
+    e = elements.eccentricity
+    nu, r = _solve_anomaly(elements, jd - elements.perihelion_time)
+
+    p = elements.perihelion_distance * (1 + e)
+    speed = np.sqrt(MU_SUN / p)
+    x, y = r * np.cos(nu), r * np.sin(nu)
+    vx, vy = -speed * np.sin(nu), speed * (e + np.cos(nu))
+
+    node = np.radians(elements.ascending_node)
+    incl = np.radians(elements.inclination)
+    peri = np.radians(elements.argument_of_perihelion)
+    p_axis = np.array([
+        np.cos(node) * np.cos(peri) - np.sin(node) * np.sin(peri) * np.cos(incl),
+        np.sin(node) * np.cos(peri) + np.cos(node) * np.sin(peri) * np.cos(incl),
+        np.sin(peri) * np.sin(incl)
+    ])
+    q_axis = np.array([
+        -np.cos(node) * np.sin(peri) - np.sin(node) * np.cos(peri) * np.cos(incl),
+        -np.sin(node) * np.sin(peri) + np.cos(node) * np.cos(peri) * np.cos(incl),
+        np.cos(peri) * np.sin(incl)
+    ])
+    return np.outer(x, p_axis) + np.outer(y, q_axis), np.outer(vx, p_axis) + np.outer(vy, q_axis)
+
+def ecliptic_to_equatorial(vectors: np.ndarray) -> np.ndarray:
+    """Rotate (N, 3) J2000 ecliptic vectors into the J2000 equator"""
+    cos_e, sin_e = np.cos(OBLIQUITY_J2000), np.sin(OBLIQUITY_J2000)
+    x, y, z = vectors[:, 0], vectors[:, 1], vectors[:, 2]
+    return np.stack([x, y * cos_e - z * sin_e, y * sin_e + z * cos_e], axis=-1)
+
+def _angle_between(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    cos_angle = np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    return np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+
+def geocentric_ephemeris(elements: OrbitalElements, times: np.ndarray) -> Tuple[Ephemeris, np.ndarray]:
+    """Observer ephemeris from the geocentre plus tangential velocity (km/s)"""
+    times = np.atleast_1d(np.asarray(times, dtype='datetime64[ms]'))
+    jd = julian_date(times)
+    comet_pos, comet_vel = propagate(elements, jd)
+    earth_pos, earth_vel = propagate(EARTH_ELEMENTS, jd)
+
+    geo_pos = ecliptic_to_equatorial(comet_pos - earth_pos)
+    geo_vel = ecliptic_to_equatorial(comet_vel - earth_vel) * AU_KM / 86400.0  # km/s
+    delta = np.linalg.norm(geo_pos, axis=1)
+    line_of_sight = geo_pos / delta[:, None]
+    radial = np.sum(geo_vel * line_of_sight, axis=1)
+    tangential = np.linalg.norm(geo_vel - radial[:, None] * line_of_sight, axis=1)
+
+    r = np.linalg.norm(comet_pos, axis=1)
+    if elements.total_magnitude is not None and elements.magnitude_slope is not None:
+        magnitude = elements.total_magnitude + 5 * np.log10(delta) + elements.magnitude_slope * np.log10(r)
+    else:
+        magnitude = np.full(len(times), np.nan)
+
+    ephem = Ephemeris(
+        time=times,
+        ra=np.mod(np.degrees(np.arctan2(geo_pos[:, 1], geo_pos[:, 0])), 360.0),
+        dec=np.degrees(np.arcsin(np.clip(line_of_sight[:, 2], -1.0, 1.0))),
+        delta=delta,
+        deldot=radial,
+        magnitude=magnitude,
+        elongation=_angle_between(-earth_pos, comet_pos - earth_pos),
+        phase_angle=_angle_between(-comet_pos, earth_pos - comet_pos)
+    )
+    return ephem, tangential
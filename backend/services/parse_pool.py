@@ -0,0 +1,97 @@
+"""Off-loop parsing of Horizons observer tables.
+
+Parsing holds the GIL, so every millisecond spent on a large table is a
+millisecond no other request of the worker is served. Responses of at
+least threshold bytes are therefore parsed in a small process pool and
+come back as a compact columnar Ephemeris (a few NumPy arrays pickle far
+smaller than the text they came from); smaller ones are parsed inline,
+where handing them to another process would cost more than it saves.
+
+The default threshold follows the responses CometService actually
+requests (measured with the benchmark stub's tables):
+
+    3-day current table, 10 min step   ~50 KB   ~5 ms inline   pool
+    168 h history gap, 1 h step        ~20 KB   ~2 ms inline   inline
+    30 h history gap, 1 h step          ~4 KB  ~0.5 ms inline  inline
+
+Handing a table to the pool adds ~0.5-1 ms of latency but keeps the event
+loop busy for well under 0.1 ms, so only the dense current table (and
+archive replays of it) is worth sending there.
+
+The pool is started lazily with the 'spawn' method (forking a process
+that runs an event loop and driver threads is not safe) and parsing falls
+back to inline if it cannot be used.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from services import horizons_parser, metrics
+
+logger = logging.getLogger(__name__)
+
+# Between the largest history gap (~20 KB) and the dense current table (~50 KB)
+DEFAULT_THRESHOLD_BYTES = 32 * 1024
+
+class ParsePool:
+    """Parses Horizons responses inline or in worker processes by size"""
+
+    def __init__(self, threshold_bytes: int = DEFAULT_THRESHOLD_BYTES, max_workers: Optional[int] = None):
+        self.threshold_bytes = threshold_bytes
+        self.max_workers = max_workers or min(2, os.cpu_count() or 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._disabled = False
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self._executor is None and not self._disabled:
+            try:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            except (OSError, ValueError, NotImplementedError) as e:
+                logger.warning(f"Parse process pool unavailable, parsing inline: {str(e)}")
+                self._disabled = True
+        return self._executor
+
+    async def parse(self, response_text: str, kind: str) -> horizons_parser.Ephemeris:
+        """Parse an observer table, off the event loop when it is large"""
+        size = len(response_text)
+        executor = self._get_executor() if size >= self.threshold_bytes else None
+        started = time.perf_counter()
+
+        if executor is not None:
+            metrics.PARSE_QUEUE_DEPTH.inc()
+            try:
+                ephem = await asyncio.get_running_loop().run_in_executor(
+                    executor, horizons_parser.parse_observer_table, response_text
+                )
+                mode = 'process'
+            except BrokenProcessPool:
+                logger.error("Parse process pool broke, parsing inline from now on")
+                self.close()
+                self._disabled = True
+                executor = None
+            finally:
+                metrics.PARSE_QUEUE_DEPTH.dec()
+
+        if executor is None:
+            ephem = horizons_parser.parse_observer_table(response_text)
+            mode = 'inline'
+
+        elapsed = time.perf_counter() - started
+        metrics.PARSE_SECONDS.observe(elapsed, kind=kind, mode=mode)
+        metrics.PARSE_BYTES.inc(size, mode=mode)
+        metrics.record_span('parse', elapsed)
+        return ephem
+
+    def close(self):
+        """Shut the worker processes down without waiting for queued parses"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
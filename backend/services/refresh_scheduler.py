@@ -0,0 +1,210 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, Optional
+
+from services.comet_service import CometService
+
+logger = logging.getLogger(__name__)
+
+class RefreshScheduler:
+    """Background task that refreshes cached comet data ahead of expiry.
+
+    The current document is refreshed lead_time before its nextUpdate, and
+    every recently requested history window has its newest hourly epoch
+    fetched shortly after it becomes available. Requests therefore keep
+    answering from cache while the scheduler does the slow JPL calls. When
+    no real JPL request has been made for probe_interval, a cheap probe
+    keeps upstream health current.
+    Failed refreshes are retried with exponential backoff; CometService
+    counts them and switches to its fallback chain after repeated failures.
+
+    Every comet in the service registry is refreshed this way. Due jobs of
+    one cycle run concurrently (at most max_concurrency at a time), and jobs
+    that need a JPL request only start while the shared rate limiter has
+    more than upstream_reserve tokens left for request-path misses and the
+    circuit breaker is closed; the rest are deferred to the next cycle,
+    oldest deadline first.
+
+    When the service has a shared snapshot, only the worker holding the
+    snapshot lock runs refreshes; its results reach the other workers on
+    the host through the snapshot file, and the history windows requested
+    from those workers are forwarded to it and scheduled like its own.
+    """
+
+    def __init__(
+        self,
+        comet_service: CometService,
+        lead_time: timedelta = timedelta(minutes=2),
+        retry_delay: timedelta = timedelta(seconds=30),
+        max_retry_delay: timedelta = timedelta(minutes=10),
+        max_sleep: timedelta = timedelta(minutes=1),
+        history_delay: timedelta = timedelta(minutes=1),
+        probe_interval: timedelta = timedelta(minutes=5),
+        tracked_hours_ttl: timedelta = timedelta(hours=24),
+        max_concurrency: int = 4,
+        upstream_reserve: int = 20
+    ):
+        self.comet_service = comet_service
+        self.lead_time = lead_time
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        # Upper bound on a single sleep so newly requested windows get picked up
+        self.max_sleep = max_sleep
+        # How long after each hour boundary the new history epoch is fetched
+        self.history_delay = history_delay
+        # Probe JPL only when no real request has been observed for this long
+        self.probe_interval = probe_interval
+        # History windows nobody asked for in this long stop being refreshed
+        self.tracked_hours_ttl = tracked_hours_ttl
+        self.max_concurrency = max_concurrency
+        # Rate-limiter tokens kept free for requests that miss every cache
+        self.upstream_reserve = upstream_reserve
+        self._next_run: Dict[Hashable, datetime] = {}
+        self._failures: Dict[Hashable, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the scheduler loop on the running event loop"""
+        if self._task is None:
+            # Settle the snapshot role before the first request is served
+            if self.comet_service.snapshot is not None:
+                self.comet_service.snapshot.try_lead()
+            self._task = asyncio.ensure_future(self._run())
+            logger.info("Comet refresh scheduler started")
+
+    async def stop(self):
+        """Cancel the scheduler loop and wait for it to exit"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Comet refresh scheduler stopped")
+
+    async def _run(self):
+        snapshot = self.comet_service.snapshot
+        while True:
+            # With a shared snapshot only one worker per host refreshes; the
+            # others stand by and take over once the leader's lock is released
+            if snapshot is not None and not snapshot.try_lead():
+                await asyncio.sleep(self.max_sleep.total_seconds())
+                continue
+
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Refresh scheduler iteration failed: {str(e)}")
+            # Followers report the upstream health published here
+            self.comet_service.publish_snapshot()
+
+            await asyncio.sleep(self._seconds_until_next_run())
+
+    async def run_once(self):
+        """Run every refresh that is due now, within the upstream budget"""
+        now = datetime.utcnow()
+        service = self.comet_service
+        service.adopt_forwarded_windows(self.tracked_hours_ttl)
+        self._prune_tracked_hours(now)
+
+        jobs = []
+        for comet in service.registry:
+            key = (comet.comet_id, 'current')
+            if self._is_due(key, now):
+                jobs.append((
+                    key,
+                    lambda comet_id=comet.comet_id: self._refresh_current(comet_id),
+                    service.needs_upstream(comet.comet_id)
+                ))
+
+        for comet_id, hours in list(service.tracked_hours):
+            key = (comet_id, 'historical', hours)
+            if self._is_due(key, now):
+                jobs.append((
+                    key,
+                    lambda comet_id=comet_id, hours=hours: self._refresh_historical(comet_id, hours),
+                    True
+                ))
+
+        # Oldest deadline first, so deferred jobs are not starved
+        jobs.sort(key=lambda job: self._next_run.get(job[0], datetime.min))
+        budget = service.upstream_calls_remaining() - self.upstream_reserve
+        runnable = []
+        for key, fn, needs_upstream in jobs:
+            if needs_upstream:
+                if budget <= 0:
+                    self._next_run[key] = now + self.max_sleep
+                    continue
+                budget -= 1
+            runnable.append((key, fn))
+
+        if len(runnable) < len(jobs):
+            logger.warning(
+                f"Upstream budget exhausted or circuit open, deferring {len(jobs) - len(runnable)} refreshes"
+            )
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(key, fn):
+            async with semaphore:
+                await self._refresh(key, fn)
+
+        await asyncio.gather(*(run(key, fn) for key, fn in runnable))
+
+        if service.upstream_health.needs_probe(self.probe_interval, now):
+            await service.probe_upstream()
+
+    async def _refresh_current(self, comet_id: str) -> datetime:
+        """Refresh current data; return when the next refresh is due"""
+        max_age = timedelta(minutes=self.comet_service.cache_duration) - self.lead_time
+        data = await self.comet_service.refresh_current(comet_id, max_age=max_age)
+
+        next_run = datetime.utcnow() + max_age
+        try:
+            next_run = min(next_run, datetime.fromisoformat(data['nextUpdate']) - self.lead_time)
+        except (KeyError, TypeError, ValueError):
+            pass
+        return next_run
+
+    async def _refresh_historical(self, comet_id: str, hours: int) -> datetime:
+        """Fill one history window; return when its next epoch is due"""
+        await self.comet_service.refresh_historical(hours, comet_id)
+        next_epoch = datetime.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        return next_epoch + self.history_delay
+
+    async def _refresh(self, key: Hashable, fn):
+        try:
+            self._next_run[key] = await fn()
+            self._failures.pop(key, None)
+        except Exception as e:
+            failures = self._failures.get(key, 0) + 1
+            self._failures[key] = failures
+            delay = min(self.retry_delay * (2 ** (failures - 1)), self.max_retry_delay)
+            self._next_run[key] = datetime.utcnow() + delay
+            logger.warning(
+                f"Refresh of {key} failed ({failures} in a row), "
+                f"retrying in {delay.total_seconds():.0f}s: {str(e)}"
+            )
+
+    def _is_due(self, key: Hashable, now: datetime) -> bool:
+        next_run = self._next_run.get(key)
+        return next_run is None or next_run <= now
+
+    def _seconds_until_next_run(self) -> float:
+        now = datetime.utcnow()
+        delay = self.max_sleep
+        if self._next_run:
+            delay = min(delay, min(self._next_run.values()) - now)
+        return max(delay.total_seconds(), 1.0)
+
+    def _prune_tracked_hours(self, now: datetime):
+        tracked_hours = self.comet_service.tracked_hours
+        for (comet_id, hours), last_requested in list(tracked_hours.items()):
+            if now - last_requested > self.tracked_hours_ttl:
+                del tracked_hours[(comet_id, hours)]
+                self._next_run.pop((comet_id, 'historical', hours), None)
+                self._failures.pop((comet_id, 'historical', hours), None)
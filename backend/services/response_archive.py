@@ -0,0 +1,93 @@
+"""On-disk archive of complete Horizons responses.
+
+Every successful ephemeris response is kept gzip-compressed under a key
+derived from its query parameters (sha256 of the sorted parameters), so
+the same query always maps to the same file and a newer answer replaces
+the older one. Each file holds one JSON metadata line (parameters, fetch
+time, length) followed by the verbatim response text:
+
+    <root>/ab/ab12...ef.txt.gz
+
+Archived responses can be re-parsed at any time without JPL, e.g. by
+CometService.replay_archive after a parser change, or served again by
+the benchmark Horizons stub.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ResponseArchive:
+    """Content-addressed, compressed store of raw Horizons responses"""
+
+    SUFFIX = '.txt.gz'
+
+    def __init__(self, root: str, compresslevel: int = 6):
+        self.root = Path(root)
+        self.compresslevel = compresslevel
+
+    @staticmethod
+    def key(params: Dict) -> str:
+        """Archive key of a query: sha256 over its parameters in sorted order"""
+        canonical = json.dumps({str(k): str(v) for k, v in params.items()}, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}{self.SUFFIX}"
+
+    def save(self, params: Dict, response_text: str, fetched_at: Optional[datetime] = None) -> Path:
+        """Archive a response, atomically replacing any earlier answer to the same query"""
+        path = self.path(self.key(params))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        metadata = {
+            'params': {str(k): str(v) for k, v in params.items()},
+            'fetchedAt': (fetched_at or datetime.utcnow()).isoformat(),
+            'length': len(response_text)
+        }
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=self.compresslevel) as f:
+                f.write(json.dumps(metadata).encode() + b'\n')
+                f.write(response_text.encode())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return path
+
+    @staticmethod
+    def load(path: Path) -> Tuple[Dict, str]:
+        """Metadata and response text of an archived file"""
+        with gzip.open(path, 'rb') as f:
+            metadata = json.loads(f.readline())
+            return metadata, f.read().decode()
+
+    def get(self, params: Dict) -> Optional[str]:
+        """Archived response to exactly this query, if any"""
+        path = self.path(self.key(params))
+        if not path.exists():
+            return None
+        return self.load(path)[1]
+
+    def entries(self) -> List[Tuple[Dict, Path]]:
+        """Metadata and path of every archived response, oldest fetch first.
+
+        Only the metadata line of each file is decompressed.
+        """
+        entries = []
+        for path in self.root.glob(f"*/*{self.SUFFIX}"):
+            try:
+                with gzip.open(path, 'rb') as f:
+                    entries.append((json.loads(f.readline()), path))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable archive file {path}: {str(e)}")
+        entries.sort(key=lambda entry: entry[0].get('fetchedAt', ''))
+        return entries
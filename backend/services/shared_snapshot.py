@@ -0,0 +1,281 @@
+"""Host-wide snapshot of current comet data shared by every uvicorn worker.
+
+One worker per host holds an exclusive flock on <path>.lock and is the
+only one that refreshes from Mongo/JPL. After a refresh it re-encodes the
+latest current payload, osculating elements and dense ephemeris of the
+comets that changed, writes them together with the unchanged comets'
+stored bytes into a new file and renames it over <path>, so readers only
+ever see complete snapshots. Every other worker maps the file read-only
+and exposes the ephemeris columns as NumPy views of the mapping (no copy,
+no parsing), so per-host upstream and database traffic does not grow with
+the number of workers. When the leader exits its lock is released and the
+next worker to try takes over, starting from the file it left behind.
+
+Followers never call JPL themselves: they report the upstream health the
+leader publishes with every write, and the history windows their clients
+ask for are handed to the leader through small <path>.windows.<pid>
+files (see forward_windows).
+
+File layout (little endian):
+
+    header   magic, format version, sequence, written at, metadata length
+    metadata UTF-8 JSON: under 'comets', per comet the payload, cachedAt,
+             rawData, elements and the row count and byte offset of its
+             columns; under 'upstream', the leader's upstream health
+    columns  per comet: time (int64 ms since the epoch) followed by the
+             float64 columns of Ephemeris, 8-byte aligned
+"""
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from services.horizons_parser import Ephemeris
+from services.orbit_propagator import OrbitalElements
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'CMTSNAP\x00'
+FORMAT_VERSION = 2
+_HEADER = struct.Struct('<8sIxxxxQdQ')  # magic, format version, sequence, written at, metadata length
+_COLUMNS = ('ra', 'dec', 'delta', 'deldot', 'magnitude', 'elongation', 'phase_angle')
+
+@dataclass
+class SnapshotEntry:
+    """Shared state of one comet"""
+    payload: Dict
+    cached_at: datetime
+    ephemeris: Optional[Ephemeris] = None
+    ephemeris_raw: str = ''
+    elements: Optional[OrbitalElements] = None
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+def _encode(entry: SnapshotEntry) -> Tuple[Dict, bytes]:
+    """Metadata (without offset) and column bytes of one comet"""
+    ephem = entry.ephemeris
+    rows = len(ephem) if ephem is not None else 0
+    metadata = {
+        'payload': entry.payload,
+        'cachedAt': entry.cached_at.isoformat(),
+        'rawData': entry.ephemeris_raw,
+        'elements': asdict(entry.elements) if entry.elements is not None else None,
+        'rows': rows
+    }
+    columns = b''
+    if rows:
+        columns = ephem.time.astype('datetime64[ms]').astype('<i8').tobytes() + b''.join(
+            np.ascontiguousarray(getattr(ephem, name), dtype='<f8').tobytes() for name in _COLUMNS
+        )
+    return metadata, columns
+
+def _parse(buffer) -> Optional[Tuple[int, Dict, int]]:
+    """Sequence, metadata and start of the columns of a snapshot buffer; None if it is not one"""
+    if len(buffer) < _HEADER.size:
+        return None
+    magic, version, sequence, _, meta_length = _HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        logger.warning(f"Ignoring snapshot with unsupported format {magic!r} v{version}")
+        return None
+    metadata = json.loads(buffer[_HEADER.size:_HEADER.size + meta_length])
+    return sequence, metadata, _align(_HEADER.size + meta_length)
+
+def _atomic_write(path: Path, *chunks: bytes):
+    """Write chunks to a temporary file next to path and rename it over path"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+class SharedSnapshot:
+    """Single-writer, many-reader snapshot file; see the module docstring"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.lock_path = Path(f"{path}.lock")
+        self.is_leader = False
+        # Sequence number of the newest snapshot written or read
+        self.sequence = 0
+        self._lock_file = None
+        self._identity = None  # (inode, mtime) of the file last mapped
+        # Leader only: encoded metadata and columns of every comet in the file
+        self._encoded: Dict[str, Tuple[Dict, bytes]] = {}
+        # Upstream health published by the leader, as of the last write or read
+        self.upstream: Optional[Dict] = None
+
+    def try_lead(self) -> bool:
+        """Become the host's snapshot writer if no other worker is; True if this worker is"""
+        if self.is_leader:
+            return True
+        try:
+            lock_file = open(self.lock_path, 'a+')
+        except OSError as e:
+            logger.error(f"Could not open snapshot lock {self.lock_path}: {str(e)}")
+            return False
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        self._lock_file = lock_file
+        self.is_leader = True
+        self._seed_from_file()
+        logger.info(f"Worker {os.getpid()} is the shared snapshot writer for {self.path} (sequence {self.sequence})")
+        return True
+
+    def _seed_from_file(self):
+        """Continue from the file left by the previous writer: its sequence and every comet in it"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            parsed = _parse(data)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Could not read previous snapshot {self.path}: {str(e)}")
+            return
+        if parsed is None:
+            return
+
+        sequence, metadata, body_start = parsed
+        self.sequence = max(self.sequence, sequence)
+        self.upstream = metadata.get('upstream')
+        for comet_id, meta in metadata.get('comets', {}).items():
+            start = body_start + meta.pop('offset')
+            self._encoded[comet_id] = (meta, data[start:start + meta['rows'] * 8 * (len(_COLUMNS) + 1)])
+
+    def release(self):
+        """Give up the writer role (closing the lock file releases the flock)"""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        self.is_leader = False
+        self._encoded = {}
+
+    def publish(self, changed: Dict[str, SnapshotEntry], upstream: Optional[Dict] = None) -> int:
+        """Atomically replace the snapshot file with the changed comets updated; returns the new sequence number.
+
+        Only the changed comets are encoded; every other comet keeps the
+        bytes it was last published (or seeded) with. upstream, if given,
+        replaces the published upstream health.
+        """
+        for comet_id, entry in changed.items():
+            self._encoded[comet_id] = _encode(entry)
+        if upstream is not None:
+            self.upstream = upstream
+
+        comets = {}
+        offset = 0
+        for comet_id, (meta, columns) in self._encoded.items():
+            comets[comet_id] = {**meta, 'offset': offset}
+            offset += len(columns)
+
+        meta_bytes = json.dumps({'comets': comets, 'upstream': self.upstream}, default=str).encode()
+        sequence = self.sequence + 1
+        header = _HEADER.pack(MAGIC, FORMAT_VERSION, sequence, time.time(), len(meta_bytes))
+        padding = b'\0' * (_align(_HEADER.size + len(meta_bytes)) - _HEADER.size - len(meta_bytes))
+        _atomic_write(self.path, header, meta_bytes, padding, *(columns for _, columns in self._encoded.values()))
+
+        self.sequence = sequence
+        return sequence
+
+    def read(self) -> Optional[Dict[str, SnapshotEntry]]:
+        """Entries of the snapshot if the file was replaced since the last read, else None.
+
+        Ephemeris columns are read-only views of the mapping; a replaced
+        file stays mapped for as long as any of its arrays is referenced.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                identity = (stat.st_ino, stat.st_mtime_ns)
+                if identity == self._identity or stat.st_size < _HEADER.size:
+                    return None
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+        # A new file (inode, mtime) is a new snapshot, whatever its sequence:
+        # numbering restarts if the file was removed between two writers
+        self._identity = identity
+        parsed = _parse(mapped)
+        if parsed is None:
+            return None
+        sequence, metadata, body_start = parsed
+        self.upstream = metadata.get('upstream')
+
+        entries = {}
+        for comet_id, meta in metadata['comets'].items():
+            ephem = None
+            rows = meta['rows']
+            if rows:
+                offset = body_start + meta['offset']
+                time_column = np.frombuffer(mapped, dtype='<i8', count=rows, offset=offset)
+                values = {
+                    name: np.frombuffer(mapped, dtype='<f8', count=rows, offset=offset + (k + 1) * rows * 8)
+                    for k, name in enumerate(_COLUMNS)
+                }
+                ephem = Ephemeris(time=time_column.view('datetime64[ms]'), **values)
+
+            elements = meta.get('elements')
+            entries[comet_id] = SnapshotEntry(
+                payload=meta['payload'],
+                cached_at=datetime.fromisoformat(meta['cachedAt']),
+                ephemeris=ephem,
+                ephemeris_raw=meta.get('rawData', ''),
+                elements=OrbitalElements(**elements) if elements else None
+            )
+
+        self.sequence = sequence
+        return entries
+
+    def _windows_path(self, pid: int) -> Path:
+        return self.path.with_name(f"{self.path.name}.windows.{pid}")
+
+    def forward_windows(self, windows: Dict[Tuple[str, int], datetime]):
+        """Hand this follower's requested (comet_id, hours) history windows to the leader"""
+        records = [[comet_id, hours, requested.isoformat()] for (comet_id, hours), requested in windows.items()]
+        _atomic_write(self._windows_path(os.getpid()), json.dumps(records).encode())
+
+    def forwarded_windows(self, max_age: timedelta) -> Dict[Tuple[str, int], datetime]:
+        """Newest request time of every window forwarded by a follower (leader side).
+
+        Files not rewritten for max_age, e.g. of workers that have exited,
+        are removed.
+        """
+        windows: Dict[Tuple[str, int], datetime] = {}
+        for path in self.path.parent.glob(f"{self.path.name}.windows.*"):
+            try:
+                if time.time() - path.stat().st_mtime > max_age.total_seconds():
+                    path.unlink()
+                    continue
+                records = json.loads(path.read_bytes())
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping forwarded windows {path}: {str(e)}")
+                continue
+            for comet_id, hours, requested in records:
+                requested = datetime.fromisoformat(requested)
+                key = (comet_id, int(hours))
+                if key not in windows or requested > windows[key]:
+                    windows[key] = requested
+        return windows
@@ -0,0 +1,35 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight task.
+
+    The first caller for a key starts the work; every caller that arrives
+    while it is running awaits the same task and shares its result (or its
+    exception). The key is forgotten as soon as the task finishes, so the
+    next miss after that starts a new flight.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() once per key among concurrent callers and return its result"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            logger.info(f"Joining in-flight request for {key}")
+
+        # Shield so a cancelled waiter (client disconnect) does not cancel
+        # the shared upstream fetch for everyone else.
+        return await asyncio.shield(task)
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Return True if a call for key is currently running"""
+        return key in self._calls
@@ -0,0 +1,138 @@
+import random
+import time
+from typing import Dict, Optional
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling JPL when the rate limit or circuit breaker forbids it,
+    or when neither JPL data nor a local substitute is available to answer from"""
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by every JPL call.
+
+    With capacity + rate * 3600 kept within the hourly budget, no sliding
+    hour can exceed it: the bucket allows short bursts of up to capacity
+    calls and refills at rate tokens per second.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate  # tokens per second
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    @classmethod
+    def per_hour(cls, budget: int, burst: int) -> 'TokenBucket':
+        """Bucket that never exceeds budget calls in any hour"""
+        return cls(capacity=burst, rate=(budget - burst) / 3600.0)
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self, now: Optional[float] = None) -> float:
+        """Tokens that can be spent right now"""
+        self._refill(now if now is not None else time.monotonic())
+        return self._tokens
+
+    def try_acquire(self, tokens: float = 1.0, now: Optional[float] = None) -> bool:
+        """Spend tokens if available; never waits"""
+        self._refill(now if now is not None else time.monotonic())
+        if self._tokens < tokens:
+            return False
+        self._tokens -= tokens
+        return True
+
+    def wait_time(self, tokens: float = 1.0, now: Optional[float] = None) -> float:
+        """Seconds until tokens will be available"""
+        missing = tokens - self.available(now)
+        return max(missing / self.rate, 0.0) if self.rate > 0 else float('inf')
+
+class CircuitBreaker:
+    """Fails JPL calls fast while the upstream is known to be unhealthy.
+
+    - 'closed': calls go through; failure_threshold consecutive failures
+      (a call slower than slow_call_threshold counts as one) open it
+    - 'open': calls are refused until reset_timeout has passed
+    - 'half_open': a single trial call is let through; success closes the
+      breaker, failure reopens it with the timeout doubled (up to
+      max_reset_timeout)
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        slow_call_threshold: float = 20.0,
+        reset_timeout: float = 60.0,
+        max_reset_timeout: float = 600.0
+    ):
+        self.failure_threshold = failure_threshold
+        self.slow_call_threshold = slow_call_threshold  # seconds
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """True if a call may be made now (claims the trial call when half open)"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker lets a trial call through"""
+        if self._opened_at is None:
+            return 0.0
+        return max(self._opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def record_success(self, latency: float):
+        if latency > self.slow_call_threshold:
+            self.record_failure()
+            return
+        self.consecutive_failures = 0
+        self.reset_timeout = self.base_reset_timeout
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self._trial_in_flight:
+            # Trial call failed: back off further before the next one
+            self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+            self._trial_in_flight = False
+            self._opened_at = time.monotonic()
+        elif self._opened_at is None and self.consecutive_failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+
+    def abandon(self):
+        """Forget a call that ended without an outcome (e.g. cancelled)"""
+        self._trial_in_flight = False
+
+    def snapshot(self) -> Dict:
+        """Serializable view of the breaker state"""
+        return {
+            'state': self.state,
+            'consecutiveFailures': self.consecutive_failures,
+            'retryAfterSeconds': round(self.retry_after(), 1)
+        }
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2^attempt)]"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
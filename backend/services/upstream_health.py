@@ -0,0 +1,93 @@
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+class UpstreamHealth:
+    """Passively collected health of the JPL Horizons upstream.
+
+    Every real request (and the occasional background probe) records its
+    outcome and latency here, so reporting health is a read of in-memory
+    state instead of a network call. The status is derived from a sliding
+    window of recent observations:
+
+    - 'down' after down_after consecutive failures
+    - 'degraded' when the window's error rate or median latency is too high
+    - 'active' otherwise
+
+    Before the first observation health is unconfirmed and reported as
+    'degraded', so status always stays within the API contract
+    (active/degraded/down).
+    """
+
+    def __init__(
+        self,
+        window: int = 50,
+        down_after: int = 3,
+        degraded_error_rate: float = 0.2,
+        degraded_latency: float = 5.0
+    ):
+        self.down_after = down_after
+        self.degraded_error_rate = degraded_error_rate
+        self.degraded_latency = degraded_latency  # seconds
+        self._samples = deque(maxlen=window)  # (ok, latency seconds)
+        self.consecutive_failures = 0
+        self.last_checked: Optional[datetime] = None
+        self.last_success: Optional[datetime] = None
+        self.last_status_code: Optional[int] = None
+        self.last_error: Optional[str] = None
+
+    def record(self, ok: bool, latency: float, status_code: Optional[int] = None, error: Optional[str] = None):
+        """Record the outcome of one upstream request"""
+        now = datetime.utcnow()
+        self._samples.append((ok, latency))
+        self.last_checked = now
+        self.last_status_code = status_code
+        if ok:
+            self.consecutive_failures = 0
+            self.last_success = now
+            self.last_error = None
+        else:
+            self.consecutive_failures += 1
+            self.last_error = error or (f"HTTP {status_code}" if status_code else None)
+
+    def needs_probe(self, interval: timedelta, now: Optional[datetime] = None) -> bool:
+        """True if nothing has been observed for longer than interval"""
+        return self.last_checked is None or (now or datetime.utcnow()) - self.last_checked >= interval
+
+    @property
+    def error_rate(self) -> float:
+        if not self._samples:
+            return 0.0
+        return sum(1 for ok, _ in self._samples if not ok) / len(self._samples)
+
+    @property
+    def median_latency(self) -> Optional[float]:
+        if not self._samples:
+            return None
+        latencies = sorted(latency for _, latency in self._samples)
+        return latencies[len(latencies) // 2]
+
+    @property
+    def status(self) -> str:
+        if not self._samples:
+            return 'degraded'
+        if self.consecutive_failures >= self.down_after:
+            return 'down'
+        if self.error_rate > self.degraded_error_rate or self.median_latency > self.degraded_latency:
+            return 'degraded'
+        return 'active'
+
+    def snapshot(self) -> Dict:
+        """Serializable view of the current upstream state"""
+        median_latency = self.median_latency
+        return {
+            'status': self.status,
+            'lastChecked': self.last_checked.isoformat() if self.last_checked else None,
+            'lastSuccess': self.last_success.isoformat() if self.last_success else None,
+            'lastStatusCode': self.last_status_code,
+            'lastError': self.last_error,
+            'consecutiveFailures': self.consecutive_failures,
+            'errorRate': round(self.error_rate, 3),
+            'medianLatencyMs': round(median_latency * 1000, 1) if median_latency is not None else None,
+            'samples': len(self._samples)
+        }
@@ -0,0 +1,245 @@
+"""Vectorized topocentric visibility for many observers at once.
+
+Everything works on (observers, times) arrays built from one geocentric
+ephemeris, so the cost of a request grows with observers x epochs in
+NumPy, not with Horizons queries. Positions are corrected for the
+observer's offset from the geocentre (diurnal parallax) but use mean
+sidereal time against ICRF coordinates and a low-precision Sun, so
+altitudes are good to a few tenths of a degree - plenty for visibility,
+not for pointing a telescope.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from services.horizons_parser import AU_KM, Ephemeris, days_since_j2000, sun_distance, unit_vectors
+from services.orbit_propagator import JD_J2000, julian_date
+
+EARTH_RADIUS_KM = 6378.137
+EARTH_FLATTENING = 1 / 298.257223563
+# Apparent altitude of the centre of a point source at rise/set (refraction)
+RISE_SET_ALTITUDE = -0.5667
+# Sun altitude below which the sky is astronomically dark
+ASTRONOMICAL_DARK = -18.0
+# Observer x epoch cells accepted per request, and computed per chunk of
+# observers (each cell costs ~200 bytes of temporaries while computing)
+MAX_CELLS = 3_000_000
+CHUNK_CELLS = 100_000
+
+def gmst(jd: np.ndarray) -> np.ndarray:
+    """Greenwich mean sidereal time in degrees"""
+    return np.mod(280.46061837 + 360.98564736629 * (jd - JD_J2000), 360.0)
+
+def mean_obliquity(times: np.ndarray) -> np.ndarray:
+    """Obliquity of the ecliptic in degrees (low precision)"""
+    return 23.439 - 0.0000004 * days_since_j2000(times)
+
+def sun_ecliptic_longitude(times: np.ndarray) -> np.ndarray:
+    """Apparent ecliptic longitude of the Sun in degrees (low precision)"""
+    n = days_since_j2000(times)
+    g = np.radians(357.528 + 0.9856003 * n)
+    return np.mod(280.460 + 0.9856474 * n + 1.915 * np.sin(g) + 0.020 * np.sin(2 * g), 360.0)
+
+def sun_position(times: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Geocentric R.A., Dec. (degrees) and distance (AU) of the Sun.
+
+    Low-precision formulae of the Astronomical Almanac, good to about
+    0.01 degrees between 1950 and 2050.
+    """
+    longitude = np.radians(sun_ecliptic_longitude(times))
+    obliquity = np.radians(mean_obliquity(times))
+    ra = np.degrees(np.arctan2(np.cos(obliquity) * np.sin(longitude), np.cos(longitude)))
+    dec = np.degrees(np.arcsin(np.sin(obliquity) * np.sin(longitude)))
+    return np.mod(ra, 360.0), dec, sun_distance(times)
+
+def _observer_offsets(lat: np.ndarray, elevation: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distance of each observer from the Earth's axis and from the equator plane, in AU (WGS84)"""
+    phi = np.radians(lat)
+    c = 1 / np.sqrt(np.cos(phi) ** 2 + (1 - EARTH_FLATTENING) ** 2 * np.sin(phi) ** 2)
+    s = (1 - EARTH_FLATTENING) ** 2 * c
+    height = elevation / 1000.0
+    rho_cos = (EARTH_RADIUS_KM * c + height) * np.cos(phi) / AU_KM
+    rho_sin = (EARTH_RADIUS_KM * s + height) * np.sin(phi) / AU_KM
+    return rho_cos, rho_sin
+
+def horizontal(
+    ra: np.ndarray,
+    dec: np.ndarray,
+    distance: np.ndarray,
+    times: np.ndarray,
+    lat: np.ndarray,
+    lon: np.ndarray,
+    elevation: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Topocentric altitude, azimuth (from north through east) and hour angle, each (O, T) degrees.
+
+    The observer's geocentric position is subtracted from the target's
+    and the difference projected straight onto each observer's local
+    east/north/up axes, so there is one sin/cos of local sidereal time per
+    cell rather than a round trip through topocentric R.A./Dec.
+    """
+    lst = np.radians(gmst(julian_date(times))[None, :] + lon[:, None])
+    cos_lst, sin_lst = np.cos(lst), np.sin(lst)
+    phi = np.radians(lat)[:, None]
+    sin_phi, cos_phi = np.sin(phi), np.cos(phi)
+    rho_cos, rho_sin = _observer_offsets(lat, elevation)
+
+    target = unit_vectors(ra, dec) * distance[:, None]
+    x = target[:, 0] - rho_cos[:, None] * cos_lst
+    y = target[:, 1] - rho_cos[:, None] * sin_lst
+    z = target[:, 2] - rho_sin[:, None]
+
+    # Components along the local meridian (towards the axis), east and the pole
+    meridian = x * cos_lst + y * sin_lst
+    east = y * cos_lst - x * sin_lst
+    up = meridian * cos_phi + z * sin_phi
+    north = z * cos_phi - meridian * sin_phi
+
+    altitude = np.degrees(np.arctan2(up, np.hypot(east, north)))
+    azimuth = np.mod(np.degrees(np.arctan2(east, north)), 360.0)
+    hour_angle = np.degrees(np.arctan2(-east, meridian))
+    return altitude, azimuth, hour_angle
+
+def _first_upward_crossing(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Fractional grid index of each row's first crossing of 0 from below, and whether one exists"""
+    above = values > 0
+    crossing = above[:, 1:] & ~above[:, :-1]
+    found = crossing.any(axis=1)
+    i = crossing.argmax(axis=1)
+    rows = np.arange(len(values))
+    v0, v1 = values[rows, i], values[rows, i + 1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = np.where(found, v0 / (v0 - v1), 0.0)
+    return i + fraction, found
+
+def _interpolate_rows(values: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """values[row, index] for fractional indices, linearly interpolated"""
+    i = np.clip(np.floor(index).astype(np.intp), 0, values.shape[1] - 2)
+    fraction = index - i
+    rows = np.arange(len(values))
+    return values[rows, i] * (1 - fraction) + values[rows, i + 1] * fraction
+
+def _index_to_time(times: np.ndarray, index: np.ndarray, found: np.ndarray) -> np.ndarray:
+    """datetime64 for fractional grid indices; NaT where nothing was found"""
+    seconds = times.astype('datetime64[ms]').astype(np.float64)
+    result = np.interp(index, np.arange(len(times)), seconds)
+    result = result.astype(np.int64).astype('datetime64[ms]')
+    return np.where(found, result, np.datetime64('NaT'))
+
+@dataclass
+class VisibilityEvents:
+    """Rise/transit/set and dark-sky windows per observer over a search grid"""
+    rise: np.ndarray               # datetime64[ms] (O,), NaT if none
+    transit: np.ndarray            # datetime64[ms] (O,)
+    set: np.ndarray                # datetime64[ms] (O,)
+    transit_altitude: np.ndarray   # degrees (O,), NaN without transit
+    dark_windows: List[List[Tuple[np.datetime64, np.datetime64]]]
+
+def events(
+    ephem: Ephemeris,
+    lat: np.ndarray,
+    lon: np.ndarray,
+    elevation: np.ndarray,
+    min_altitude: float = 10.0
+) -> VisibilityEvents:
+    """Rise, transit and set of the target and its dark-sky windows on ephem's time grid.
+
+    A dark-sky window is a run of grid epochs with the Sun below -18
+    degrees and the target above min_altitude.
+    """
+    times = ephem.time
+    altitude, _, hour_angle = horizontal(ephem.ra, ephem.dec, ephem.delta, times, lat, lon, elevation)
+
+    rise_index, has_rise = _first_upward_crossing(altitude - RISE_SET_ALTITUDE)
+    set_index, has_set = _first_upward_crossing(RISE_SET_ALTITUDE - altitude)
+    transit_index, has_transit = _first_upward_crossing(hour_angle)
+    # The hour angle wraps from +180 to -180 (a downward jump), so only the
+    # meridian passage at 0 is an upward crossing
+    transit_altitude = np.where(has_transit, _interpolate_rows(altitude, transit_index), np.nan)
+
+    sun_ra, sun_dec, sun_distance = sun_position(times)
+    sun_altitude, _, _ = horizontal(sun_ra, sun_dec, sun_distance, times, lat, lon, elevation)
+    dark = (sun_altitude < ASTRONOMICAL_DARK) & (altitude > min_altitude)
+
+    # Runs of True per row: +1 where a run starts, -1 one past where it ends
+    edges = np.diff(np.pad(dark.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+    starts = np.argwhere(edges == 1)
+    ends = np.argwhere(edges == -1)
+    windows: List[List[Tuple[np.datetime64, np.datetime64]]] = [[] for _ in range(len(lat))]
+    for (row, start), (_, end) in zip(starts.tolist(), ends.tolist()):
+        windows[row].append((times[start], times[end - 1]))
+
+    return VisibilityEvents(
+        rise=_index_to_time(times, rise_index, has_rise),
+        transit=_index_to_time(times, transit_index, has_transit),
+        set=_index_to_time(times, set_index, has_set),
+        transit_altitude=transit_altitude,
+        dark_windows=windows
+    )
+
+def isoformat(value: np.datetime64):
+    """ISO 8601 string (seconds) or None for NaT"""
+    if np.isnat(value):
+        return None
+    return np.datetime_as_string(value, unit='s') + 'Z'
+
+def format_result(
+    observers: List[Dict],
+    times: np.ndarray,
+    altitude: np.ndarray,
+    azimuth: np.ndarray,
+    found: VisibilityEvents
+) -> List[Dict]:
+    """JSON-ready per-observer visibility"""
+    time_strings = [isoformat(t) for t in times]
+    altitude = np.round(altitude, 3).tolist()
+    azimuth = np.round(azimuth, 3).tolist()
+    results = []
+    for k, observer in enumerate(observers):
+        transit_altitude = found.transit_altitude[k]
+        results.append({
+            **observer,
+            'positions': [
+                {'time': t, 'altitude': alt, 'azimuth': az}
+                for t, alt, az in zip(time_strings, altitude[k], azimuth[k])
+            ],
+            'rise': isoformat(found.rise[k]),
+            'transit': isoformat(found.transit[k]),
+            'set': isoformat(found.set[k]),
+            'transitAltitude': round(float(transit_altitude), 3) if np.isfinite(transit_altitude) else None,
+            'darkWindows': [
+                {'start': isoformat(start), 'end': isoformat(end)}
+                for start, end in found.dark_windows[k]
+            ]
+        })
+    return results
+
+def observer_visibility(
+    observers: List[Dict],
+    times: np.ndarray,
+    positions: Ephemeris,
+    search: Ephemeris,
+    min_altitude: float = 10.0,
+    chunk_cells: int = CHUNK_CELLS
+) -> List[Dict]:
+    """format_result for every observer, computed in chunks of observers.
+
+    positions is the ephemeris at times, search the one on the rise/set
+    search grid; chunking bounds the (observers, epochs) temporaries to
+    about chunk_cells cells whatever the batch size.
+    """
+    lat = np.array([o['latitude'] for o in observers], dtype=np.float64)
+    lon = np.array([o['longitude'] for o in observers], dtype=np.float64)
+    elevation = np.array([o.get('elevation', 0.0) for o in observers], dtype=np.float64)
+
+    step = max(chunk_cells // (len(times) + len(search)), 1)
+    results = []
+    for i in range(0, len(observers), step):
+        chunk = slice(i, i + step)
+        altitude, azimuth, _ = horizontal(
+            positions.ra, positions.dec, positions.delta, times, lat[chunk], lon[chunk], elevation[chunk]
+        )
+        found = events(search, lat[chunk], lon[chunk], elevation[chunk], min_altitude)
+        results.extend(format_result(observers[chunk], times, altitude, azimuth, found))
+    return results
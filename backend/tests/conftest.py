@@ -0,0 +1,38 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from mongomock_motor import AsyncMongoMockClient
+
+from benchmarks.fake_horizons import FakeHorizons
+from routes import comet_routes, http_cache
+from services.comet_service import CometService
+
+@pytest.fixture
+def run_api(monkeypatch):
+    """Run scenario(client, service, horizons) against the comet routes, an
+    in-memory MongoDB and the benchmark Horizons stub"""
+    def run(scenario, **horizons_options):
+        async def main():
+            horizons = FakeHorizons(**horizons_options)
+            service = CometService(
+                AsyncMongoMockClient()['comet_test'],
+                http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=horizons.app))
+            )
+            service.base_url = 'http://horizons.test/api/horizons.api'
+            monkeypatch.setattr(comet_routes, 'comet_service_instance', service)
+            monkeypatch.setattr(comet_routes, 'response_cache', http_cache.ResponseCache())
+            app = FastAPI()
+            app.include_router(comet_routes.router, prefix='/api')
+
+            await service.store.ensure_indexes()
+            await service.start()
+            try:
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+                    return await scenario(client, service, horizons)
+            finally:
+                await service.close()
+
+        return asyncio.run(main())
+    return run
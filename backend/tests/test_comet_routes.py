@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from routes import http_cache
+
+def test_coarser_resolution_never_returns_more_points(run_api):
+    async def scenario(client, service, horizons):
+        counts = {}
+        for resolution in ('1h', '12h', '16h', '1d', '2d'):
+            response = await client.get('/api/comet/3i-atlas/history', params={'hours': 30, 'resolution': resolution})
+            assert response.status_code == 200
+            counts[resolution] = len(response.json())
+        return counts
+
+    counts = run_api(scenario)
+    assert counts['1h'] == 31
+    assert counts['12h'] == 3
+    assert counts['1d'] < counts['12h']
+    assert counts['16h'] == counts['1d'] == 2
+    assert counts['2d'] == 1
+
+def _max_age(response) -> int:
+    directives = dict(
+        item.strip().partition('=')[::2] for item in response.headers['cache-control'].split(',')
+    )
+    return int(directives['max-age'])
+
+def test_partial_history_window_is_cached_briefly(run_api):
+    async def scenario(client, service, horizons):
+        await client.get('/api/comet/3i-atlas/history', params={'hours': 30})
+        partial = await client.get('/api/comet/3i-atlas/history', params={'hours': 168})
+        # The gap fill started by the partial answer
+        await asyncio.gather(*service._background_tasks)
+        complete = await client.get('/api/comet/3i-atlas/history', params={'hours': 168})
+        return partial, complete
+
+    partial, complete = run_api(scenario)
+    assert len(partial.json()) == 31
+    assert _max_age(partial) <= http_cache.DEGRADED_MAX_AGE
+    assert len(complete.json()) == 169
+    assert abs(_max_age(complete) - http_cache.history_max_age()) <= 1
+
+def test_current_max_age_counts_down_from_the_refresh(run_api):
+    async def scenario(client, service, horizons):
+        first = await client.get('/api/comet/3i-atlas/current')
+        state = service._state('3i_atlas')
+        refreshed_at = state.refreshed_at
+
+        # Ten minutes into the same refresh: five left, not fifteen again
+        state.refreshed_at = refreshed_at - timedelta(minutes=10)
+        later = await client.get('/api/comet/3i-atlas/current')
+
+        # Refresh overdue (its L1 entry and document have expired too):
+        # answered as due now, and the next refresh is started
+        state.refreshed_at = refreshed_at - timedelta(minutes=20)
+        service._l1.clear()
+        await service.flush_cache_writes()
+        await service.db.comet_data.update_many({}, {'$set': {'timestamp': state.refreshed_at}})
+        overdue = await client.get('/api/comet/3i-atlas/current')
+        await asyncio.gather(*service._background_tasks)
+        refreshed = await client.get('/api/comet/3i-atlas/current')
+        return first, later, overdue, refreshed, refreshed_at, state.refreshed_at, horizons.calls
+
+    first, later, overdue, refreshed, refreshed_at, next_refresh, calls = run_api(scenario)
+    assert 895 <= _max_age(first) <= 900
+    assert 295 <= _max_age(later) <= 300
+    assert datetime.fromisoformat(later.json()['nextUpdate']) == (
+        refreshed_at.replace(microsecond=0) + timedelta(minutes=5)
+    )
+    assert later.headers['etag'] != first.headers['etag']
+    assert _max_age(overdue) == 0
+    assert next_refresh > refreshed_at
+    assert 895 <= _max_age(refreshed) <= 900
+    # Every refresh after the first was answered from the local fit
+    assert calls == 1
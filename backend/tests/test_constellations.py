@@ -0,0 +1,23 @@
+import numpy as np
+
+from services.constellations import ConstellationIndex
+
+def test_bundled_boundaries_label_bright_stars():
+    index = ConstellationIndex.from_file(None)
+    stars = {
+        'Ursa Minor': (37.95, 89.26),     # Polaris
+        'Orion': (88.79, 7.41),           # Betelgeuse
+        'Canis Major': (101.29, -16.72),  # Sirius
+        'Lyra': (279.23, 38.78),          # Vega
+        'Crux': (186.65, -63.10),         # Acrux
+        'Octans': (317.19, -88.96),       # sigma Octantis
+        'Pisces': (0.5, 5.0)
+    }
+    ra = np.array([ra for ra, _ in stars.values()])
+    dec = np.array([dec for _, dec in stars.values()])
+    assert index.lookup(ra, dec).tolist() == list(stars)
+
+def test_unreadable_table_gives_an_empty_index(tmp_path):
+    index = ConstellationIndex.from_file(str(tmp_path / 'missing.dat'))
+    assert len(index) == 0
+    assert index.lookup(np.array([10.0]), np.array([10.0])).tolist() == [None]
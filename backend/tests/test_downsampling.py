@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from services import downsampling
+
+def _series(size: int):
+    x = np.arange(size, dtype=np.float64) * 3600.0
+    y = np.sin(np.arange(size) / 7.0) + np.arange(size) * 0.01
+    return x, y
+
+@pytest.mark.parametrize('method', downsampling.METHODS)
+@pytest.mark.parametrize('n', [3, 4, 5, 10, 11, 50, 169])
+def test_downsample_respects_the_point_budget(method, n):
+    x, y = _series(169)
+    indices = downsampling.downsample(x, y, n, method)
+    assert len(indices) <= n
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert np.all(np.diff(indices) > 0)
+
+@pytest.mark.parametrize('method', downsampling.METHODS)
+def test_budgets_below_three_keep_only_the_ends(method):
+    x, y = _series(31)
+    np.testing.assert_array_equal(downsampling.downsample(x, y, 2, method), [0, 30])
+    np.testing.assert_array_equal(downsampling.downsample(x, y, 1, method), [0])
+
+def test_minmax_keeps_each_buckets_extremes():
+    y = np.zeros(102)
+    y[10], y[60] = 5.0, -5.0
+    indices = downsampling.minmax(y, 6)
+    assert len(indices) <= 6
+    assert {0, 10, 60, 101} <= set(indices.tolist())
+
+def test_short_series_are_returned_whole():
+    x, y = _series(8)
+    for method in downsampling.METHODS:
+        np.testing.assert_array_equal(downsampling.downsample(x, y, 20, method), np.arange(8))
+
+def test_parse_resolution():
+    assert downsampling.parse_resolution('6h') == np.timedelta64(6, 'h')
+    assert downsampling.parse_resolution('1d') == np.timedelta64(1, 'D')
+    with pytest.raises(ValueError):
+        downsampling.parse_resolution('0h')
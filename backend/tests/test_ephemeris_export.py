@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+def _export(run_api, **params):
+    async def scenario(client, service, horizons):
+        await client.get('/api/comet/3i-atlas/history', params={'hours': 10})
+        start, end = service._history_window(10)
+        query = {'start': start.isoformat(), 'end': end.isoformat(), **params}
+        return await client.get('/api/comet/3i-atlas/export', params=query), start, end
+    return run_api(scenario)
+
+def test_ndjson_export(run_api):
+    response, start, end = _export(run_api, format='ndjson')
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert response.headers['content-disposition'].endswith('.ndjson"')
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 11
+    assert rows[0]['cometId'] == '3i_atlas'
+    assert rows[0]['timestamp'].startswith(start.isoformat())
+    assert rows[-1]['timestamp'].startswith(end.isoformat())
+    assert {'ra', 'dec', 'delta', 'deldot', 'magnitude', 'elongation', 'phase_angle'} <= set(rows[0])
+
+def test_csv_export_has_one_header(run_api):
+    response, start, _ = _export(run_api, format='csv')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 11
+    assert rows[0]['timestamp'].startswith(start.isoformat())
+    assert float(rows[0]['delta']) > 0
+
+def test_arrow_and_parquet_exports(run_api):
+    arrow, _, _ = _export(run_api, format='arrow')
+    parquet, _, _ = _export(run_api, format='parquet')
+    assert arrow.status_code == parquet.status_code == 200
+    assert pa.ipc.open_stream(arrow.content).read_all().num_rows == 11
+    table = pq.read_table(io.BytesIO(parquet.content))
+    assert table.num_rows == 11
+    assert table.column_names[:2] == ['cometId', 'timestamp']
+
+def test_reversed_range_and_unknown_format_are_400(run_api):
+    async def scenario(client, service, horizons):
+        start, end = service._history_window(10)
+        reversed_range = await client.get('/api/comet/3i-atlas/export', params={
+            'start': end.isoformat(), 'end': (end - timedelta(hours=1)).isoformat()
+        })
+        unknown = await client.get('/api/comet/3i-atlas/export', params={'start': start.isoformat(), 'format': 'xlsx'})
+        return reversed_range, unknown, horizons.calls
+
+    reversed_range, unknown, calls = run_api(scenario)
+    assert reversed_range.status_code == 400
+    assert unknown.status_code == 400
+    assert 'xlsx' in unknown.json()['detail']
+    assert calls == 0
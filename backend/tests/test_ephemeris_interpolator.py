@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from services.ephemeris_interpolator import EphemerisInterpolator
+from services.horizons_parser import AU_KM, Ephemeris
+
+START = np.datetime64('2025-11-01T00:00', 'ms')
+STEP = np.timedelta64(10, 'm')
+RA_RATE = 0.05 / 3600.0  # degrees per second
+
+def _series(rows: int = 145, ra0: float = 359.0) -> Ephemeris:
+    """Analytic ephemeris: R.A. linear in time through 0h, Dec. and range smooth"""
+    time = START + np.arange(rows) * STEP
+    hours = np.arange(rows) / 6.0
+    return Ephemeris(
+        time=time,
+        ra=np.mod(ra0 + RA_RATE * 3600.0 * hours, 360.0),
+        dec=-5.0 + 0.2 * np.sin(hours / 24.0),
+        delta=2.5 + 0.001 * hours,
+        deldot=np.full(rows, -16.0),
+        magnitude=np.full(rows, 11.9),
+        elongation=np.full(rows, 14.6),
+        phase_angle=np.full(rows, 5.4)
+    )
+
+def test_knots_are_reproduced_exactly():
+    ephem = _series()
+    fitted = EphemerisInterpolator(ephem).evaluate(ephem.time)
+    for field in ('dec', 'delta', 'deldot', 'magnitude', 'elongation', 'phase_angle'):
+        np.testing.assert_allclose(getattr(fitted, field), getattr(ephem, field), rtol=0, atol=1e-12)
+    np.testing.assert_allclose(np.mod(fitted.ra - ephem.ra + 180.0, 360.0) - 180.0, 0.0, atol=1e-9)
+
+def test_between_knots_matches_the_analytic_series():
+    ephem = _series()
+    fit = EphemerisInterpolator(ephem)
+    times = START + np.arange(1, 144 * 10, 7) * np.timedelta64(1, 'm')
+    fitted = fit.evaluate(times)
+    hours = (times - START).astype(np.float64) / 3600000.0
+
+    np.testing.assert_allclose(fitted.delta, 2.5 + 0.001 * hours, atol=1e-12)
+    dec = -5.0 + 0.2 * np.sin(hours / 24.0)
+    # Node slopes are one-sided (first order) in the end segments
+    interior = (hours > 1 / 6) & (hours < 24 - 1 / 6)
+    np.testing.assert_allclose(fitted.dec[interior], dec[interior], atol=1e-9)
+    np.testing.assert_allclose(fitted.dec, dec, atol=1e-6)
+
+def test_ra_wraps_at_zero_hours():
+    ephem = _series(ra0=359.9)
+    assert ephem.ra.min() < 1.0 and ephem.ra.max() > 359.0
+    fit = EphemerisInterpolator(ephem)
+    # Halfway through the segment crossing 360 -> 0
+    crossing = int(np.argmax(np.diff(ephem.ra) < 0))
+    middle = ephem.time[crossing] + STEP // 2
+    expected = np.mod(ephem.ra[crossing] + RA_RATE * 300.0, 360.0)
+
+    ra = fit.evaluate(middle).ra[0]
+    assert 0.0 <= ra < 360.0
+    assert abs(np.mod(ra - expected + 180.0, 360.0) - 180.0) < 1e-9
+    assert np.all((fit.evaluate(ephem.time).ra >= 0.0) & (fit.evaluate(ephem.time).ra < 360.0))
+
+def test_span_limits():
+    ephem = _series()
+    fit = EphemerisInterpolator(ephem)
+    assert fit.covers(ephem.time[0]) and fit.covers(ephem.time[-1])
+    assert not fit.covers(ephem.time[-1] + np.timedelta64(1, 's'))
+    assert not fit.covers(ephem.time[0] - np.timedelta64(1, 's'))
+    assert not fit.covers(np.array([ephem.time[0], ephem.time[-1] + STEP]))
+
+    # Outside the span the end segments are extrapolated, not clamped
+    beyond = fit.evaluate(ephem.time[-1] + np.timedelta64(1, 'h'))
+    assert beyond.delta[0] == pytest.approx(ephem.delta[-1] + 0.001, abs=1e-9)
+
+def test_too_short_ephemeris_is_rejected():
+    with pytest.raises(ValueError):
+        EphemerisInterpolator(_series(rows=1))
+
+def test_tangential_velocity_from_fitted_rates():
+    ephem = _series()
+    fit = EphemerisInterpolator(ephem)
+    times = ephem.time[10:20] + np.timedelta64(3, 'm')
+    fitted = fit.evaluate(times)
+    hours = (times - START).astype(np.float64) / 3600000.0
+
+    dec_rate = 0.2 * np.cos(hours / 24.0) / (24.0 * 3600.0)  # degrees per second
+    expected = np.hypot(np.radians(RA_RATE) * np.cos(np.radians(fitted.dec)), np.radians(dec_rate)) * fitted.delta * AU_KM
+    np.testing.assert_allclose(fit.tangential_velocity(times), expected, rtol=1e-6)
@@ -0,0 +1,111 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import numpy as np
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from benchmarks.fake_horizons import FakeHorizons
+from services.comet_service import CometService
+from services.ephemeris_store import EphemerisStore, missing_ranges
+from services.horizons_parser import Ephemeris
+
+HOUR = np.timedelta64(1, 'h')
+START = datetime(2025, 11, 1, 0, 0)
+END = datetime(2025, 11, 1, 10, 0)
+
+def _hours(*offsets) -> np.ndarray:
+    return np.datetime64(START, 'ms') + np.array(offsets, dtype=np.int64) * HOUR
+
+def _ephemeris(times: np.ndarray, delta: float = 1.0) -> Ephemeris:
+    values = np.full(len(times), delta)
+    return Ephemeris(
+        time=times, ra=values * 10, dec=values, delta=values, deldot=values,
+        magnitude=np.full(len(times), np.nan), elongation=values, phase_angle=values
+    )
+
+def _at(hour: int) -> datetime:
+    return START + timedelta(hours=hour)
+
+def test_complete_window_has_no_gaps():
+    assert missing_ranges(_hours(*range(11)), START, END, HOUR) == []
+
+def test_single_gap():
+    stored = _hours(0, 1, 2, 6, 7, 8, 9, 10)
+    assert missing_ranges(stored, START, END, HOUR) == [(_at(3), _at(5))]
+
+def test_many_gaps_and_boundary_epochs():
+    stored = _hours(1, 2, 4, 7, 8)
+    assert missing_ranges(stored, START, END, HOUR) == [
+        (_at(0), _at(0)), (_at(3), _at(3)), (_at(5), _at(6)), (_at(9), _at(10))
+    ]
+
+def test_empty_store_is_one_gap_and_off_grid_samples_do_not_count():
+    assert missing_ranges(_hours(), START, END, HOUR) == [(START, END)]
+    off_grid = np.datetime64(START, 'ms') + np.arange(11) * HOUR + np.timedelta64(30, 'm')
+    assert missing_ranges(off_grid, START, END, HOUR) == [(START, END)]
+
+def test_write_never_rewrites_a_stored_epoch():
+    async def scenario():
+        store = EphemerisStore(AsyncMongoMockClient()['comet_test'])
+        await store.ensure_indexes()
+        await store.write('3i_atlas', _ephemeris(_hours(0, 1, 2), delta=1.0))
+        await store.write('3i_atlas', _ephemeris(_hours(2, 3), delta=2.0))
+        await store.write('other', _ephemeris(_hours(1), delta=5.0))
+        return (
+            await store.read('3i_atlas', START, END),
+            await store.read('3i_atlas', _at(1), _at(2)),
+            await store.collection.count_documents({})
+        )
+
+    ephem, bounded, documents = asyncio.run(scenario())
+    np.testing.assert_array_equal(ephem.time, _hours(0, 1, 2, 3))
+    # Epoch 2 keeps the value it was first stored with
+    np.testing.assert_array_equal(ephem.delta, [1.0, 1.0, 1.0, 2.0])
+    assert np.isnan(ephem.magnitude).all()
+    # Both ends of the range are inclusive; other comets are not read
+    np.testing.assert_array_equal(bounded.time, _hours(1, 2))
+    assert documents == 5
+
+def test_reads_are_batched_in_order():
+    async def scenario():
+        store = EphemerisStore(AsyncMongoMockClient()['comet_test'], batch_size=4)
+        await store.write('3i_atlas', _ephemeris(_hours(*range(10, -1, -1))))
+        batches = [len(chunk) async for chunk in store.iter_batches('3i_atlas', START, END)]
+        return batches, await store.read('3i_atlas', START, END)
+
+    batches, ephem = asyncio.run(scenario())
+    assert batches == [4, 4, 3]
+    np.testing.assert_array_equal(ephem.time, _hours(*range(11)))
+
+@pytest.mark.parametrize('stored, expected_calls', [
+    ((), 1),                                  # cold window: one fetch
+    ((0, 1, 2, 6, 7, 8, 9, 10), 1),           # one gap
+    ((1, 2, 4, 7, 8), 1),                     # four gaps: one request spanning them
+    ((0, 2, 4, 5, 6, 10), 3)                  # three gaps: one request each
+])
+def test_refresh_fetches_only_the_gaps(stored, expected_calls):
+    async def scenario():
+        horizons = FakeHorizons()
+        service = CometService(
+            AsyncMongoMockClient()['comet_test'],
+            http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=horizons.app))
+        )
+        service.base_url = 'http://horizons.test/api/horizons.api'
+        start, end = service._history_window(10)
+        grid = np.datetime64(start, 'ms') + np.arange(11) * HOUR
+        await service.store.write('3i_atlas', _ephemeris(grid[list(stored)], delta=9.0))
+
+        history = await service.refresh_historical(10, '3i_atlas')
+        complete = await service.store.read('3i_atlas', start, end)
+        await service.close()
+        return history, complete, grid, horizons.calls
+
+    history, complete, grid, calls = asyncio.run(scenario())
+    assert calls == expected_calls
+    assert len(history) == 11
+    np.testing.assert_array_equal(complete.time, grid)
+    # Stored samples were not replaced by the fetched ones
+    assert (complete.delta[list(stored)] == 9.0).all()
+    assert not (np.delete(complete.delta, list(stored)) == 9.0).any()
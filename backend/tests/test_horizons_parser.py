@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from services import horizons_parser
+
+RESPONSE = (Path(__file__).parent / 'data' / 'horizons_observer_3i_atlas.txt').read_text()
+
+def test_observer_table_is_parsed_column_wise():
+    ephem = horizons_parser.parse_observer_table(RESPONSE)
+
+    assert len(ephem) == 8
+    assert ephem.time[0] == np.datetime64('2025-10-17T00:00', 'ms')
+    assert np.all(np.diff(ephem.time) == np.timedelta64(1, 'h'))
+    assert np.isclose(ephem.ra[0], 15.0 * (13 + 3 / 60 + 38.24 / 3600))
+    assert np.isclose(ephem.dec[0], -(5 + 4 / 60 + 50.8 / 3600))
+    assert ephem.delta[0] == 2.58741357428006
+    assert ephem.deldot[0] == -16.08127
+    assert ephem.magnitude[0] == 11.863
+    assert ephem.elongation[0] == 14.6262
+    assert ephem.phase_angle[0] == 5.4
+
+def test_every_presence_marker_and_missing_magnitude_is_accepted():
+    ephem = horizons_parser.parse_observer_table(RESPONSE)
+    # Rows carry '*m', 'Cm', 'Nm', 'Am', ' m' and no marker at all
+    assert not np.isnan(ephem.ra).any()
+    assert np.isnan(ephem.magnitude[-1]) and not np.isnan(ephem.magnitude[:-1]).any()
+
+def test_seconds_and_negative_zero_declination():
+    row = " 2025-Oct-17 00:30:15.500 *   13 03 38.24 -00 04 50.8   n.a.  n.a.  2.5 -16.0   14.6 /L   5.4\n"
+    ephem = horizons_parser.parse_observer_table(f"$$SOE\n{row}$$EOE\n")
+    assert ephem.time[0] == np.datetime64('2025-10-17T00:30:15.500', 'ms')
+    assert np.isclose(ephem.dec[0], -(4 / 60 + 50.8 / 3600))
+
+def test_response_without_a_table_raises():
+    with pytest.raises(ValueError):
+        horizons_parser.parse_observer_table("No ephemeris for target \"3I\" prior to A.D. 2025-JUL-01")
+    with pytest.raises(ValueError):
+        horizons_parser.parse_observer_table("$$SOE\n garbage\n$$EOE\n")
@@ -0,0 +1,96 @@
+from datetime import datetime
+
+from starlette.requests import Request
+
+from routes import http_cache
+
+def _request(**headers) -> Request:
+    return Request({
+        'type': 'http',
+        'method': 'GET',
+        'path': '/',
+        'headers': [(name.replace('_', '-').encode(), value.encode()) for name, value in headers.items()]
+    })
+
+def _current(second: int) -> dict:
+    return {
+        'lastUpdated': f'2025-11-01T12:00:{second:02d}',
+        'nextUpdate': '2025-11-01T12:15:00',
+        'status': 'Active',
+        'source': 'JPL Horizons',
+        'position': {'distance': f'{1.8 + second * 1e-6:.8f}'}
+    }
+
+def test_current_version_follows_the_refresh_not_the_second():
+    refreshed_at = datetime(2025, 11, 1, 11, 59, 30)
+    assert http_cache.snapshot_version(_current(1), refreshed_at) == http_cache.snapshot_version(_current(2), refreshed_at)
+    assert http_cache.snapshot_version(_current(1), refreshed_at) != http_cache.snapshot_version(
+        _current(1), datetime(2025, 11, 1, 12, 14, 30)
+    )
+    degraded = {**_current(1), 'status': 'Data updating...'}
+    assert http_cache.snapshot_version(degraded, refreshed_at) != http_cache.snapshot_version(_current(1), refreshed_at)
+
+def test_if_none_match_gets_304_for_a_later_second_of_the_same_refresh():
+    cache = http_cache.ResponseCache()
+    refreshed_at = datetime(2025, 11, 1, 11, 59, 30)
+    first = http_cache.conditional_response(
+        _request(), _current(1), ('3i_atlas', 'current'), 600, cache,
+        version=http_cache.snapshot_version(_current(1), refreshed_at)
+    )
+    assert first.status_code == 200
+
+    later = http_cache.conditional_response(
+        _request(if_none_match=first.headers['etag']), _current(2), ('3i_atlas', 'current'), 599, cache,
+        version=http_cache.snapshot_version(_current(2), refreshed_at)
+    )
+    assert later.status_code == 304
+    assert later.headers['etag'] == first.headers['etag']
+
+class _CountingCache(http_cache.ResponseCache):
+    def __init__(self):
+        super().__init__(min_compress_size=0)
+        self.calls = 0
+
+    def body(self, *args, **kwargs):
+        self.calls += 1
+        return super().body(*args, **kwargs)
+
+def test_304_does_not_serialize_the_body():
+    cache = _CountingCache()
+    refreshed_at = datetime(2025, 11, 1, 11, 59, 30)
+    version = http_cache.snapshot_version(_current(1), refreshed_at)
+    first = http_cache.conditional_response(
+        _request(accept_encoding='gzip'), _current(1), ('3i_atlas', 'current'), 600, cache, version=version
+    )
+    assert first.headers['content-encoding'] == 'gzip'
+    assert cache.calls == 1
+
+    cache._bodies.clear()
+    for second in range(2, 5):
+        response = http_cache.conditional_response(
+            _request(accept_encoding='gzip', if_none_match=first.headers['etag']),
+            _current(second), ('3i_atlas', 'current'), 600, cache, version=version
+        )
+        assert response.status_code == 304
+    assert cache.calls == 1
+
+def test_body_is_encoded_once_per_refresh():
+    cache = http_cache.ResponseCache()
+    refreshed_at = datetime(2025, 11, 1, 11, 59, 30)
+    bodies = {
+        http_cache.conditional_response(
+            _request(), _current(second), ('3i_atlas', 'current'), 600, cache,
+            version=http_cache.snapshot_version(_current(second), refreshed_at)
+        ).body
+        for second in range(1, 5)
+    }
+    assert len(bodies) == 1
+
+def test_brotli_and_orjson_are_available_and_used():
+    assert http_cache.orjson is not None and http_cache.brotli is not None
+    history = [{'timestamp': f'2025-11-01T{hour:02d}:00:00', 'distance': f'{1.8 + hour * 1e-3:.8f}'} for hour in range(24)]
+    response = http_cache.conditional_response(
+        _request(accept_encoding='gzip, br'), history, ('3i_atlas', 'historical', 24), 600, http_cache.ResponseCache()
+    )
+    assert response.headers['content-encoding'] == 'br'
+    assert http_cache.brotli.decompress(response.body) == http_cache.orjson.dumps(history)
@@ -0,0 +1,85 @@
+import asyncio
+import json
+from datetime import timedelta
+
+from services.live_feed import LiveFeed
+
+class _Service:
+    """Current payloads that change on every call"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def get_current_comet_data(self, comet_id):
+        self.calls += 1
+        return {'id': comet_id, 'lastUpdated': f'2025-11-01T12:00:{self.calls:02d}'}
+
+def _feed(service, **options) -> LiveFeed:
+    return LiveFeed(service, interval=timedelta(milliseconds=10), **options)
+
+def test_producer_runs_only_while_there_are_subscribers():
+    async def scenario():
+        service = _Service()
+        feed = _feed(service)
+        first = feed.subscribe('3i_atlas')
+        producer = feed._producers['3i_atlas']
+        second = feed.subscribe('3i_atlas')
+        shared = feed._producers['3i_atlas'] is producer
+
+        await asyncio.sleep(0.05)
+        feed.unsubscribe('3i_atlas', first)
+        still_running = not producer.done()
+        feed.unsubscribe('3i_atlas', second)
+        await asyncio.wait_for(producer, 1.0)
+        calls = service.calls
+        await asyncio.sleep(0.05)
+        return shared, still_running, feed, calls, service.calls
+
+    shared, still_running, feed, calls, later_calls = asyncio.run(scenario())
+    assert shared and still_running
+    assert feed._producers == {} and feed.subscriber_count() == 0
+    assert calls == later_calls > 0
+
+def test_subscriber_keeps_only_the_newest_frame():
+    async def scenario():
+        feed = _feed(_Service())
+        queue = feed.subscribe('3i_atlas')
+        await asyncio.sleep(0.1)
+        frames = [queue.get_nowait()]
+        empty = queue.empty()
+        late = feed.subscribe('3i_atlas')
+        late_frame = late.get_nowait()
+        await feed.stop()
+        return frames, empty, late_frame
+
+    frames, empty, late_frame = asyncio.run(scenario())
+    assert empty
+    data = json.loads(frames[0].decode().split('data: ', 1)[1])
+    # Several frames were produced; the unread ones were dropped
+    assert data['lastUpdated'] > '2025-11-01T12:00:02'
+    assert frames[0].startswith(b'event: current\nid: ')
+    # Late joiners get the latest frame at once
+    assert late_frame.startswith(b'event: current\n')
+
+def test_keep_alive_comment_when_idle():
+    class _Idle(_Service):
+        async def get_current_comet_data(self, comet_id):
+            await super().get_current_comet_data(comet_id)
+            return {'id': comet_id, 'lastUpdated': '2025-11-01T12:00:00'}
+
+    async def scenario():
+        feed = _feed(_Idle(), heartbeat=timedelta(milliseconds=50))
+        stream = feed.stream('3i_atlas')
+        frames = [await stream.__anext__() for _ in range(4)]
+        subscribed = feed.subscriber_count('3i_atlas')
+        await stream.aclose()
+        remaining = feed.subscriber_count('3i_atlas')
+        await feed.stop()
+        return frames, subscribed, remaining
+
+    frames, subscribed, remaining = asyncio.run(scenario())
+    assert frames[0] == b'retry: 5000\n\n'
+    assert frames[1].startswith(b'event: current\n')
+    # Unchanged data is not re-sent; the idle stream gets comments instead
+    assert frames[2:] == [b': keep-alive\n\n'] * 2
+    assert (subscribed, remaining) == (1, 0)
@@ -0,0 +1,27 @@
+from datetime import datetime, timedelta
+
+from services.memory_cache import TTLCache
+
+NOW = datetime(2025, 11, 1, 12, 0)
+
+def test_entries_expire_at_their_absolute_time():
+    cache = TTLCache()
+    cache.set('current', {'a': 1}, NOW + timedelta(minutes=15), now=NOW)
+    assert cache.get('current', now=NOW + timedelta(minutes=14)) == {'a': 1}
+    assert cache.get('current', now=NOW + timedelta(minutes=15)) is None
+    assert len(cache) == 0
+
+def test_expired_values_are_not_stored():
+    cache = TTLCache()
+    cache.set('current', 1, NOW, now=NOW)
+    assert cache.get('current', now=NOW) is None
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_size=2)
+    expires_at = NOW + timedelta(hours=1)
+    cache.set('a', 1, expires_at, now=NOW)
+    cache.set('b', 2, expires_at, now=NOW)
+    assert cache.get('a', now=NOW) == 1
+    cache.set('c', 3, expires_at, now=NOW)
+    assert cache.get('b', now=NOW) is None
+    assert cache.get('a', now=NOW) == 1 and cache.get('c', now=NOW) == 3
@@ -0,0 +1,35 @@
+from services import metrics
+
+def test_counter_renders_mixed_status_labels():
+    registry = metrics.Registry()
+    responses = metrics.Counter('test_responses_total', 'Responses by status', ('status',), registry=registry)
+    responses.inc(status=200)
+    responses.inc(status='error')
+    responses.inc(status=503)
+    responses.inc(status=200)
+
+    lines = registry.render().splitlines()
+    assert 'test_responses_total{status="200"} 2' in lines
+    assert 'test_responses_total{status="503"} 1' in lines
+    assert 'test_responses_total{status="error"} 1' in lines
+    assert responses.value(status='200') == responses.value(status=200) == 2
+
+def test_histogram_renders_mixed_label_types():
+    registry = metrics.Registry()
+    latency = metrics.Histogram('test_seconds', 'Latency', ('status',), registry=registry, buckets=(0.1, 1.0))
+    latency.observe(0.05, status=200)
+    latency.observe(2.0, status='error')
+
+    lines = registry.render().splitlines()
+    assert 'test_seconds_bucket{status="200",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{status="error",le="+Inf"} 1' in lines
+    assert 'test_seconds_count{status="error"} 1' in lines
+
+def test_jpl_metrics_render_after_transport_error_and_http_status():
+    from services.comet_service import CometService
+
+    CometService._record_jpl_metrics(None, 0.2, 200)
+    CometService._record_jpl_metrics(None, 10.0, None)
+    text = metrics.REGISTRY.render()
+    assert 'comet_jpl_responses_total{status="200"}' in text
+    assert 'comet_jpl_responses_total{status="error"}' in text
@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import numpy as np
+
+from services.orbit_propagator import (
+    EARTH_ELEMENTS, OrbitalElements, ecliptic_to_equatorial, geocentric_ephemeris, julian_date, parse_elements, propagate
+)
+
+# 1P/Halley at its 1986 apparition: q, e and perihelion time of the
+# passage (1986 Feb 9.43 TT), J2000 angles
+HALLEY_1986 = OrbitalElements(
+    eccentricity=0.967277,
+    perihelion_distance=0.587104,
+    perihelion_time=2446470.93,
+    inclination=162.2626905791606,
+    ascending_node=58.42008097656843,
+    argument_of_perihelion=111.3324851045177
+)
+
+HALLEY_HEADER = """
+JPL/HORIZONS                      1P/Halley                2025-Oct-17 09:12:41
+Rec #:90000030        Soln.date: 2024-Jan-29_16:48:48   # obs: 7608 (1835-1994)
+
+IAU76/J2000 helio. ecliptic osc. elements (au, days, deg., period=Julian yrs):
+
+  EPOCH=  2449400.5 ! 1994-Feb-17.0000000 (TDB)    RMSW= n.a.
+   EC= .9671429084623044   QR= .5859781115169086   TP= 2446467.3953170511
+   OM= 58.42008097656843   W= 111.3324851045177    IN= 162.2626905791606
+   A= 17.83414429255373    MA= 38.38426447202539   ADIST= 35.08231047359999
+   PER= 75.3178             N= .013102874           ANGMOM= .017589073
+   DAN= 1.78888             DDN= .8617              L= 305.8025319
+   B= 16.4160755            MOID= .0637989          TP= 1986-Feb-05.8953170511
+
+Comet physical (GM= km^3/s^2; RAD= km):
+   GM= n.a.                RAD= 5.5
+   M1=  5.5      M2=  13.6     k1=  8.     k2=  5.       PHCOF=  .030
+$$SOE
+"""
+
+def test_elements_are_read_from_a_horizons_header():
+    elements = parse_elements(HALLEY_HEADER)
+    assert elements is not None
+    assert elements.eccentricity == 0.9671429084623044
+    assert elements.perihelion_distance == 0.5859781115169086
+    assert elements.perihelion_time == 2446467.3953170511
+    assert (elements.ascending_node, elements.argument_of_perihelion, elements.inclination) == (
+        58.42008097656843, 111.3324851045177, 162.2626905791606
+    )
+    assert (elements.total_magnitude, elements.magnitude_slope) == (5.5, 8.0)
+    assert np.isclose(elements.semi_major_axis, 17.83414429255373)
+
+def test_missing_elements_give_none():
+    assert parse_elements(HALLEY_HEADER.replace('EC=', 'XX')) is None
+
+def test_halley_close_approaches_of_1985_and_1986():
+    times = np.array(['1985-11-27', '1986-04-11'], dtype='datetime64[ms]')
+    ephem, _ = geocentric_ephemeris(HALLEY_1986, times)
+    # Published geocentric distances: 0.62 AU inbound, 0.42 AU outbound
+    assert np.allclose(ephem.delta, [0.62, 0.417], atol=0.01)
+    # Deep in the southern sky after perihelion
+    assert ephem.dec[1] < -40
+
+def test_radius_is_q_at_perihelion():
+    position, velocity = propagate(HALLEY_1986, np.array([HALLEY_1986.perihelion_time]))
+    assert np.isclose(np.linalg.norm(position), HALLEY_1986.perihelion_distance)
+    assert np.isclose(np.dot(position[0], velocity[0]), 0.0, atol=1e-12)
+
+def test_earth_orbit_matches_the_2025_apsides_and_equinox():
+    jd = julian_date(np.array(['2025-01-04T13:28', '2025-07-03T19:55', '2025-03-20T09:01'], dtype='datetime64[ms]'))
+    earth, _ = propagate(EARTH_ELEMENTS, jd)
+    assert np.allclose(np.linalg.norm(earth[:2], axis=1), [0.98333, 1.01664], atol=5e-4)
+
+    # At the March equinox the Sun crosses the equator of date; J2000
+    # coordinates lag it by the 0.35 degrees precession since 2000
+    sun = ecliptic_to_equatorial(-earth[2:])[0]
+    assert np.isclose(np.degrees(np.arctan2(sun[1], sun[0])) % 360, 359.65, atol=0.1)
+    assert abs(np.degrees(np.arcsin(sun[2] / np.linalg.norm(sun)))) < 0.2
+
+def test_hyperbolic_orbit_from_a_horizons_header():
+    response = (Path(__file__).parent / 'data' / 'horizons_observer_3i_atlas.txt').read_text()
+    elements = parse_elements(response)
+    assert elements.semi_major_axis < 0
+
+    position, _ = propagate(elements, np.array([elements.perihelion_time - 100, elements.perihelion_time, elements.perihelion_time + 100]))
+    r = np.linalg.norm(position, axis=1)
+    assert np.isclose(r[1], elements.perihelion_distance)
+    assert r[0] > r[1] < r[2]
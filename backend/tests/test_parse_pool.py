@@ -0,0 +1,51 @@
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from services import horizons_parser
+from services.parse_pool import ParsePool
+
+RESPONSE = (Path(__file__).parent / 'data' / 'horizons_observer_3i_atlas.txt').read_text()
+# The same rows without the object-data header: under 1 KB
+TABLE = RESPONSE[RESPONSE.index('$$SOE'):RESPONSE.index('$$EOE') + len('$$EOE')]
+
+def _assert_same(ephem, expected):
+    for field in expected.__dataclass_fields__:
+        np.testing.assert_array_equal(getattr(ephem, field), getattr(expected, field))
+
+def test_responses_over_the_threshold_are_parsed_in_the_pool():
+    async def scenario():
+        pool = ParsePool(threshold_bytes=1024, max_workers=1)
+        try:
+            small = await pool.parse(TABLE, kind='test')
+            inline = pool._executor is None
+            large = await pool.parse(RESPONSE, kind='test')
+            return small, inline, large, pool._executor is not None
+        finally:
+            pool.close()
+
+    small, inline, large, pooled = asyncio.run(scenario())
+    assert inline and pooled
+    _assert_same(large, horizons_parser.parse_observer_table(RESPONSE))
+    assert len(TABLE) < 1024 and len(small) == 8
+
+def test_broken_pool_falls_back_to_inline_parsing():
+    async def scenario():
+        pool = ParsePool(threshold_bytes=0, max_workers=1)
+        try:
+            await pool.parse(RESPONSE, kind='test')
+            # A worker dying (e.g. OOM-killed) breaks the whole executor
+            with pytest.raises(BrokenProcessPool):
+                await asyncio.get_running_loop().run_in_executor(pool._executor, os._exit, 1)
+            ephem = await pool.parse(RESPONSE, kind='test')
+            return ephem, pool._disabled, pool._executor, pool._get_executor()
+        finally:
+            pool.close()
+
+    ephem, disabled, executor, reopened = asyncio.run(scenario())
+    _assert_same(ephem, horizons_parser.parse_observer_table(RESPONSE))
+    assert disabled and executor is None and reopened is None
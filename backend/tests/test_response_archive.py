@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime
+
+import httpx
+import numpy as np
+import typer
+from mongomock_motor import AsyncMongoMockClient
+from typer.testing import CliRunner
+
+import replay_cli
+from benchmarks.fake_horizons import FakeHorizons
+from services.comet_service import CometService
+from services.response_archive import ResponseArchive
+
+PARAMS = {'COMMAND': "'C/2025 N1'", 'START_TIME': "'2025-11-01 00:00'", 'STEP_SIZE': "'1h'"}
+
+def test_save_load_and_replace(tmp_path):
+    archive = ResponseArchive(tmp_path)
+    path = archive.save(PARAMS, 'first', fetched_at=datetime(2025, 11, 1, 0, 5))
+    assert path.parent.name == path.name[:2] and path.name.endswith('.txt.gz')
+    assert ResponseArchive.key(dict(reversed(PARAMS.items()))) == ResponseArchive.key(PARAMS)
+
+    archive.save(PARAMS, 'second', fetched_at=datetime(2025, 11, 1, 1, 5))
+    other = archive.save({**PARAMS, 'STEP_SIZE': "'10m'"}, 'dense', fetched_at=datetime(2025, 11, 1, 0, 30))
+    metadata, text = ResponseArchive.load(path)
+    assert (metadata['params'], metadata['length'], text) == (PARAMS, 6, 'second')
+    assert archive.get(PARAMS) == 'second'
+    assert archive.get({**PARAMS, 'START_TIME': "'2025-11-02 00:00'"}) is None
+    # Oldest fetch first; a replaced query keeps only its newest answer
+    assert [entry_path for _, entry_path in archive.entries()] == [other, path]
+
+def test_stub_replays_exact_query_else_newest_of_same_command_and_step(tmp_path):
+    archive = ResponseArchive(tmp_path)
+    query = {**PARAMS, 'STOP_TIME': "'2025-11-01 02:00'"}
+    archive.save(query, 'exact', fetched_at=datetime(2025, 11, 1, 0, 5))
+    archive.save({**query, 'START_TIME': "'2025-11-01 06:00'"}, 'newest', fetched_at=datetime(2025, 11, 1, 6, 5))
+    archive.save({**query, 'COMMAND': "'1P'"}, 'other comet', fetched_at=datetime(2025, 11, 1, 7, 5))
+    horizons = FakeHorizons(archive=archive)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=horizons.app), base_url='http://horizons.test') as client:
+            async def get(**overrides):
+                params = {**query, **overrides}
+                return (await client.get('/api/horizons.api', params=params)).text
+            return (
+                await get(),
+                await get(START_TIME="'2025-11-01 01:00'"),
+                await get(STEP_SIZE="'10m'", START_TIME="'2025-11-01 01:00'")
+            )
+
+    exact, nearest, synthesized = asyncio.run(scenario())
+    assert exact == 'exact'
+    assert nearest == 'newest'
+    assert '$$SOE' in synthesized
+    assert horizons.replayed == 2
+
+def test_archived_responses_replay_into_the_store_offline(tmp_path):
+    archive = ResponseArchive(tmp_path)
+
+    async def record():
+        horizons = FakeHorizons()
+        service = CometService(
+            AsyncMongoMockClient()['comet_live'],
+            http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=horizons.app)),
+            archive=archive
+        )
+        service.base_url = 'http://horizons.test/api/horizons.api'
+        await service.get_historical_data(10)
+        await service.get_current_comet_data()
+        await asyncio.gather(*service._background_tasks)
+        start, end = service._history_window(10)
+        stored = await service.store.read('3i_atlas', start, end)
+        await service.close()
+        return stored, start, end
+
+    async def replay(start, end):
+        offline_calls = []
+
+        def refuse(request):
+            offline_calls.append(request.url)
+            raise httpx.ConnectError("offline")
+
+        service = CometService(
+            AsyncMongoMockClient()['comet_replayed'],
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(refuse))
+        )
+        stats = await service.replay_archive(archive)
+        replayed = await service.store.read('3i_atlas', start, end)
+        current = await service.get_current_comet_data()
+        await service.close()
+        return stats, replayed, current, offline_calls
+
+    stored, start, end = asyncio.run(record())
+    stats, replayed, current, offline_calls = asyncio.run(replay(start, end))
+
+    assert len(archive.entries()) == 2
+    assert stats['responses'] == 2 and stats['skipped'] == 0 and stats['current'] == 1
+    assert len(stored) == 11
+    np.testing.assert_array_equal(replayed.time, stored.time)
+    np.testing.assert_allclose(replayed.delta, stored.delta)
+    assert current['status'] == 'Active'
+    assert offline_calls == []
+
+def test_replay_cli_requires_an_archive_directory(tmp_path, monkeypatch):
+    monkeypatch.delenv('HORIZONS_ARCHIVE_DIR', raising=False)
+    app = typer.Typer()
+    app.command()(replay_cli.main)
+    result = CliRunner().invoke(app, ['--archive', str(tmp_path / 'missing')])
+    assert result.exit_code == 2
+    assert 'HORIZONS_ARCHIVE_DIR' in result.output
@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import numpy as np
+
+from services.horizons_parser import Ephemeris
+from services.shared_snapshot import SharedSnapshot, SnapshotEntry
+
+def _ephemeris(start: str, rows: int = 4) -> Ephemeris:
+    times = np.datetime64(start, 'ms') + np.arange(rows) * np.timedelta64(10, 'm')
+    values = np.linspace(1.0, 2.0, rows)
+    return Ephemeris(
+        time=times, ra=values * 10, dec=values, delta=values, deldot=values,
+        magnitude=values + 10, elongation=values * 30, phase_angle=values * 5
+    )
+
+def _entry(start: str) -> SnapshotEntry:
+    return SnapshotEntry(
+        payload={'lastUpdated': start},
+        cached_at=datetime.fromisoformat(start),
+        ephemeris=_ephemeris(start),
+        ephemeris_raw='header'
+    )
+
+def test_publish_and_read_round_trip(tmp_path):
+    path = str(tmp_path / 'comets.snap')
+    leader, follower = SharedSnapshot(path), SharedSnapshot(path)
+    assert leader.try_lead()
+    assert not follower.try_lead()
+
+    leader.publish({'3i_atlas': _entry('2025-11-01T00:00:00')})
+    entries = follower.read()
+    assert entries['3i_atlas'].payload == {'lastUpdated': '2025-11-01T00:00:00'}
+    ephem = entries['3i_atlas'].ephemeris
+    np.testing.assert_array_equal(ephem.time, _ephemeris('2025-11-01T00:00:00').time)
+    np.testing.assert_allclose(ephem.ra, _ephemeris('2025-11-01T00:00:00').ra)
+    assert not ephem.ra.flags.writeable
+    # Unchanged file: nothing new
+    assert follower.read() is None
+
+def test_followers_adopt_snapshots_after_leader_change(tmp_path):
+    path = str(tmp_path / 'comets.snap')
+    first, second, follower = SharedSnapshot(path), SharedSnapshot(path), SharedSnapshot(path)
+    assert first.try_lead()
+    for day in range(1, 4):
+        first.publish({'3i_atlas': _entry(f'2025-11-0{day}T00:00:00')})
+    assert follower.read() is not None
+    assert follower.sequence == 3
+
+    # The leader exits; a worker that never read the file takes over
+    first.release()
+    assert second.try_lead()
+    assert second.sequence == 3
+    assert second.publish({'3i_atlas': _entry('2025-11-04T00:00:00')}) == 4
+
+    entries = follower.read()
+    assert entries is not None
+    assert entries['3i_atlas'].payload == {'lastUpdated': '2025-11-04T00:00:00'}
+    assert follower.sequence == 4
+
+def test_follower_adopts_snapshot_after_file_was_removed(tmp_path):
+    path = tmp_path / 'comets.snap'
+    leader, follower = SharedSnapshot(str(path)), SharedSnapshot(str(path))
+    assert leader.try_lead()
+    leader.publish({'3i_atlas': _entry('2025-11-01T00:00:00')})
+    leader.publish({'3i_atlas': _entry('2025-11-02T00:00:00')})
+    assert follower.read() is not None
+    leader.release()
+
+    path.unlink()
+    restarted = SharedSnapshot(str(path))
+    assert restarted.try_lead()
+    assert restarted.publish({'3i_atlas': _entry('2025-11-03T00:00:00')}) == 1
+    assert follower.read()['3i_atlas'].payload == {'lastUpdated': '2025-11-03T00:00:00'}
+
+def test_new_leader_keeps_comets_and_upstream_of_previous_file(tmp_path):
+    path = str(tmp_path / 'comets.snap')
+    first, second, follower = SharedSnapshot(path), SharedSnapshot(path), SharedSnapshot(path)
+    assert first.try_lead()
+    first.publish(
+        {'3i_atlas': _entry('2025-11-01T00:00:00'), 'c2025_a6': _entry('2025-11-01T00:00:00')},
+        upstream={'status': 'active'}
+    )
+    first.release()
+
+    assert second.try_lead()
+    second.publish({'3i_atlas': _entry('2025-11-02T00:00:00')})
+    entries = follower.read()
+    assert entries['3i_atlas'].payload == {'lastUpdated': '2025-11-02T00:00:00'}
+    assert entries['c2025_a6'].payload == {'lastUpdated': '2025-11-01T00:00:00'}
+    np.testing.assert_allclose(entries['c2025_a6'].ephemeris.delta, _ephemeris('2025-11-01T00:00:00').delta)
+    assert follower.upstream == {'status': 'active'}
+
+    second.publish({}, upstream={'status': 'down'})
+    assert follower.read() is not None
+    assert follower.upstream == {'status': 'down'}
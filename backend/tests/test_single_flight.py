@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flights = SingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {'distance': 1.8}
+
+        waiters = [asyncio.ensure_future(flights.do('current', fetch)) for _ in range(10)]
+        await asyncio.sleep(0)
+        in_flight = flights.in_flight('current')
+        release.set()
+        results = await asyncio.gather(*waiters)
+        return calls, results, in_flight, flights.in_flight('current')
+
+    calls, results, in_flight, still_in_flight = asyncio.run(scenario())
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert in_flight and not still_in_flight
+
+def test_exception_reaches_every_waiter_and_clears_the_key():
+    async def scenario():
+        flights = SingleFlight()
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            raise RuntimeError("JPL API returned status 503")
+
+        results = await asyncio.gather(*(flights.do('current', failing) for _ in range(5)), return_exceptions=True)
+        cleared = not flights.in_flight('current')
+        # The next miss starts a new flight
+        retry = await flights.do('current', lambda: asyncio.sleep(0, result='fresh'))
+        return calls, results, cleared, retry
+
+    calls, results, cleared, retry = asyncio.run(scenario())
+    assert calls == 1
+    assert len(results) == 5 and all(isinstance(result, RuntimeError) for result in results)
+    assert cleared
+    assert retry == 'fresh'
+
+def test_different_keys_do_not_share_and_cancelled_waiter_spares_the_flight():
+    async def scenario():
+        flights = SingleFlight()
+        started = []
+        release = asyncio.Event()
+
+        async def fetch(key):
+            started.append(key)
+            await release.wait()
+            return key
+
+        first = asyncio.ensure_future(flights.do('current', lambda: fetch('current')))
+        other = asyncio.ensure_future(flights.do('historical', lambda: fetch('historical')))
+        second = asyncio.ensure_future(flights.do('current', lambda: fetch('current')))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return started, await second, await other
+
+    started, second, other = asyncio.run(scenario())
+    assert sorted(started) == ['current', 'historical']
+    assert (second, other) == ('current', 'historical')
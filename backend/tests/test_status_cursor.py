@@ -0,0 +1,86 @@
+import asyncio
+import base64
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+import server
+from services import metrics
+
+def test_cursor_round_trip():
+    doc = {'timestamp': datetime(2025, 11, 1, 12, 0, 0, 123000), 'id': 'b6f1e0c2'}
+    cursor = server._encode_status_cursor(doc)
+    assert '=' not in cursor
+    assert server._decode_status_cursor(cursor) == (doc['timestamp'], doc['id'])
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    base64.urlsafe_b64encode(b'{"a": 1}').decode(),
+    base64.urlsafe_b64encode(b'["yesterday", "x"]').decode(),
+    base64.urlsafe_b64encode(b'[1, 2]').decode(),
+    base64.urlsafe_b64encode(b'\xff\xfe').decode()
+])
+def test_bad_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        server._decode_status_cursor(cursor)
+    assert error.value.status_code == 400
+
+def test_pages_follow_the_cursor(monkeypatch):
+    monkeypatch.setattr(server, 'db', AsyncMongoMockClient()['comet_test'])
+
+    async def run():
+        await server.db.status_checks.insert_many([
+            {'id': f'{k:02d}', 'client_name': 'probe', 'timestamp': datetime(2025, 11, 1, 12, k // 2)}
+            for k in range(5)
+        ])
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            ids, after = [], None
+            while True:
+                params = {'limit': 2, **({'after': after} if after else {})}
+                response = await client.get('/api/status', params=params)
+                assert response.status_code == 200
+                ids += [check['id'] for check in response.json()]
+                after = response.headers.get('X-Next-Cursor')
+                if after is None:
+                    break
+            bad = await client.get('/api/status', params={'after': 'not-a-cursor'})
+        return ids, bad
+
+    ids, bad = asyncio.run(run())
+    assert ids == ['04', '03', '02', '01', '00']
+    assert bad.status_code == 400
+
+def test_default_page_keeps_the_unpaginated_size_and_stream_returns_the_rest(monkeypatch):
+    monkeypatch.setattr(server, 'db', AsyncMongoMockClient()['comet_test'])
+
+    async def run():
+        await server.db.status_checks.insert_many([
+            {'id': f'{k:04d}', 'client_name': 'probe', 'timestamp': datetime(2025, 11, 1) + timedelta(seconds=k)}
+            for k in range(1005)
+        ])
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            page = await client.get('/api/status')
+            rest = await client.get('/api/status', params={'after': page.headers['X-Next-Cursor'], 'stream': 'true'})
+        return page, rest
+
+    timed = lambda: metrics.HTTP_REQUEST_SECONDS.count(method='GET', route='/api/status', status=200)
+    before = timed()
+    page, rest = asyncio.run(run())
+    # Only the page is timed; the NDJSON stream would record time to first byte
+    assert timed() == before + 1
+    assert len(page.json()) == 1000
+    assert rest.headers['content-type'] == 'application/x-ndjson'
+    assert [json.loads(line)['id'] for line in rest.text.splitlines()] == ['0004', '0003', '0002', '0001', '0000']
+
+def test_openapi_documents_both_response_shapes():
+    operation = server.app.openapi()['paths']['/api/status']['get']
+    content = operation['responses']['200']['content']
+    assert content['application/json']['schema']['items'] == {'$ref': '#/components/schemas/StatusCheck'}
+    assert 'application/x-ndjson' in content
+    assert 'X-Next-Cursor' in operation['responses']['200']['headers']
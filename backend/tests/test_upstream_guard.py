@@ -0,0 +1,124 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from services import upstream_guard
+
+from services.comet_service import DEFAULT_COMET_ID, CometService
+from services.shared_snapshot import SharedSnapshot
+from services.upstream_guard import CircuitBreaker, TokenBucket
+
+def test_workers_split_the_jpl_budget_without_a_shared_snapshot(tmp_path):
+    db = AsyncMongoMockClient()['comet_test']
+    single = CometService(db)
+    split = CometService(db, workers=4)
+    shared = CometService(db, workers=4, snapshot=SharedSnapshot(str(tmp_path / 'comets.snap')))
+
+    hourly = lambda service: service.rate_limiter.capacity + service.rate_limiter.rate * 3600
+    assert round(hourly(single)) == 1000
+    assert round(hourly(split)) == 250
+    assert split.rate_limiter.capacity == 25
+    # Only the snapshot leader calls JPL, so it holds the whole budget
+    assert round(hourly(shared)) == 1000
+
+def test_token_bucket_bursts_then_refills():
+    bucket = TokenBucket.per_hour(1000, burst=100)
+    now = bucket._updated
+    assert all(bucket.try_acquire(now=now) for _ in range(100))
+    assert not bucket.try_acquire(now=now)
+    assert bucket.wait_time(now=now) == pytest.approx(1 / bucket.rate)
+
+    later = now + 10 / bucket.rate
+    assert bucket.available(now=later) == pytest.approx(10)
+    assert bucket.available(now=later + 3600) == 100
+
+def test_token_bucket_keeps_any_hour_within_budget():
+    bucket = TokenBucket.per_hour(1000, burst=100)
+    start = bucket._updated
+    granted = sum(bucket.try_acquire(now=start + second) for second in range(3600))
+    assert granted <= 1000
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(upstream_guard.time, 'monotonic', clock)
+    return clock
+
+def test_circuit_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success(latency=0.1)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    assert breaker.retry_after() == 60
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    clock.now += 60
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success(latency=0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot() == {'state': 'closed', 'consecutiveFailures': 0, 'retryAfterSeconds': 0.0}
+
+def test_failed_trial_doubles_the_timeout_up_to_the_cap(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60, max_reset_timeout=200)
+    breaker.record_failure()
+    for expected in (120, 200, 200):
+        clock.now += breaker.reset_timeout
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.reset_timeout == expected
+        assert breaker.state == CircuitBreaker.OPEN
+
+def test_slow_success_counts_as_failure(clock):
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_threshold=20)
+    breaker.record_success(latency=25)
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_abandoned_trial_frees_the_half_open_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow()
+    breaker.abandon()
+    assert breaker.allow()
+
+def test_guard_refusals_are_not_refresh_failures(run_api):
+    async def scenario(client, service, horizons):
+        service.rate_limiter = TokenBucket(capacity=0, rate=0)
+        for _ in range(service.max_refresh_failures + 1):
+            await service.get_current_comet_data()
+        assert horizons.calls == 0
+        assert service._state(DEFAULT_COMET_ID).refresh_failures == {'current': 0, 'historical': 0}
+        assert not service.refresh_failing()
+
+    run_api(scenario)
+
+def test_refresh_failures_are_counted_per_data_type(run_api):
+    async def scenario(client, service, horizons):
+        service.max_attempts = 1
+        for _ in range(service.max_refresh_failures):
+            await service.get_historical_data(hours=6)
+        assert service.refresh_failing(data_type='historical')
+        assert not service.refresh_failing(data_type='current')
+
+        calls = horizons.calls
+        await service.get_historical_data(hours=6)
+        assert horizons.calls == calls
+
+    run_api(scenario, failure_rate=1.0)
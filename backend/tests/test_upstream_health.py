@@ -0,0 +1,21 @@
+from services.upstream_health import UpstreamHealth
+
+CONTRACT_STATUSES = {'active', 'degraded', 'down'}
+
+def test_status_stays_within_the_contract_before_any_observation():
+    health = UpstreamHealth()
+    assert health.status in CONTRACT_STATUSES
+    assert health.status == 'degraded'
+    assert health.snapshot()['samples'] == 0
+
+def test_status_follows_observations():
+    health = UpstreamHealth(down_after=3, degraded_latency=5.0)
+    health.record(True, 0.3, status_code=200)
+    assert health.status == 'active'
+
+    for _ in range(3):
+        health.record(False, 10.0, error='timeout')
+    assert health.status == 'down'
+
+    health.record(True, 0.3, status_code=200)
+    assert health.status == 'degraded'  # 3 of 5 recent calls failed
@@ -0,0 +1,37 @@
+import asyncio
+from datetime import datetime
+
+import numpy as np
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from services import visibility
+from services.comet_registry import ATLAS_3I
+from services.comet_service import CometService
+from services.orbit_propagator import geocentric_ephemeris
+
+def _observers(count: int):
+    rng = np.random.default_rng(7)
+    return [
+        {'id': str(k), 'latitude': float(lat), 'longitude': float(lon), 'elevation': 100.0}
+        for k, (lat, lon) in enumerate(zip(rng.uniform(-60, 60, count), rng.uniform(-180, 180, count)))
+    ]
+
+def test_chunked_visibility_matches_single_pass():
+    start = np.datetime64('2025-11-20T00:00', 'ms')
+    grid = start + np.arange(0, 24 * 60 + 1, 10) * np.timedelta64(1, 'm')
+    at = np.array([start, start + np.timedelta64(6, 'h')])
+    positions, _ = geocentric_ephemeris(ATLAS_3I.elements, at)
+    search, _ = geocentric_ephemeris(ATLAS_3I.elements, grid)
+    observers = _observers(25)
+
+    single = visibility.observer_visibility(observers, at, positions, search, chunk_cells=10 ** 9)
+    chunked = visibility.observer_visibility(observers, at, positions, search, chunk_cells=500)
+    assert chunked == single
+    assert [result['id'] for result in chunked] == [o['id'] for o in observers]
+
+def test_oversized_batch_is_rejected_before_any_work():
+    service = CometService(AsyncMongoMockClient()['comet_test'])
+    observers = _observers(10000)
+    with pytest.raises(ValueError, match='observer-epochs'):
+        asyncio.run(service.get_visibility(observers, start=datetime(2025, 11, 20), hours=168, step_minutes=1))